@@ -0,0 +1,85 @@
+"""
+Authentication backend that serves logged-in users from the cache.
+
+Every authenticated request resolves ``request.user`` through the backend's
+``get_user()``. ModelBackend does that with a query on accounts_user; this
+backend keeps the user's fields for ``USER_CACHE_TIMEOUT`` seconds in the
+cache and falls back to the database on a miss.
+
+The password hash is never cached. The cached entry carries the session
+auth hash instead, so the session check in ``django.contrib.auth.get_user``
+still runs; the password field is deferred and only loaded if something
+reads it.
+
+Saving or deleting a user drops that user's entry (``accounts.signals``).
+Writes that skip the signals (``QuerySet.update()``, ``bulk_update()``) bump
+a version that is part of every key, which drops all entries at once. A
+password change, deactivation or role change takes effect on the next
+request either way.
+"""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+VERSION_KEY = 'auth-user:version'
+
+
+def cache_version():
+    # A fresh token rather than a counter, so an evicted version can never
+    # come back and revive entries written under it.
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def user_cache_key(user_id, version=None):
+    return f'auth-user:{version or cache_version()}:{user_id}'
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def forget_all_users():
+    cache.set(VERSION_KEY, uuid4().hex, None)
+
+
+def cached_fields(user):
+    """The user's concrete field values, in model order, without the password."""
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != 'password'
+    }
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, {
+                'fields': cached_fields(user),
+                'session_auth_hash': user.get_session_auth_hash(),
+            }, settings.USER_CACHE_TIMEOUT)
+        else:
+            user = self.user_from_cache(entry)
+        return user if self.user_can_authenticate(user) else None
+
+    def user_from_cache(self, entry):
+        UserModel = get_user_model()
+        fields = entry['fields']
+        user = UserModel.from_db(router.db_for_read(UserModel), list(fields), list(fields.values()))
+        user.cached_session_auth_hash = entry['session_auth_hash']
+        return user
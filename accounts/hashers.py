@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+DEFAULT_ITERATIONS = hashers.PBKDF2PasswordHasher.iterations
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the work factor taken from
+    ``PASSWORD_PBKDF2_ITERATIONS``. The setting can only raise it: a count
+    below Django's default is ignored, so stored hashes are never re-hashed
+    to a weaker count at the guest's next login. ``manage.py bench_login``
+    shows what a count costs in logins/second.
+    """
+
+    @property
+    def iterations(self):
+        return max(settings.PASSWORD_PBKDF2_ITERATIONS or 0, DEFAULT_ITERATIONS)
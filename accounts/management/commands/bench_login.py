@@ -0,0 +1,83 @@
+"""
+What the password hash work factor costs in logins per second.
+
+For each PBKDF2 iteration count, times one password check and then posts
+the login form through the test client for ``--duration`` seconds, in a
+throwaway test database. A login is CPU-bound in the hash, so logins/s
+here is roughly what one worker thread (one core) can serve; multiply by
+cores for an instance. Pick the count for ``PASSWORD_PBKDF2_ITERATIONS``
+that keeps peak logins inside that budget; the hasher never goes below
+Django's default, so neither does this benchmark.
+
+Usage:
+    python manage.py bench_login
+    python manage.py bench_login --iterations 870000,1200000 --duration 5
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from accounts.hashers import DEFAULT_ITERATIONS
+from core.loadtest import percentile
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure password hash cost and login throughput per PBKDF2 iteration count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=f'{DEFAULT_ITERATIONS},{DEFAULT_ITERATIONS * 3 // 2},{DEFAULT_ITERATIONS * 2}',
+                            help='Comma-separated PBKDF2 iteration counts.')
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds of logins per count.')
+
+    def handle(self, *args, **options):
+        try:
+            counts = [int(value) for value in options['iterations'].split(',')]
+        except ValueError:
+            raise CommandError('--iterations takes comma-separated integers.')
+        if min(counts) < DEFAULT_ITERATIONS:
+            raise CommandError(f"--iterations cannot go below Django's default of {DEFAULT_ITERATIONS}.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f"{'iterations':>11} {'hash ms':>9} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+            for count in counts:
+                with override_settings(PASSWORD_PBKDF2_ITERATIONS=count, RATELIMIT_ENABLED=False):
+                    self._bench(count, options['duration'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _bench(self, count, duration):
+        encoded = make_password(PASSWORD)
+        began = time.perf_counter()
+        check_password(PASSWORD, encoded)
+        hash_ms = (time.perf_counter() - began) * 1000
+
+        User = get_user_model()
+        user = User.objects.create_user(username=f'bench-login-{count}', password=PASSWORD)
+        login_url = reverse('accounts:login')
+        client = Client(HTTP_HOST='localhost')
+        latencies = []
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            began = time.perf_counter()
+            response = client.post(login_url, {'username': user.username, 'password': PASSWORD})
+            latencies.append((time.perf_counter() - began) * 1000)
+            if response.status_code != 302:
+                raise CommandError(f'Login failed with status {response.status_code}.')
+            client.logout()
+
+        self.stdout.write(
+            f"{count:>11} {hash_ms:>9.1f} {len(latencies) / duration:>9.1f} "
+            f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f}"
+        )
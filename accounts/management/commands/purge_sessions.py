@@ -0,0 +1,51 @@
+"""
+Delete expired sessions in small batches.
+
+``clearsessions`` removes every expired row in one DELETE, which on a big
+django_session table holds locks for a long time. This deletes
+``--batch-size`` rows per transaction and sleeps ``--sleep`` seconds in
+between, so it can run from cron alongside live traffic. With signed-cookie
+sessions there is no table and nothing to do.
+
+Usage:
+    python manage.py purge_sessions
+    python manage.py purge_sessions --batch-size 500 --sleep 0.1
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between batches.')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write('Signed-cookie sessions are not stored; nothing to purge.')
+            return
+
+        now = timezone.now()
+        deleted = 0
+        began = time.perf_counter()
+        while True:
+            with transaction.atomic():
+                keys = list(
+                    Session.objects.filter(expire_date__lt=now)
+                    .values_list('session_key', flat=True)[:options['batch_size']]
+                )
+                if not keys:
+                    break
+                deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired session(s) in {time.perf_counter() - began:.1f}s"
+        ))
@@ -1,7 +1,25 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
 
 
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # No post_save here, so drop every cached user. (accounts.backends
+        # imports django.contrib.auth.backends, which needs this model.)
+        from .backends import forget_all_users
+
+        rows = super().update(**kwargs)
+        forget_all_users()
+        return rows
+
+    update.alters_data = True
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
 
     class Role(models.TextChoices):
@@ -16,9 +34,19 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
 
+    objects = UserManager()
+
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
 
+    def get_session_auth_hash(self):
+        # Users served from the cache arrive without the password hash, but
+        # with the session hash computed from it. Once the password is
+        # loaded or changed, the hash is worked out from it again.
+        if 'password' in self.get_deferred_fields():
+            return self.cached_session_auth_hash
+        return super().get_session_auth_hash()
+
     @property
     def is_admin_user(self):
         return self.role == self.Role.ADMIN
@@ -0,0 +1,21 @@
+from django.contrib.auth.signals import user_login_failed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.ratelimit import record_failure
+from .backends import forget_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Drop the cached copy so the next request loads the saved user."""
+    forget_user(instance.pk)
+
+
+@receiver(user_login_failed)
+def count_failed_login(sender, credentials, request=None, **kwargs):
+    """Count the failure against the login view's per-username limit."""
+    if request is not None:
+        record_failure(request, 'login')
@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import CachedModelBackend, user_cache_key
+from .hashers import DEFAULT_ITERATIONS
+
+
+class CachedModelBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.backend = CachedModelBackend()
+
+    def test_cached_user_has_no_password_hash(self):
+        self.backend.get_user(self.user.pk)
+        entry = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', entry['fields'])
+        self.assertNotIn(self.user.password, str(entry))
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.username, 'guest')
+            self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+
+    def test_session_survives_cached_requests(self):
+        self.client.login(username='guest', password='guest-password')
+        url = reverse('payments:history')
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_queryset_update_drops_cached_users(self):
+        self.backend.get_user(self.user.pk)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_password_change_is_seen_on_next_request(self):
+        self.client.login(username='guest', password='guest-password')
+        url = reverse('payments:history')
+        self.client.get(url)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class PBKDF2PasswordHasherTests(TestCase):
+
+    def iterations(self):
+        return identify_hasher(make_password('secret')).decode(make_password('secret'))['iterations']
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_count_below_default_is_ignored(self):
+        self.assertEqual(self.iterations(), DEFAULT_ITERATIONS)
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=DEFAULT_ITERATIONS + 1)
+    def test_count_above_default_is_used(self):
+        self.assertEqual(self.iterations(), DEFAULT_ITERATIONS + 1)
@@ -2,9 +2,11 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from core.ratelimit import ratelimit
 from .forms import CustomerRegistrationForm, CustomerLoginForm, ProfileUpdateForm
 
 
+@ratelimit('register', ip='5/h')
 def register_view(request):
     """Handle customer registration (Process 1.2)."""
     if request.user.is_authenticated:
@@ -23,6 +25,7 @@ def register_view(request):
     return render(request, 'accounts/register.html', {'form': form})
 
 
+@ratelimit('login', ip='20/m', failures={'username': '5/5m'})
 def login_view(request):
     """Handle user login (Process 1.1)."""
     if request.user.is_authenticated:
@@ -0,0 +1,96 @@
+"""
+Database settings from the environment.
+
+``DATABASE_URL`` unset means local SQLite. For PostgreSQL, ``DB_POOL``
+chooses how connections are reused:
+
+* ``off`` (default): one persistent connection per worker thread,
+  recycled after ``DB_CONN_MAX_AGE`` seconds (600; 0 opens a connection
+  per request). With ``CONN_HEALTH_CHECKS`` a connection the server has
+  dropped is replaced before the next request uses it, so the request
+  does not fail.
+* ``psycopg``: Django's built-in psycopg 3 pool (``psycopg[pool]``), one
+  pool per worker process. Connections are checked when handed out and
+  retired before the server would recycle them.
+* ``pgbouncer``: a pgbouncer in transaction mode owns the server
+  connections. Server-side cursors are turned off because they do not
+  survive across transactions there.
+
+Pool sizes come from the gunicorn worker layout, so that every worker's
+pool together stays inside ``DB_MAX_CONNECTIONS``.
+"""
+
+import os
+
+import dj_database_url
+
+ENGINE = 'instrumentation.postgresql'
+CONN_MAX_AGE = 600
+POOL_MODES = ('off', 'psycopg', 'pgbouncer')
+
+
+def web_concurrency():
+    """Worker processes per instance; the same default as the gunicorn configs."""
+    return int(os.environ.get('WEB_CONCURRENCY') or 2)
+
+
+def web_threads():
+    """Requests a worker can have in flight at once, i.e. database connections it may hold."""
+    return int(os.environ.get('WEB_THREADS') or 1)
+
+
+def pool_options(workers, threads, max_connections, timeout):
+    """
+    psycopg_pool options for one worker: room for every thread plus one
+    (management threads, health checks), capped at the worker's share of
+    ``max_connections``.
+    """
+    max_size = max(1, min(threads + 1, max_connections // workers))
+    return {
+        'min_size': 1,
+        'max_size': max_size,
+        'timeout': timeout,
+        'max_idle': 300,
+        # Retire connections before the server-side recycling does.
+        'max_lifetime': 1800,
+    }
+
+
+def database_config(base_dir):
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': base_dir / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction begins so that
+                # concurrent bookings serialise instead of racing.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # A file rather than shared-cache memory, so tests that book from
+            # several threads wait on the write lock like production does.
+            'TEST': {'NAME': base_dir / 'test_db.sqlite3'},
+        }
+
+    mode = os.environ.get('DB_POOL', 'off').lower()
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL must be one of {', '.join(POOL_MODES)}, not {mode!r}.")
+
+    conn_max_age = int(os.environ.get('DB_CONN_MAX_AGE', CONN_MAX_AGE))
+    config = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=True)
+    if config['ENGINE'] == 'django.db.backends.postgresql':
+        config['ENGINE'] = ENGINE
+    if mode == 'psycopg':
+        # Pooled connections go back to the pool after each request; the
+        # health checks then run when the pool hands a connection out.
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = pool_options(
+            web_concurrency(),
+            web_threads(),
+            int(os.environ.get('DB_MAX_CONNECTIONS', 90)),
+            float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        )
+    elif mode == 'pgbouncer':
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
@@ -2,10 +2,11 @@
 Settings for Jaime's Private Resort.
 """
 
+import importlib.util
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import dj_database_url
+from backend.database import database_config
 
 load_dotenv()
 
@@ -21,6 +22,12 @@ DEBUG = os.environ.get('DEBUG', 'True').lower() in ('true', '1', 'yes')
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1,.onrender.com').split(',')
 CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS', 'https://*.onrender.com,https://*.railway.app,https://*.up.railway.app').split(',')
 
+CLOUDINARY_STORAGE = {
+    'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME', ''),
+    'API_KEY': os.environ.get('CLOUDINARY_API_KEY', ''),
+    'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET', ''),
+}
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -29,21 +36,28 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    # Third-party
-    'cloudinary_storage',
-    'cloudinary',
-    'django_extensions',
     # Local apps
     'accounts.apps.AccountsConfig',
     'facilities.apps.FacilitiesConfig',
     'reservations.apps.ReservationsConfig',
     'payments.apps.PaymentsConfig',
     'core.apps.CoreConfig',
+    'reports.apps.ReportsConfig',
+    'instrumentation.apps.InstrumentationConfig',
 ]
 
+# Optional third-party apps are only loaded when they are used, so a cold
+# start does not import them for nothing (see `manage.py profile_startup`).
+if CLOUDINARY_STORAGE['CLOUD_NAME']:
+    INSTALLED_APPS += ['cloudinary_storage', 'cloudinary']
+if DEBUG and importlib.util.find_spec('django_extensions'):
+    INSTALLED_APPS += ['django_extensions']
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.WhiteNoiseMiddleware',
+    # After WhiteNoise so static files stay out of the request metrics.
+    'instrumentation.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,7 +70,8 @@ ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render time to /metrics.
+        'BACKEND': 'instrumentation.template_backend.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,18 +86,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if DATABASE_URL:
-    DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
-    }
-else:
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
-    }
+# DATABASE_URL, DB_POOL (off/psycopg/pgbouncer), DB_MAX_CONNECTIONS, DB_POOL_TIMEOUT;
+# see backend/database.py
+DATABASES = {
+    'default': database_config(BASE_DIR),
+}
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
@@ -96,6 +104,17 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # Authentication
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 300  # seconds a logged-in user is served from the cache
+PASSWORD_HASHERS = [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# PBKDF2 work factor; unset or below Django's default keeps the default (see `manage.py bench_login`)
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS') or 0) or None
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
@@ -106,36 +125,130 @@ TIME_ZONE = 'Asia/Manila'
 USE_I18N = True
 USE_TZ = True
 
+# Prometheus scrape token for /metrics (the endpoint is DEBUG-only without it)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Cache: Redis when REDIS_URL is set (needs the `redis` package), otherwise
+# a file cache shared by every worker process on the host.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'session',
+        },
+        'ratelimit': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'ratelimit',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+        # Separate so culling cached pages never evicts sessions.
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': Path(os.environ.get('CACHE_DIR', BASE_DIR / '.cache')) / 'sessions',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'ratelimit': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': Path(os.environ.get('CACHE_DIR', BASE_DIR / '.cache')) / 'ratelimit',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+PAGE_CACHE_TIMEOUT = 600  # seconds; saves to facilities, tours and rates clear it sooner
+
+# Sessions: SESSION_MODE=cached_db (default) reads sessions from the cache
+# and writes through to the database; signed_cookies keeps them client-side;
+# db is Django's default. Purge expired rows with `manage.py purge_sessions`.
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_MODE', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Rate limits on login, registration, contact and the PayMongo webhook
+# (core.ratelimit). Behind a proxy, set how many hops add X-Forwarded-For.
+# With several workers, set REDIS_URL: the file cache has to lock a file
+# around every counter update.
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+RATELIMIT_CACHE_ALIAS = 'ratelimit'
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
 # Static files
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Templates whose static images get resized JPEG/WebP variants at collectstatic.
+STATIC_IMAGE_VARIANT_TEMPLATES = ['core/home.html']
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME', ''),
-    'API_KEY': os.environ.get('CLOUDINARY_API_KEY', ''),
-    'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET', ''),
+# Django 5.1 only reads STORAGES (STATICFILES_STORAGE/DEFAULT_FILE_STORAGE are ignored).
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'cloudinary_storage.storage.MediaCloudinaryStorage' if CLOUDINARY_STORAGE['CLOUD_NAME']
+            else 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.OptimizedStaticFilesStorage',
+    },
 }
-if CLOUDINARY_STORAGE['CLOUD_NAME']:
-    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Tests run with backend.test_settings, which overrides the storage and caches.
 
 # PayMongo
 PAYMONGO_SECRET_KEY = os.environ.get('PAYMONGO_SECRET_KEY', '')
 PAYMONGO_PUBLIC_KEY = os.environ.get('PAYMONGO_PUBLIC_KEY', '')
+PAYMONGO_API_URL = os.environ.get('PAYMONGO_API_URL', 'https://api.paymongo.com/v1')
+PAYMONGO_CONNECT_TIMEOUT = 3.05
+PAYMONGO_READ_TIMEOUT = 10
+PAYMONGO_MAX_RETRIES = 2
+PAYMONGO_STATUS_TTL = 5  # seconds to reuse a non-final checkout status
 
 # Email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
+EMAIL_TIMEOUT = 30
+
+# Email outbox (drained by `manage.py send_outbox`)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_BACKOFF = 30  # seconds before the first retry, doubled per attempt
+EMAIL_OUTBOX_MAX_BACKOFF = 3600
+
+# Image derivatives (generated by `manage.py generate_image_derivatives --watch`)
+IMAGE_DERIVATIVE_MAX_ATTEMPTS = 3
+IMAGE_DERIVATIVE_BACKOFF = 300  # seconds before retrying a failed image, doubled per attempt
+
+# PayMongo webhooks (applied by `manage.py process_webhooks`)
+WEBHOOK_MAX_ATTEMPTS = 5
+
+# Reservations
+# Seconds before a worker reloads a facility's availability index from the DB.
+AVAILABILITY_INDEX_TTL = int(os.environ.get('AVAILABILITY_INDEX_TTL', '60'))
+# Hours a pending (unpaid, unconfirmed) booking holds its dates.
+RESERVATION_HOLD_HOURS = int(os.environ.get('RESERVATION_HOLD_HOURS', '24'))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,21 @@
+"""
+Settings for running the test suite: ``manage.py test`` selects them, and
+other runners take them from the environment, e.g.
+``DJANGO_SETTINGS_MODULE=backend.test_settings pytest`` or
+``python -m django test --settings=backend.test_settings``.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, STORAGES
+
+# Render static files from source; the manifest only exists after collectstatic.
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Keep each cache in memory rather than sharing .cache/ with the dev server.
+CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in CACHES
+}
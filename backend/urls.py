@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from instrumentation.views import healthz, metrics, readyz
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +14,9 @@ urlpatterns = [
     path('facilities/', include('facilities.urls')),
     path('reservations/', include('reservations.urls')),
     path('payments/', include('payments.urls')),
+    path('metrics', metrics, name='metrics'),
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
 ]
 
 if settings.DEBUG:
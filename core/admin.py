@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RatePackage
+from .models import EmailOutbox, RatePackage
 
 
 @admin.register(RatePackage)
@@ -7,3 +7,11 @@ class RatePackageAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'order')
     ordering = ('order', 'name')
     list_editable = ('price', 'order')
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
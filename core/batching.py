@@ -0,0 +1,50 @@
+"""
+Collect post-commit work across a transaction and run it once.
+
+Saving fifty reservations in one transaction used to queue fifty
+``on_commit`` rebuilds, many for the same facility and days. A
+``CommitBatch`` merges what each write adds, per key, and hands the merged
+sets to its ``flush`` function once, right after the commit:
+
+    occupancy_batch = CommitBatch(rebuild_occupancy)
+    occupancy_batch.add(facility_id, months)   # {facility_id: {months}}
+
+Pending work is kept per thread, so one request's flush never runs another
+request's work before that request commits. Work added in a transaction
+that rolls back is flushed with the thread's next batch instead of being
+dropped, so ``flush`` must be idempotent (the rebuilds recompute from the
+database, so running one again is harmless).
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+
+class CommitBatch:
+
+    def __init__(self, flush):
+        self.flush = flush
+        self._local = threading.local()
+
+    def add(self, key, items):
+        """Queue ``items`` under ``key``; flush everything queued once the transaction commits."""
+        items = set(items)
+        if not items:
+            return
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = defaultdict(set)
+        pending[key] |= items
+        # Every add registers the flush, so the work survives even if the
+        # savepoint that registered an earlier one rolls back. The first
+        # flush after the commit takes everything; the rest find nothing.
+        transaction.on_commit(self._flush)
+
+    def _flush(self):
+        pending = getattr(self._local, 'pending', None)
+        if not pending:
+            return
+        self._local.pending = None
+        self.flush(dict(pending))
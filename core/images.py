@@ -0,0 +1,256 @@
+"""
+Responsive image derivatives.
+
+When a Facility, FacilityImage, RatePackage or VirtualTour image is saved,
+a PENDING ImageDerivative row is queued for it. ``manage.py
+generate_image_derivatives`` (the ``images`` worker) then writes resized
+AVIF/WebP/JPEG renditions next to the original in the same storage
+(``facilities/pool.jpg`` -> ``facilities/pool.w640.webp``) and records
+them, and deletes the renditions of images that are no longer used. The
+``{% responsive_image %}`` tag turns the record into a ``<picture>`` with
+``srcset`` candidates, so card grids load a tile-sized file instead of the
+full upload; until the renditions exist it serves the original.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280)
+
+# format -> (Pillow format, file extension, MIME type, save options)
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 50, 'speed': 8}),
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 78, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 78, 'optimize': True, 'progressive': True}),
+}
+if not features.check('avif'):
+    del FORMATS['avif']
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def derivative_name(source_name, width, fmt):
+    stem, _ = os.path.splitext(source_name)
+    return f'{stem}.w{width}.{FORMATS[fmt][1]}'
+
+
+def target_widths(original_width):
+    """Fixed widths below the original, plus the original when it is smaller than the largest."""
+    widths = [w for w in DERIVATIVE_WIDTHS if w < original_width]
+    if original_width <= DERIVATIVE_WIDTHS[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def generate_derivatives(source_name, storage=None):
+    """
+    Write every rendition of ``source_name`` to storage and return them as
+    ``{format: {width: name}}`` (widths are strings so the mapping is JSON).
+    """
+    storage = storage or default_storage
+    with storage.open(source_name, 'rb') as fh:
+        original = ImageOps.exif_transpose(Image.open(fh))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    renditions = {fmt: {} for fmt in FORMATS}
+    for width in target_widths(original.width):
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize(
+            (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0,
+        )
+        for fmt, (pil_format, _, _, options) in FORMATS.items():
+            image = resized.convert('RGB') if pil_format == 'JPEG' else resized
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            name = derivative_name(source_name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            renditions[fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def _cache_key(source_name):
+    return f'image-derivatives:{source_name}'
+
+
+def _modified_since(source_name, moment, storage=None):
+    storage = storage or default_storage
+    try:
+        return storage.get_modified_time(source_name) > moment
+    except (NotImplementedError, OSError):
+        # Remote storages may not report it; the retry budget still applies.
+        return False
+
+
+def queue_derivatives(source_name, storage=None):
+    """
+    Ask the images worker to generate renditions for ``source_name``. A
+    FAILED image is queued again, with a fresh retry budget, when its file
+    has been rewritten since the last attempt.
+    """
+    from .models import ImageDerivative
+
+    row, created = ImageDerivative.objects.get_or_create(source=source_name)
+    if row.status == ImageDerivative.Status.FAILED and _modified_since(source_name, row.updated_at, storage):
+        row.status = ImageDerivative.Status.PENDING
+        row.attempts = 0
+        row.last_error = ''
+        row.next_attempt_at = timezone.now()
+        row.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+
+
+def pending_sources():
+    """Storage names of the images queued for renditions and due for an attempt."""
+    from .models import ImageDerivative
+
+    return list(
+        ImageDerivative.objects.filter(status=ImageDerivative.Status.PENDING, next_attempt_at__lte=timezone.now())
+        .order_by('pk').values_list('source', flat=True)
+    )
+
+
+def record_derivatives(source_name, renditions):
+    from .models import ImageDerivative
+
+    ImageDerivative.objects.update_or_create(
+        source=source_name,
+        defaults={'renditions': renditions, 'status': ImageDerivative.Status.READY, 'attempts': 0, 'last_error': ''},
+    )
+    cache.set(_cache_key(source_name), renditions, CACHE_TIMEOUT)
+
+
+def record_failure(source_name, error):
+    """
+    Queue ``source_name`` again after a back-off of IMAGE_DERIVATIVE_BACKOFF
+    seconds, doubled per attempt, or mark it FAILED once it has failed
+    IMAGE_DERIVATIVE_MAX_ATTEMPTS times.
+    """
+    from .models import ImageDerivative
+
+    row, created = ImageDerivative.objects.get_or_create(source=source_name)
+    row.attempts += 1
+    row.last_error = error
+    if row.attempts >= settings.IMAGE_DERIVATIVE_MAX_ATTEMPTS:
+        row.status = ImageDerivative.Status.FAILED
+    else:
+        row.status = ImageDerivative.Status.PENDING
+        delay = settings.IMAGE_DERIVATIVE_BACKOFF * (2 ** (row.attempts - 1))
+        row.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    row.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+
+
+def delete_renditions(renditions, storage=None):
+    storage = storage or default_storage
+    for by_width in renditions.values():
+        for name in by_width.values():
+            storage.delete(name)
+
+
+def prune_derivatives(storage=None):
+    """
+    Delete the renditions (files and record) of images no model refers to
+    any more, e.g. after an upload replaced them. Returns how many images
+    were pruned.
+    """
+    from .models import ImageDerivative
+
+    in_use = set(image_sources())
+    stale = [
+        (pk, source, renditions)
+        for pk, source, renditions in ImageDerivative.objects.values_list('pk', 'source', 'renditions').iterator()
+        if source not in in_use
+    ]
+    for pk, source, renditions in stale:
+        delete_renditions(renditions, storage)
+        ImageDerivative.objects.filter(pk=pk).delete()
+        cache.delete(_cache_key(source))
+    return len(stale)
+
+
+def get_renditions(source_name):
+    """Return the recorded renditions for ``source_name`` ({} if none)."""
+    from .models import ImageDerivative
+
+    renditions = cache.get(_cache_key(source_name))
+    if renditions is None:
+        row = ImageDerivative.objects.filter(source=source_name).values_list('renditions', flat=True).first()
+        renditions = row or {}
+        cache.set(_cache_key(source_name), renditions, CACHE_TIMEOUT)
+    return renditions
+
+
+def prime_renditions(source_names):
+    """
+    Renditions for many images as ``{source_name: renditions}``, with one
+    cache round trip and at most one query, so a page that renders a list
+    of images does not look each one up separately.
+    """
+    from .models import ImageDerivative
+
+    names = {name for name in source_names if name}
+    if not names:
+        return {}
+    cached = cache.get_many([_cache_key(name) for name in names])
+    renditions = {name: cached[_cache_key(name)] for name in names if _cache_key(name) in cached}
+    missing = names - renditions.keys()
+    if missing:
+        found = dict(ImageDerivative.objects.filter(source__in=missing).values_list('source', 'renditions'))
+        fetched = {name: found.get(name) or {} for name in missing}
+        cache.set_many({_cache_key(name): value for name, value in fetched.items()}, CACHE_TIMEOUT)
+        renditions.update(fetched)
+    return renditions
+
+
+def _generate_in_worker(source_name):
+    try:
+        return source_name, generate_derivatives(source_name), None
+    except Exception as e:
+        return source_name, None, str(e)
+
+
+def backfill_derivatives(source_names, workers=None):
+    """
+    Generate renditions for many images in a process pool and record them.
+    Yields (source_name, error) as each one finishes.
+    """
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for source_name, renditions, error in pool.map(_generate_in_worker, source_names):
+            if renditions is not None:
+                record_derivatives(source_name, renditions)
+            else:
+                record_failure(source_name, error)
+            yield source_name, error
+
+
+def image_sources():
+    """Every stored image that should have derivatives, as storage names."""
+    from facilities.models import Facility, FacilityImage, VirtualTour
+    from .models import RatePackage
+
+    fields = (
+        (Facility, 'image'),
+        (FacilityImage, 'image'),
+        (RatePackage, 'photo'),
+        (VirtualTour, 'thumbnail'),
+    )
+    names = set()
+    for model, field in fields:
+        names.update(
+            model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values_list(field, flat=True)
+        )
+    return sorted(names)
@@ -0,0 +1,256 @@
+"""
+HTTP load generator for the booking funnel.
+
+Each virtual user logs in once, then loops through the funnel against a
+running server:
+
+    facility_list -> check_availability -> create_reservation
+        -> initiate_payment -> paymongo_webhook
+
+timing every step. ``initiate_payment`` talks to whatever PayMongo the
+server is configured with (the ``bench_funnel`` command points it at
+payments.fake_paymongo); the webhook step then reports that checkout as
+paid. Results are summarised per step (count, errors, p50/p95/p99) and can
+be compared against a saved baseline.
+
+``start_server`` runs the project under gunicorn, with sync workers on
+backend.wsgi or uvicorn workers on backend.asgi.
+"""
+
+import datetime
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+STEPS = ('facility_list', 'check_availability', 'create_reservation', 'initiate_payment', 'paymongo_webhook')
+SERVER_START_TIMEOUT = 30
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StepTimings:
+    """Latencies and error counts per step, shared by every virtual user."""
+
+    def __init__(self, steps=STEPS):
+        self._lock = threading.Lock()
+        self.steps = steps
+        self.latencies = {step: [] for step in steps}
+        self.errors = {step: 0 for step in steps}
+        self.conflicts = 0
+
+    def record(self, step, seconds, ok):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def conflict(self):
+        with self._lock:
+            self.conflicts += 1
+
+    def summary(self):
+        steps = {}
+        for step in self.steps:
+            values = [v * 1000 for v in self.latencies[step]]
+            steps[step] = {
+                'count': len(values),
+                'errors': self.errors[step],
+                'mean_ms': round(statistics.fmean(values), 2) if values else None,
+                'p50_ms': round(percentile(values, 50), 2) if values else None,
+                'p95_ms': round(percentile(values, 95), 2) if values else None,
+                'p99_ms': round(percentile(values, 99), 2) if values else None,
+            }
+        return steps
+
+
+class FunnelUser:
+    """One logged-in guest walking the booking funnel over HTTP."""
+
+    def __init__(self, base_url, username, password, facilities, timings, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.facilities = facilities
+        self.timings = timings
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _url(self, path):
+        return f'{self.base_url}{path}'
+
+    def _csrf(self):
+        return self.session.cookies.get('csrftoken', '')
+
+    def timed(self, step, method, path, ok_statuses, **kwargs):
+        began = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self._url(path), timeout=self.timeout, allow_redirects=False, **kwargs,
+            )
+        except requests.RequestException:
+            self.timings.record(step, time.perf_counter() - began, ok=False)
+            return None
+        ok = response.status_code in ok_statuses
+        self.timings.record(step, time.perf_counter() - began, ok=ok)
+        return response if ok else None
+
+    def login(self):
+        self.session.get(self._url('/accounts/login/'), timeout=self.timeout)
+        response = self.session.post(
+            self._url('/accounts/login/'),
+            data={'username': self.username, 'password': self.password, 'csrfmiddlewaretoken': self._csrf()},
+            timeout=self.timeout, allow_redirects=False,
+        )
+        return response.status_code == 302
+
+    def run_once(self):
+        """Walk the funnel once; returns False if a step failed."""
+        slug, capacity = random.choice(self.facilities)
+        if not self.timed('facility_list', 'GET', '/facilities/', {200}):
+            return False
+        if not self.timed('check_availability', 'GET', f'/reservations/check/{slug}/', {200}):
+            return False
+
+        # Random short stay in the next two years; taken dates re-render the form.
+        check_in = datetime.date.today() + datetime.timedelta(days=random.randint(1, 730))
+        check_out = check_in + datetime.timedelta(days=random.randint(1, 3))
+        response = self.timed('create_reservation', 'POST', f'/reservations/book/{slug}/', {200, 302}, data={
+            'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(),
+            'guests': random.randint(1, capacity),
+            'special_requests': '',
+            'csrfmiddlewaretoken': self._csrf(),
+        })
+        if response is None:
+            return False
+        if response.status_code == 200:
+            self.timings.conflict()
+            return True
+        reservation_pk = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+        response = self.timed('initiate_payment', 'GET', f'/payments/pay/{reservation_pk}/', {302})
+        if response is None:
+            return False
+        checkout_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+        event = {'data': {
+            'id': f'evt_{uuid.uuid4().hex}',
+            'attributes': {
+                'type': 'checkout_session.payment.paid',
+                'data': {'id': checkout_id},
+            },
+        }}
+        return self.timed('paymongo_webhook', 'POST', '/payments/webhook/', {200}, json=event) is not None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(cwd, env, workers=1, asgi=False, threads=1):
+    """
+    Start gunicorn for this project on a free local port and wait until it
+    answers. Returns (process, base_url); the caller terminates the process.
+    """
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads), '--log-level', 'warning']
+    if asgi:
+        command += ['--worker-class', 'uvicorn_worker.UvicornWorker', 'backend.asgi:application']
+    else:
+        command += ['backend.wsgi:application']
+    # Every virtual guest comes from 127.0.0.1, so rate limits are off.
+    server = subprocess.Popen(command, cwd=cwd, env={**os.environ, 'RATELIMIT_ENABLED': 'False', **env})
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {server.returncode}.')
+        try:
+            requests.get(f'{base_url}/accounts/login/', timeout=1)
+            return server, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start in time.')
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait(timeout=10)
+
+
+def run_load(base_url, credentials, facilities, concurrency, duration):
+    """
+    Drive ``concurrency`` virtual users (taken from ``credentials``, a list
+    of (username, password)) through the funnel for ``duration`` seconds.
+    Returns (StepTimings, completed funnels, elapsed seconds).
+    """
+    timings = StepTimings()
+    users = [
+        FunnelUser(base_url, username, password, facilities, timings)
+        for username, password in credentials[:concurrency]
+    ]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if not all(pool.map(lambda user: user.login(), users)):
+            raise RuntimeError('A virtual user could not log in.')
+
+        deadline = time.monotonic() + duration
+        completed = [0] * len(users)
+
+        def loop(index):
+            while time.monotonic() < deadline:
+                if users[index].run_once():
+                    completed[index] += 1
+
+        began = time.perf_counter()
+        list(pool.map(loop, range(len(users))))
+        elapsed = time.perf_counter() - began
+    return timings, sum(completed), elapsed
+
+
+def compare(baseline, current, threshold):
+    """
+    Steps whose p50 or p95 got more than ``threshold`` (a fraction) slower
+    than in ``baseline``, as a list of human-readable lines.
+    """
+    regressions = []
+    for step, now in current['steps'].items():
+        before = baseline.get('steps', {}).get(step)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            old, new = before.get(metric), now.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(
+                    f"{step} {metric}: {old:.1f} -> {new:.1f} ms (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def write_results(path, results):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+        fh.write('\n')
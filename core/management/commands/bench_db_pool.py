@@ -0,0 +1,102 @@
+"""
+Requests per second with and without database connection pooling.
+
+Runs gunicorn against the PostgreSQL in ``DATABASE_URL`` once per
+connection mode and has seeded guests load "My Reservations" (a few
+queries per request) for ``--duration`` seconds:
+
+* ``connect``    a new connection per request (DB_CONN_MAX_AGE=0)
+* ``persistent`` one kept-alive, health-checked connection per thread
+* ``psycopg``    Django's psycopg pool (DB_POOL=psycopg)
+
+Run ``seed_benchmark_data`` first; needs ``psycopg[pool]`` for the last mode.
+
+Usage:
+    DATABASE_URL=postgres://localhost/resort python manage.py bench_db_pool --workers 4 --threads 4
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.loadtest import FunnelUser, StepTimings, start_server, stop_server
+from core.management.commands.seed_benchmark_data import BENCH_PASSWORD, BENCH_PREFIX
+
+STEP = 'my_reservations'
+
+MODES = {
+    'connect': {'DB_POOL': 'off', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'off'},
+    'psycopg': {'DB_POOL': 'psycopg'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/s against PostgreSQL with and without connection pooling.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES))
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds per mode.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Set DATABASE_URL to a PostgreSQL database to compare pooling modes.')
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+        usernames = list(
+            get_user_model().objects.filter(username__startswith=BENCH_PREFIX)
+            .order_by('pk').values_list('username', flat=True)[:options['concurrency']]
+        )
+        if len(usernames) < options['concurrency']:
+            raise CommandError('Not enough seeded data; run "manage.py seed_benchmark_data" first.')
+
+        self.stdout.write(
+            f"{options['workers']} workers x {options['threads']} threads, "
+            f"{options['concurrency']} guests, {options['duration']:.0f}s per mode"
+        )
+        self.stdout.write(f"{'mode':<11} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for mode in modes:
+            env = {
+                **MODES[mode],
+                'WEB_CONCURRENCY': str(options['workers']),
+                'WEB_THREADS': str(options['threads']),
+            }
+            try:
+                server, base_url = start_server(
+                    settings.BASE_DIR, env, workers=options['workers'], threads=options['threads'],
+                )
+            except RuntimeError as e:
+                raise CommandError(f'{mode}: {e}')
+            try:
+                self._run_mode(mode, base_url, usernames, options['duration'])
+            finally:
+                stop_server(server)
+
+    def _run_mode(self, mode, base_url, usernames, duration):
+        timings = StepTimings(steps=(STEP,))
+        guests = [FunnelUser(base_url, username, BENCH_PASSWORD, [], timings) for username in usernames]
+        with ThreadPoolExecutor(max_workers=len(guests)) as pool:
+            if not all(pool.map(lambda guest: guest.login(), guests)):
+                raise CommandError('A guest could not log in.')
+
+            def request_loop(guest):
+                deadline = time.monotonic() + duration
+                while time.monotonic() < deadline:
+                    guest.timed(STEP, 'GET', '/reservations/my/', {200})
+
+            list(pool.map(request_loop, guests))
+
+        row = timings.summary()[STEP]
+        self.stdout.write(
+            f"{mode:<11} {row['count'] / duration:>8.1f} {row['p50_ms'] or 0:>9.1f} "
+            f"{row['p95_ms'] or 0:>9.1f} {row['errors']:>7}"
+        )
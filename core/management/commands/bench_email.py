@@ -0,0 +1,79 @@
+"""
+Compare request-path latency of sending email inline versus queuing it.
+
+Runs against a local SMTP sink with a simulated handshake delay, so no
+real mail is sent, and in a throwaway test database, so the dispatcher
+only ever sees the benchmark's own emails (mail queued for guests stays
+in the real outbox). Usage: python manage.py bench_email --count 20
+"""
+
+import statistics
+import time
+
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.outbox import drain_outbox, queue_email
+from core.smtp_sink import SMTPSink
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    return f"p50={statistics.median(ordered) * 1000:.1f}ms p95={p95 * 1000:.1f}ms"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark inline SMTP sends against outbox inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20)
+        parser.add_argument('--connect-delay', type=float, default=0.3,
+                            help='Simulated SMTP handshake time in seconds.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._bench(options['count'], options['connect_delay'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _bench(self, count, connect_delay):
+        sink = SMTPSink(connect_delay=connect_delay).start()
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST=sink.host, EMAIL_PORT=sink.port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        try:
+            with smtp:
+                inline = []
+                for i in range(count):
+                    began = time.perf_counter()
+                    send_mail(f'Inline {i}', 'Benchmark', 'bench@localhost', ['admin@localhost'])
+                    inline.append(time.perf_counter() - began)
+
+                queued = []
+                for i in range(count):
+                    began = time.perf_counter()
+                    queue_email(f'Queued {i}', 'Benchmark', ['admin@localhost'], 'bench@localhost')
+                    queued.append(time.perf_counter() - began)
+
+                connections_before = sink.connections
+                began = time.perf_counter()
+                sent, retried, failed = drain_outbox(batch_size=50)
+                drain_time = time.perf_counter() - began
+                drain_connections = sink.connections - connections_before
+        finally:
+            sink.stop()
+
+        self.stdout.write(f"inline send_mail:  {_summary(inline)}")
+        self.stdout.write(f"outbox insert:     {_summary(queued)}")
+        self.stdout.write(
+            f"dispatcher: sent={sent} retried={retried} failed={failed} "
+            f"in {drain_time:.2f}s over {drain_connections} SMTP connection(s)"
+        )
@@ -0,0 +1,125 @@
+"""
+Load-test the booking funnel over HTTP and compare against a baseline.
+
+Starts the fake PayMongo API and a gunicorn serving this project (PayMongo
+pointed at the fake, email on the in-memory backend), then has
+``--concurrency`` seeded guests walk facility_list -> check_availability ->
+create_reservation -> initiate_payment -> paymongo_webhook for
+``--duration`` seconds. ``--asgi`` serves backend.asgi on uvicorn workers
+instead of backend.wsgi; ``--url`` loads an already running server. Run
+``seed_benchmark_data`` first.
+
+Per-step p50/p95/p99 latencies are written to ``--output``; with
+``--compare`` the run fails when a step's p50 or p95 is more than
+``--threshold`` slower than in the given baseline.
+
+Usage:
+    python manage.py seed_benchmark_data
+    python manage.py bench_funnel --output bench/funnel-baseline.json
+    python manage.py bench_funnel --compare bench/funnel-baseline.json --threshold 0.2
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.loadtest import STEPS, compare, run_load, start_server, stop_server, write_results
+from core.management.commands.seed_benchmark_data import BENCH_PASSWORD, BENCH_PREFIX
+from facilities.models import Facility
+from payments.fake_paymongo import FakePayMongo
+
+
+class Command(BaseCommand):
+    help = 'Drive the booking funnel against gunicorn and report per-step latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help='Base URL of a running server; by default gunicorn is started.')
+        parser.add_argument('--workers', type=int, default=4, help='gunicorn workers.')
+        parser.add_argument('--asgi', action='store_true', help='Serve backend.asgi on uvicorn workers.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load.')
+        parser.add_argument('--paymongo-latency', type=float, default=0.05)
+        parser.add_argument('--output', default=None, help='Write the results as JSON here.')
+        parser.add_argument('--compare', default=None, help='Baseline JSON to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed p50/p95 slowdown as a fraction (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        credentials = [
+            (username, BENCH_PASSWORD)
+            for username in get_user_model().objects.filter(
+                username__startswith=BENCH_PREFIX,
+            ).order_by('pk').values_list('username', flat=True)[:options['concurrency']]
+        ]
+        facilities = list(
+            Facility.objects.filter(slug__startswith=BENCH_PREFIX, is_available=True)
+            .values_list('slug', 'capacity')
+        )
+        if len(credentials) < options['concurrency'] or not facilities:
+            raise CommandError('Not enough seeded data; run "manage.py seed_benchmark_data" first.')
+
+        fake = server = None
+        base_url = options['url']
+        try:
+            if base_url is None:
+                fake = FakePayMongo(latency=options['paymongo_latency']).start()
+                try:
+                    server, base_url = start_server(settings.BASE_DIR, {
+                        'PAYMONGO_API_URL': fake.base_url,
+                        'PAYMONGO_SECRET_KEY': 'sk_test_bench',
+                        'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+                    }, workers=options['workers'], asgi=options['asgi'])
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+            self.stdout.write(
+                f"Loading {base_url} with {options['concurrency']} guests for {options['duration']:.0f}s..."
+            )
+            timings, funnels, elapsed = run_load(
+                base_url, credentials, facilities, options['concurrency'], options['duration'],
+            )
+        finally:
+            if server is not None:
+                stop_server(server)
+            if fake is not None:
+                fake.stop()
+
+        results = {
+            'recorded_at': timezone.now().isoformat(),
+            'server': 'asgi' if options['asgi'] else 'wsgi',
+            'concurrency': options['concurrency'],
+            'duration_s': round(elapsed, 2),
+            'funnels': funnels,
+            'funnels_per_s': round(funnels / elapsed, 2) if elapsed else 0,
+            'booking_conflicts': timings.conflicts,
+            'steps': timings.summary(),
+        }
+        self._report(results)
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            regressions = compare(baseline, results, options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f"  {line}"))
+                raise CommandError(f"{len(regressions)} latency regression(s) against {options['compare']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{results['funnels']} funnels in {results['duration_s']}s "
+            f"({results['funnels_per_s']}/s), {results['booking_conflicts']} booking conflicts"
+        )
+        self.stdout.write(f"{'step':<20} {'count':>7} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for step in STEPS:
+            row = results['steps'][step]
+            cells = [f"{row[key]:>9.1f}" if row[key] is not None else f"{'-':>9}"
+                     for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+            self.stdout.write(f"{step:<20} {row['count']:>7} {row['errors']:>7} {' '.join(cells)}")
@@ -0,0 +1,58 @@
+"""
+Compare image bytes of the public card pages with and without derivatives.
+
+For every image shown on the home page, facility list and rates page, the
+original upload size is compared with the rendition a browser would pick
+from the srcset at the given display width.
+
+Usage: python manage.py bench_page_weight --width 400 --dpr 2
+"""
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.images import get_renditions
+from core.models import RatePackage
+from facilities.models import Facility
+
+
+def _pick(widths, needed):
+    """The smallest rendition at least ``needed`` pixels wide, else the largest."""
+    ordered = sorted(widths.items(), key=lambda item: int(item[0]))
+    for width, name in ordered:
+        if int(width) >= needed:
+            return name
+    return ordered[-1][1]
+
+
+class Command(BaseCommand):
+    help = 'Report page image weight for originals versus responsive renditions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=400, help='CSS pixel width of a card image.')
+        parser.add_argument('--dpr', type=float, default=2.0, help='Device pixel ratio.')
+
+    def handle(self, *args, **options):
+        needed = int(options['width'] * options['dpr'])
+        available = Facility.objects.filter(is_available=True)
+        pages = {
+            'home': [f.image for f in available[:6]],
+            'facility_list': [f.image for f in available],
+            'rates': [p.photo for p in RatePackage.objects.all()],
+        }
+
+        for page, images in pages.items():
+            images = [image for image in images if image]
+            totals = {'original': 0, 'jpeg': 0, 'webp': 0, 'avif': 0}
+            for image in images:
+                original = default_storage.size(image.name)
+                totals['original'] += original
+                renditions = get_renditions(image.name)
+                for fmt in ('jpeg', 'webp', 'avif'):
+                    widths = renditions.get(fmt)
+                    totals[fmt] += default_storage.size(_pick(widths, needed)) if widths else original
+
+            self.stdout.write(f"{page}: {len(images)} images")
+            for label, size in totals.items():
+                saved = 100 * (1 - size / totals['original']) if totals['original'] else 0
+                self.stdout.write(f"  {label:<9}{size / 1024:>10.1f} KiB  ({saved:.0f}% smaller)")
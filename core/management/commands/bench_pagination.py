@@ -0,0 +1,85 @@
+"""
+Compare OFFSET and keyset pagination of "My Reservations" at growing depth.
+
+Builds a throwaway test database holding one guest with many bookings and
+times fetching page N both ways. OFFSET has to walk past every earlier
+row; keyset seeks straight to the cursor through
+reservation_user_created_idx.
+
+Usage:
+    python manage.py bench_pagination --rows 100000
+"""
+
+import datetime
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_page
+from facilities.models import Facility
+from reservations.models import Reservation
+from reservations.views import MY_RESERVATIONS_FIELDS, RESERVATION_ORDERING
+
+
+class Command(BaseCommand):
+    help = 'Time page N of a long reservation list with OFFSET vs keyset pagination.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self._run(options['rows'], options['repeat'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def _run(self, rows, repeat):
+        user = get_user_model().objects.create_user(username='bench', password='bench')
+        facility, = Facility.objects.bulk_create([Facility(
+            name='Bench', slug='bench', description='', capacity=10, price_per_day=Decimal('1000'),
+        )])
+        start = datetime.date(2000, 1, 1)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=user, facility=facility, total_price=Decimal('1000'),
+                check_in=start + datetime.timedelta(days=i),
+                check_out=start + datetime.timedelta(days=i + 1),
+            )
+            for i in range(rows)
+        ], batch_size=2000)
+
+        queryset = (
+            Reservation.objects.filter(user=user)
+            .select_related('facility')
+            .only(*MY_RESERVATIONS_FIELDS)
+            .order_by(*RESERVATION_ORDERING)
+        )
+        self.stdout.write(f"{rows} reservations, {DEFAULT_PAGE_SIZE} per page (ms per page)")
+        self.stdout.write(f"{'page':>8} {'offset':>10} {'keyset':>10}")
+        last_page = rows // DEFAULT_PAGE_SIZE
+        for page in (1, 10, 100, 1000, last_page // 2, last_page):
+            if page < 1 or page > last_page:
+                continue
+            offset = (page - 1) * DEFAULT_PAGE_SIZE
+            cursor = encode_cursor(queryset[offset - 1], RESERVATION_ORDERING) if offset else None
+
+            began = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset[offset:offset + DEFAULT_PAGE_SIZE])
+            offset_ms = (time.perf_counter() - began) / repeat * 1000
+
+            began = time.perf_counter()
+            for _ in range(repeat):
+                keyset_page(queryset, RESERVATION_ORDERING, cursor)
+            keyset_ms = (time.perf_counter() - began) / repeat * 1000
+
+            self.stdout.write(f"{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
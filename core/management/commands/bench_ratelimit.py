@@ -0,0 +1,66 @@
+"""
+Cost of one rate-limit check, per counter store.
+
+Times ``core.ratelimit.check`` for the login limits (IP and username) with
+counters in the configured ``ratelimit`` cache and in the in-process
+fallback store, and puts that next to one password check at the current
+hasher settings: a rejected login costs the former instead of the latter.
+
+Each check uses a fresh IP and username under a one-off scope, so the
+numbers include creating counters, no request is over its limit and the
+bench leaves live counters alone (its own expire with their window).
+
+Usage:
+    python manage.py bench_ratelimit
+    python manage.py bench_ratelimit --checks 5000
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core import ratelimit
+
+LIMITS = {'ip': '20/m'}
+FAILURES = {'username': '5/5m'}
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost of a rate-limit check against the cache and in-memory stores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        alias = settings.RATELIMIT_CACHE_ALIAS
+        backend = caches[alias].__class__.__name__
+        factory = RequestFactory()
+        scope = f'bench-{uuid.uuid4().hex[:8]}'
+        requests = [
+            factory.post('/accounts/login/', {'username': f'guest{i}'},
+                         REMOTE_ADDR=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}')
+            for i in range(options['checks'])
+        ]
+
+        self.stdout.write(f"{'store':<34} {'us/check':>9} {'checks/s':>10}")
+        self._time(f'cache ({alias}: {backend})', scope, requests, ratelimit.CacheStore(alias))
+        self._time('in-memory fallback', scope, requests, ratelimit.memory_store)
+
+        encoded = make_password('bench-password')
+        began = time.perf_counter()
+        check_password('bench-password', encoded)
+        hash_us = (time.perf_counter() - began) * 1e6
+        label = f"password check ({encoded.split('$')[0]})"
+        self.stdout.write(f"{label:<34} {hash_us:>9.0f} {1e6 / hash_us:>10.1f}")
+
+    def _time(self, label, scope, requests, store):
+        began = time.perf_counter()
+        for request in requests:
+            ratelimit.check(request, scope, LIMITS, store=store, failures=FAILURES)
+        per_check = (time.perf_counter() - began) / len(requests) * 1e6
+        self.stdout.write(f"{label:<34} {per_check:>9.1f} {1e6 / per_check:>10.0f}")
@@ -0,0 +1,78 @@
+"""
+Time from starting the web process to its first 200 on /readyz.
+
+``legacy`` is the old Procfile line (migrate, createsuperuser, then
+gunicorn on the WSGI app); ``current`` is the deployed web process,
+``backend.asgi`` on uvicorn workers with gunicorn_asgi.conf.py, the
+migrations having moved to ``manage.py bootstrap`` in the release phase.
+Each mode is started ``--runs`` times.
+
+Usage:
+    python manage.py bench_startup --runs 5 --workers 2
+"""
+
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import free_port
+
+MODES = {
+    'legacy': (
+        '{python} manage.py migrate && {python} manage.py createsuperuser --noinput || true '
+        '&& {python} -m gunicorn backend.wsgi --bind 127.0.0.1:{port}'
+    ),
+    'current': (
+        '{python} -m gunicorn -c gunicorn_asgi.conf.py backend.asgi:application '
+        '--bind 127.0.0.1:{port}'
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure time-to-first-200 of the web process for the old and new boot paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--timeout', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'WEB_CONCURRENCY': str(options['workers'])}
+        self.stdout.write(f"{'mode':<8} {'median s':>9} {'min s':>7} {'max s':>7}")
+        for mode, template in MODES.items():
+            times = [
+                self._time_to_ready(template, env, options['timeout'])
+                for _ in range(options['runs'])
+            ]
+            self.stdout.write(
+                f"{mode:<8} {statistics.median(times):>9.2f} {min(times):>7.2f} {max(times):>7.2f}"
+            )
+
+    def _time_to_ready(self, template, env, timeout):
+        port = free_port()
+        command = template.format(python=sys.executable, port=port)
+        began = time.perf_counter()
+        process = subprocess.Popen(
+            command, shell=True, cwd=settings.BASE_DIR, env=env, start_new_session=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.perf_counter() - began < timeout:
+                try:
+                    if requests.get(f'http://127.0.0.1:{port}/readyz', timeout=1).status_code == 200:
+                        return time.perf_counter() - began
+                except requests.RequestException:
+                    pass
+                time.sleep(0.02)
+            raise CommandError(f'No 200 from /readyz within {timeout:.0f}s: {command}')
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=30)
@@ -0,0 +1,81 @@
+"""
+Release-phase setup: apply migrations and create the admin account, once.
+
+Safe to run on every deploy and from several instances at the same time.
+On PostgreSQL the work happens under a session advisory lock, so
+concurrent runs queue up, and each run checks for pending migrations
+before calling ``migrate``. The superuser comes from
+DJANGO_SUPERUSER_USERNAME / _EMAIL / _PASSWORD and is only created if
+missing.
+
+Usage:
+    python manage.py bootstrap
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Arbitrary application-wide key for pg_advisory_lock().
+ADVISORY_LOCK_ID = 0x5265736f7274  # "Resort"
+
+
+@contextmanager
+def advisory_lock(connection, lock_id=ADVISORY_LOCK_ID):
+    """Hold a PostgreSQL session advisory lock; a no-op on other databases."""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+def pending_migrations(connection):
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+class Command(BaseCommand):
+    help = 'Apply pending migrations and create the superuser, under a database lock.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        began = time.perf_counter()
+        with advisory_lock(connection):
+            plan = pending_migrations(connection)
+            if plan:
+                self.stdout.write(f"Applying {len(plan)} migration(s)...")
+                call_command('migrate', database=options['database'], interactive=False, verbosity=1)
+            else:
+                self.stdout.write('No migrations to apply.')
+            self._ensure_superuser(options['database'])
+        self.stdout.write(self.style.SUCCESS(f"Bootstrap finished in {time.perf_counter() - began:.2f}s"))
+
+    def _ensure_superuser(self, database):
+        username = os.environ.get('DJANGO_SUPERUSER_USERNAME')
+        password = os.environ.get('DJANGO_SUPERUSER_PASSWORD')
+        if not (username and password):
+            return
+        User = get_user_model()
+        if User.objects.using(database).filter(username=username).exists():
+            return
+        User.objects.db_manager(database).create_superuser(
+            username=username,
+            email=os.environ.get('DJANGO_SUPERUSER_EMAIL', ''),
+            password=password,
+        )
+        self.stdout.write(f"Created superuser {username}.")
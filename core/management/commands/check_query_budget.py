@@ -0,0 +1,136 @@
+"""
+Fail when a list/detail view's query count grows with its data.
+
+Builds a throwaway test database, grows the fixture (reservations,
+payments, gallery images, tours, facilities) through each size and checks
+every view against a constant query budget with a cold cache.
+
+Usage:
+    python manage.py check_query_budget
+    python manage.py check_query_budget --sizes 10 100 1000 10000
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.query_budget import run_budgets
+from facilities.models import Facility, FacilityImage, VirtualTour
+from payments.models import Payment
+from reservations.models import Reservation
+
+# Session + user lookups are 2 of these on authenticated pages.
+BUDGETS = (
+    ('my reservations', reverse('reservations:my_reservations'), 3),
+    ('reservations json', reverse('reservations:my_reservations_page'), 3),
+    ('payment history', reverse('payments:history'), 3),
+    ('payments json', reverse('payments:history_page'), 3),
+    ('facility list', reverse('facilities:list'), 4),
+    ('facilities json', reverse('facilities:list_page'), 4),
+    ('facility detail', reverse('facilities:detail', kwargs={'slug': 'budget-facility'}), 6),
+    ('virtual tour', reverse('facilities:virtual_tour', kwargs={'slug': 'budget-facility'}), 4),
+)
+
+
+def locmem_caches():
+    """A separate in-memory cache for every configured alias (pages, sessions, ...)."""
+    return {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in settings.CACHES
+    }
+
+
+class Fixture:
+    """Grows one user's bookings and one facility's media to a target size."""
+
+    def __init__(self):
+        self.user = get_user_model().objects.create_user(
+            username='budget', email='budget@example.com', password='budget',
+        )
+        # bulk_create skips the save signals (derivatives, search index).
+        self.facility, = Facility.objects.bulk_create([Facility(
+            name='Budget Facility', slug='budget-facility', description='Query budget fixture.',
+            capacity=10, price_per_day=Decimal('1000'), image='facilities/budget.jpg',
+        )])
+        self.size = 0
+
+    def grow(self, size):
+        new = range(self.size, size)
+        self.size = size
+        start = datetime.date(2020, 1, 1)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                user=self.user, facility=self.facility,
+                check_in=start + datetime.timedelta(days=2 * i),
+                check_out=start + datetime.timedelta(days=2 * i + 1),
+                total_price=Decimal('1000'),
+            )
+            for i in new
+        ], batch_size=500)
+        Payment.objects.bulk_create([
+            Payment(reservation=reservation, user=self.user, amount=reservation.total_price)
+            for reservation in reservations
+        ], batch_size=500)
+        FacilityImage.objects.bulk_create([
+            FacilityImage(facility=self.facility, image=f'facilities/gallery/budget-{i}.jpg', order=i)
+            for i in new
+        ], batch_size=500)
+        VirtualTour.objects.bulk_create([
+            VirtualTour(
+                facility=self.facility, title=f'Tour {i}', media_type=VirtualTour.MediaType.IMAGE,
+                media_file=f'virtual_tours/budget-{i}.jpg', thumbnail=f'virtual_tours/thumbs/budget-{i}.jpg',
+                order=i,
+            )
+            for i in new
+        ], batch_size=500)
+        Facility.objects.bulk_create([
+            Facility(
+                name=f'Facility {i}', slug=f'facility-{i}', description='Fixture.',
+                capacity=10, price_per_day=Decimal('1000'), image=f'facilities/budget-{i}.jpg',
+            )
+            for i in new
+        ], batch_size=500)
+
+
+class Command(BaseCommand):
+    help = 'Check that list/detail views run a constant number of queries as data grows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(CACHES=locmem_caches()):
+                failures = self._run(sorted(options['sizes']))
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f"{failures} view(s) over their query budget.")
+        self.stdout.write(self.style.SUCCESS('All views within their query budgets.'))
+
+    def _run(self, sizes):
+        fixture = Fixture()
+        client = Client()
+        client.force_login(fixture.user)
+
+        failures = 0
+        for size, label, count, error in run_budgets(client, BUDGETS, fixture.grow, sizes, reset=cache.clear):
+            if error:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"[{size:>6} rows] {label}: {error}"))
+            else:
+                self.stdout.write(f"[{size:>6} rows] {label:18} {count} queries")
+        return failures
@@ -0,0 +1,89 @@
+"""
+Generate responsive image derivatives for stored images, and delete the
+renditions of images that are no longer used.
+
+Without ``--watch`` this is a one-off backfill of every image that has no
+renditions yet. With ``--watch`` it is the background worker: it polls for
+images queued by admin saves (and failed ones due for a retry), generates
+them, and prunes replaced ones. Pruning scans every image field and
+rendition record, so the worker prunes on the passes that build something
+(a replaced upload leaves renditions behind) and otherwise every
+``--prune-interval`` seconds, rather than on every idle poll.
+
+Usage:
+    python manage.py generate_image_derivatives --workers 4 [--force]
+    python manage.py generate_image_derivatives --watch     # run forever, polling every 5s
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.images import backfill_derivatives, get_renditions, image_sources, pending_sources, prune_derivatives
+from core.page_cache import invalidate_public_pages
+
+
+class Command(BaseCommand):
+    help = 'Generate resized AVIF/WebP/JPEG renditions for uploaded images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (defaults to the CPU count).')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate images that already have derivatives.')
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep running, generating images as they are queued.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is queued (with --watch).')
+        parser.add_argument('--prune-interval', type=float, default=600.0,
+                            help='Seconds between prunes when nothing was built (with --watch).')
+
+    def handle(self, *args, **options):
+        if options['watch']:
+            last_prune = None
+            try:
+                while True:
+                    close_old_connections()
+                    names = pending_sources()
+                    prune = (
+                        bool(names) or last_prune is None
+                        or time.monotonic() - last_prune >= options['prune_interval']
+                    )
+                    if prune:
+                        last_prune = time.monotonic()
+                    if not self.run_pass(names, options['workers'], prune):
+                        time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                pass
+            return
+
+        names = image_sources()
+        if not options['force']:
+            names = [name for name in names if not get_renditions(name)]
+        if not self.run_pass(names, options['workers']):
+            self.stdout.write('Nothing to generate.')
+
+    def run_pass(self, names, workers, prune=True):
+        """Generate ``names`` and, with ``prune``, delete unused renditions; return whether anything changed."""
+        pruned = prune_derivatives() if prune else 0
+        if pruned:
+            self.stdout.write(f"Pruned renditions of {pruned} unused images")
+        if not names:
+            if pruned:
+                invalidate_public_pages()
+            return bool(pruned)
+
+        began = time.perf_counter()
+        failures = 0
+        for name, error in backfill_derivatives(names, workers=workers):
+            if error:
+                failures += 1
+                self.stderr.write(f"{name}: {error}")
+        elapsed = time.perf_counter() - began
+        # Cached pages still point at the original images.
+        invalidate_public_pages()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated derivatives for {len(names) - failures}/{len(names)} images in {elapsed:.2f}s"
+        ))
+        return True
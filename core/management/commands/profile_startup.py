@@ -0,0 +1,139 @@
+"""
+Profile cold-start cost: how long ``django.setup()`` and loading the URLconf
+(which imports every view) take in a fresh interpreter, and which packages
+the time goes to according to ``python -X importtime``.
+
+Timings are the median of ``--runs`` fresh processes. ``--output`` records
+them as a baseline; ``--compare`` fails when startup or any package's
+import time grew by more than ``--threshold`` (and at least ``--min-ms``)
+against it. ``--production`` starts with DEBUG off, as the web dynos do.
+
+Usage:
+    python manage.py profile_startup --production
+    python manage.py profile_startup --production --output bench/startup-baseline.json
+    python manage.py profile_startup --production --compare bench/startup-baseline.json
+"""
+
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.loadtest import write_results
+
+STARTUP_SCRIPT = '''
+import json, os, time
+began = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+done = time.perf_counter()
+print(json.dumps({'setup_ms': (setup_done - began) * 1000, 'urls_ms': (done - setup_done) * 1000}))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def _run(extra_args, env):
+    return subprocess.run(
+        [sys.executable, *extra_args, '-c', STARTUP_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def package_import_times(stderr):
+    """Sum ``-X importtime`` self times (ms) and module counts per top-level package."""
+    times = defaultdict(float)
+    counts = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        package = match.group(4).split('.')[0]
+        times[package] += int(match.group(1)) / 1000
+        counts[package] += 1
+    return times, counts
+
+
+class Command(BaseCommand):
+    help = 'Measure django.setup() time and per-package import cost in a fresh process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help='Packages to list.')
+        parser.add_argument('--production', action='store_true', help='Start with DEBUG=False.')
+        parser.add_argument('--output', default=None, help='Write the results as JSON here.')
+        parser.add_argument('--compare', default=None, help='Baseline JSON to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed slowdown as a fraction (0.25 = 25%%).')
+        parser.add_argument('--min-ms', type=float, default=10.0,
+                            help='Ignore changes smaller than this many milliseconds.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        if options['production']:
+            env['DEBUG'] = 'False'
+
+        runs = [json.loads(_run([], env).stdout) for _ in range(options['runs'])]
+        setup_ms = statistics.median(run['setup_ms'] for run in runs)
+        urls_ms = statistics.median(run['urls_ms'] for run in runs)
+        times, counts = package_import_times(_run(['-X', 'importtime'], env).stderr)
+
+        results = {
+            'recorded_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'production': options['production'],
+            'setup_ms': round(setup_ms, 1),
+            'urls_ms': round(urls_ms, 1),
+            'total_ms': round(setup_ms + urls_ms, 1),
+            'packages': {package: round(ms, 1) for package, ms in sorted(times.items())},
+        }
+
+        self.stdout.write(
+            f"django.setup() {setup_ms:.0f} ms + URLconf {urls_ms:.0f} ms = {setup_ms + urls_ms:.0f} ms "
+            f"(median of {options['runs']}, {'production' if options['production'] else 'development'} settings)"
+        )
+        self.stdout.write(f"Import time by package ({sum(counts.values())} modules, {sum(times.values()):.0f} ms):")
+        for package, ms in sorted(times.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<28} {ms:>8.1f} ms {counts[package]:>5} modules")
+
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self._compare(results, options)
+
+    def _compare(self, results, options):
+        with open(options['compare']) as fh:
+            baseline = json.load(fh)
+        if baseline.get('production') != results['production']:
+            raise CommandError('The baseline was recorded with different --production settings.')
+
+        def grew(old, new):
+            return new - old >= options['min_ms'] and new > old * (1 + options['threshold'])
+
+        regressions = []
+        for key in ('setup_ms', 'urls_ms', 'total_ms'):
+            if grew(baseline[key], results[key]):
+                regressions.append(f"{key}: {baseline[key]:.0f} -> {results[key]:.0f} ms")
+        for package, ms in results['packages'].items():
+            old = baseline['packages'].get(package, 0.0)
+            if grew(old, ms):
+                regressions.append(f"import {package}: {old:.0f} -> {ms:.0f} ms")
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"  {line}"))
+            raise CommandError(f"{len(regressions)} startup regression(s) against {options['compare']}.")
+        self.stdout.write(self.style.SUCCESS(f"No startup regressions against {options['compare']}."))
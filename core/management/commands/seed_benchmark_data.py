@@ -0,0 +1,200 @@
+"""
+Seed the database with a realistic volume of data for load testing.
+
+Creates guest accounts (all sharing one password so the load generator can
+log in as any of them), facilities modelled on the ones in
+populate_facilities.py, and years of non-overlapping reservations with
+their payments, then rebuilds the occupancy bitmaps, the report rollups
+and the search index.
+Every seeded row is marked with the ``bench-`` prefix and is removed again
+by ``--clear``.
+
+Usage:
+    python manage.py seed_benchmark_data --users 5000 --facilities 300 --years 3
+"""
+
+import ast
+import datetime
+import random
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.page_cache import invalidate_public_pages
+from facilities.models import Facility
+from facilities.search import rebuild_index
+from payments.models import Payment
+from reservations.models import Reservation
+from reservations.occupancy import months_spanned, rebuild_months
+from reservations.search import invalidate_search_cache
+
+BENCH_PREFIX = 'bench-'
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 2000
+
+VARIANTS = ('North', 'South', 'East', 'West', 'Garden', 'Beachfront', 'Hillside', 'Lagoon')
+
+
+def facility_templates():
+    """
+    The ``facilities_data`` list of populate_facilities.py. The script saves
+    facilities at import time, so the literal is read without running it.
+    """
+    source = (Path(settings.BASE_DIR) / 'populate_facilities.py').read_text()
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], 'id', None) == 'facilities_data':
+            return ast.literal_eval(node.value)
+    raise ValueError('populate_facilities.py has no facilities_data list.')
+
+
+def bench_username(index):
+    return f'{BENCH_PREFIX}user-{index}'
+
+
+class Command(BaseCommand):
+    help = 'Seed users, facilities and years of reservations for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--facilities', type=int, default=300)
+        parser.add_argument('--years', type=int, default=3,
+                            help='Years of booking history before today.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--clear', action='store_true',
+                            help='Only delete previously seeded data.')
+
+    def handle(self, *args, **options):
+        self._clear()
+        if options['clear']:
+            self.stdout.write('Removed seeded benchmark data.')
+            return
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self._seed_users(options['users'])
+            facilities = self._seed_facilities(options['facilities'], rng)
+            reservations, payments = self._seed_reservations(users, facilities, options['years'], rng)
+
+        self.stdout.write('Rebuilding occupancy, report rollups and search index...')
+        self._rebuild_occupancy(facilities)
+        call_command('backfill_rollups', verbosity=0)
+        rebuild_index()
+        invalidate_search_cache()
+        invalidate_public_pages()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(facilities)} facilities, "
+            f"{reservations} reservations and {payments} payments "
+            f"(password for {bench_username(0)}..: {BENCH_PASSWORD})"
+        ))
+
+    def _clear(self):
+        User = get_user_model()
+        Reservation.objects.filter(facility__slug__startswith=BENCH_PREFIX).delete()
+        Facility.objects.filter(slug__startswith=BENCH_PREFIX).delete()
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+
+    def _seed_users(self, count):
+        User = get_user_model()
+        # Hashing is deliberately slow; every account shares the one hash.
+        password = make_password(BENCH_PASSWORD)
+        User.objects.bulk_create([
+            User(
+                username=bench_username(i),
+                email=f'{bench_username(i)}@example.com',
+                first_name='Bench',
+                last_name=f'Guest {i}',
+                password=password,
+            )
+            for i in range(count)
+        ], batch_size=BATCH_SIZE)
+        return list(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+
+    def _seed_facilities(self, count, rng):
+        templates = facility_templates()
+        facilities = []
+        for i in range(count):
+            data = templates[i % len(templates)]
+            name = f"{data['name']} {VARIANTS[i // len(templates) % len(VARIANTS)]} {i // len(templates) + 1}"
+            facilities.append(Facility(
+                name=name,
+                slug=f'{BENCH_PREFIX}{slugify(name)}',
+                description=data['description'],
+                capacity=data['capacity'],
+                price_per_day=Decimal(data['price_per_day']),
+                map_x=min(100, max(0, data['map_x'] + rng.uniform(-5, 5))),
+                map_y=min(100, max(0, data['map_y'] + rng.uniform(-5, 5))),
+            ))
+        Facility.objects.bulk_create(facilities, batch_size=BATCH_SIZE)
+        return list(Facility.objects.filter(slug__startswith=BENCH_PREFIX).values('pk', 'capacity', 'price_per_day'))
+
+    def _seed_reservations(self, users, facilities, years, rng):
+        """
+        Walk each facility's calendar from ``years`` ago to a few months
+        ahead, placing back-to-back stays separated by random gaps.
+        """
+        today = timezone.localdate()
+        start = today - datetime.timedelta(days=365 * years)
+        horizon = today + datetime.timedelta(days=90)
+        Status = Reservation.Status
+
+        reservations = []
+        for facility in facilities:
+            day = start + datetime.timedelta(days=rng.randint(0, 14))
+            while day < horizon:
+                nights = rng.randint(1, 5)
+                check_out = day + datetime.timedelta(days=nights)
+                if check_out <= today:
+                    status = rng.choices((Status.COMPLETED, Status.CANCELLED), (9, 1))[0]
+                else:
+                    status = rng.choice((Status.PENDING, Status.CONFIRMED, Status.PAID))
+                reservations.append(Reservation(
+                    user_id=rng.choice(users),
+                    facility_id=facility['pk'],
+                    check_in=day,
+                    check_out=check_out,
+                    guests=rng.randint(1, facility['capacity']),
+                    status=status,
+                    total_price=facility['price_per_day'] * nights,
+                ))
+                day = check_out + datetime.timedelta(days=rng.randint(0, 10))
+        Reservation.objects.bulk_create(reservations, batch_size=BATCH_SIZE)
+
+        paid = (
+            Reservation.objects.filter(
+                facility__slug__startswith=BENCH_PREFIX,
+                status__in=(Status.COMPLETED, Status.PAID),
+            ).values_list('pk', 'user_id', 'total_price', 'check_in')
+        )
+        payments = [
+            Payment(
+                reservation_id=pk, user_id=user_id, amount=amount,
+                payment_method=rng.choice(Payment.PaymentMethod.values),
+                status=Payment.Status.PAID,
+                paid_at=timezone.make_aware(datetime.datetime.combine(check_in, datetime.time(12))),
+            )
+            for pk, user_id, amount, check_in in paid.iterator()
+        ]
+        Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+        return len(reservations), len(payments)
+
+    def _rebuild_occupancy(self, facilities):
+        blocking = (
+            Reservation.objects.filter(
+                facility__slug__startswith=BENCH_PREFIX,
+                status__in=Reservation.BLOCKING_STATUSES,
+            ).values_list('facility_id', 'check_in', 'check_out')
+        )
+        months = {facility['pk']: set() for facility in facilities}
+        for facility_id, check_in, check_out in blocking.iterator():
+            months[facility_id].update(months_spanned(check_in, check_out))
+        for facility_id, facility_months in months.items():
+            rebuild_months(facility_id, facility_months)
@@ -0,0 +1,45 @@
+"""
+Background dispatcher for the email outbox.
+
+Usage:
+    python manage.py send_outbox            # run forever, polling every 5s
+    python manage.py send_outbox --once     # drain what is due, then exit
+"""
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails over a persistent SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the due emails and exit.')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                close_old_connections()
+                sent, retried, failed = drain_outbox(options['batch_size'], connection)
+                if sent or retried or failed:
+                    self.stdout.write(f"sent={sent} retried={retried} failed={failed}")
+                if options['once']:
+                    break
+                if not sent:
+                    # Nothing to do: release the SMTP connection while idle.
+                    connection.close()
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Every row written before this migration holds generated renditions.
+    ImageDerivative = apps.get_model('core', 'ImageDerivative')
+    ImageDerivative.objects.update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagederivative',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='imagederivative',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class RatePackage(models.Model):
@@ -38,4 +39,68 @@ class RatePackage(models.Model):
         return [line.strip() for line in self.inclusions.splitlines() if line.strip()]
 
 
-# Create your models here.
+class EmailOutbox(models.Model):
+    """
+    An outgoing email waiting for the background dispatcher.
+    Request handlers only insert rows; ``manage.py send_outbox`` sends them.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Email Outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
+
+
+class ImageDerivative(models.Model):
+    """
+    Resized renditions generated for one stored image (see core.images).
+    ``renditions`` maps format -> {width: storage name}. Saving an image
+    queues a PENDING row; ``manage.py generate_image_derivatives`` fills it.
+    A failed attempt is retried at ``next_attempt_at`` until the image is
+    FAILED after IMAGE_DERIVATIVE_MAX_ATTEMPTS.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    source = models.CharField(max_length=255, unique=True)
+    renditions = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
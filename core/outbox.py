@@ -0,0 +1,135 @@
+"""
+Transactional email outbox.
+
+``queue_email`` (``aqueue_email`` in async views) is what request
+handlers call: it only inserts an EmailOutbox row, so no request ever
+waits on an SMTP handshake. The
+``send_outbox`` management command drains due rows in batches over a
+single SMTP connection, retrying failures with exponential backoff.
+"""
+
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from instrumentation.metrics import record_external
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed row stays invisible to other workers while it is sent.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def _outbox_fields(subject, message, recipient_list, from_email):
+    return {
+        'subject': subject[:255],
+        'body': message,
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL or '',
+        'recipients': list(recipient_list),
+    }
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Queue an email for background delivery."""
+    return EmailOutbox.objects.create(**_outbox_fields(subject, message, recipient_list, from_email))
+
+
+async def aqueue_email(subject, message, recipient_list, from_email=None):
+    """Async queue_email()."""
+    return await EmailOutbox.objects.acreate(**_outbox_fields(subject, message, recipient_list, from_email))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at EMAIL_OUTBOX_MAX_BACKOFF seconds."""
+    base = settings.EMAIL_OUTBOX_BACKOFF * (2 ** (attempts - 1))
+    delay = min(base, settings.EMAIL_OUTBOX_MAX_BACKOFF)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due emails to this worker.
+    The lease is taken in a short transaction so the SMTP round-trips that
+    follow never hold database locks.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        batch = list(due)
+        EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + CLAIM_LEASE,
+        )
+    return batch
+
+
+def deliver_batch(batch, connection):
+    """Send a claimed batch over ``connection``; return (sent, retried, failed)."""
+    sent = retried = failed = 0
+    for email in batch:
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email or None,
+            to=email.recipients,
+            connection=connection,
+        )
+        email.attempts += 1
+        began = time.perf_counter()
+        try:
+            connection.open()
+            message.send(fail_silently=False)
+        except Exception as e:
+            record_external('smtp', time.perf_counter() - began)
+            logger.warning(f"Outbox email #{email.pk} attempt {email.attempts} failed: {e}")
+            email.last_error = str(e)
+            if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                email.status = EmailOutbox.Status.FAILED
+                failed += 1
+            else:
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                retried += 1
+            email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+            # Drop a possibly broken connection; the next message reopens it.
+            try:
+                connection.close()
+            except Exception:
+                pass
+            continue
+
+        record_external('smtp', time.perf_counter() - began)
+        email.status = EmailOutbox.Status.SENT
+        email.sent_at = timezone.now()
+        email.last_error = ''
+        email.save(update_fields=['attempts', 'last_error', 'status', 'sent_at'])
+        sent += 1
+    return sent, retried, failed
+
+
+def drain_outbox(batch_size=50, connection=None):
+    """Send every due email; return (sent, retried, failed) totals."""
+    own_connection = connection is None
+    if own_connection:
+        connection = get_connection(fail_silently=False)
+    totals = [0, 0, 0]
+    try:
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            for i, count in enumerate(deliver_batch(batch, connection)):
+                totals[i] += count
+    finally:
+        if own_connection:
+            connection.close()
+    return tuple(totals)
@@ -0,0 +1,66 @@
+"""
+Whole-page caching for anonymous visitors.
+
+Public pages (home, rates, map, amenities, about, facility list/detail)
+are cached per URL for anonymous GETs. Every key carries a generation
+number; saving or deleting a Facility, FacilityImage, VirtualTour or
+RatePackage bumps it, so admin edits show up on the next request. The
+facility card grids also use the generation for their fragment caches.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+GENERATION_KEY = 'public-pages:generation'
+
+
+def page_generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate_public_pages():
+    """Retire every cached public page and facility card fragment."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Pending flash messages are rendered into the page and must not be shared.
+    return not len(get_messages(request))
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'public-page:{page_generation()}:{path}'
+
+
+def cache_public_page(view):
+    """Serve ``view`` from the page cache for anonymous visitors."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
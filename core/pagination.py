@@ -0,0 +1,124 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, each page asks for rows strictly after the last row of
+the previous page in the list's sort order, e.g. ``(created_at, pk) <
+(last.created_at, last.pk)`` for a newest-first list. With a composite
+index on the sort columns every page is an index range scan of
+``per_page`` rows, so page 500 costs the same as page 1.
+
+The position is handed to the client as an opaque URL-safe cursor.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """One page of rows plus the cursor of the next page (None on the last)."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _field_names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, name) for name in _field_names(ordering)]
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Turn a cursor back into typed values of the ordering fields."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor.')
+    names = _field_names(ordering)
+    if not isinstance(values, list) or len(values) != len(names):
+        raise InvalidCursor('Cursor does not match this listing.')
+    try:
+        return [
+            model._meta.pk.to_python(value) if name == 'pk' else model._meta.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+    except (ValidationError, TypeError, ValueError):
+        # A crafted cursor can hold any JSON, e.g. a list where a date
+        # belongs, and to_python() does not always wrap those errors.
+        raise InvalidCursor('Cursor does not match this listing.')
+
+
+def _after(ordering, values):
+    """
+    Q for rows that sort after ``values``: (a > x) | (a = x & b > y) | ...
+    with ``<`` for descending fields. The redundant ``a >= x`` in front
+    gives the planner a range it can seek to on the composite index.
+    """
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    first = ordering[0]
+    bound = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Return the KeysetPage of ``queryset`` (sorted by ``ordering``, whose
+    last field must be unique, normally ``pk``) that follows ``cursor``.
+    Raises InvalidCursor for a cursor that cannot be decoded.
+    """
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, queryset.model, ordering)))
+    items = list(queryset[:per_page + 1])
+    if len(items) > per_page:
+        items = items[:per_page]
+        return KeysetPage(items, encode_cursor(items[-1], ordering))
+    return KeysetPage(items, None)
+
+
+def paginate(request, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+    """keyset_page() for the ``cursor`` query parameter of ``request``."""
+    return keyset_page(queryset, ordering, request.GET.get('cursor'), per_page)
+
+
+def page_json(request, page, rows_template, context, serialize, json_url, html_url):
+    """
+    Infinite-scroll response: the page's rows as data and as rendered HTML
+    (``rows_template`` with ``context``), plus the URLs of the next page.
+    """
+    cursor = page.next_cursor
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page.items],
+        'html': render_to_string(rows_template, context, request=request),
+        'next_cursor': cursor,
+        'next_url': f'{json_url}?cursor={cursor}' if cursor else None,
+        'next_page_url': f'{html_url}?cursor={cursor}' if cursor else None,
+    })
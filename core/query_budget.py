@@ -0,0 +1,73 @@
+"""
+Query-budget harness.
+
+Renders a view through the test client, counts the SQL it runs and fails
+when the count goes over a fixed budget. Checking the same budget while
+the fixture grows from tens to thousands of rows catches N+1 regressions:
+a view that touches a relation per row blows through any constant budget
+as soon as the row count goes up.
+
+Used by ``manage.py check_query_budget``; test cases can mix in
+QueryBudgetMixin and call ``assertMaxQueries(url, budget)``.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SHOW_QUERIES = 10
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def count_queries(client, url):
+    """GET ``url`` and return (response, captured queries)."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, context.captured_queries
+
+
+def check_budget(client, url, budget):
+    """
+    GET ``url`` and return the number of queries it ran. Raises
+    QueryBudgetExceeded (listing the SQL) when it ran more than ``budget``
+    or did not answer 200.
+    """
+    response, queries = count_queries(client, url)
+    if response.status_code != 200:
+        raise QueryBudgetExceeded(f"{url} returned {response.status_code}")
+    if len(queries) > budget:
+        statements = '\n'.join(f"  {q['sql']}" for q in queries[:SHOW_QUERIES])
+        raise QueryBudgetExceeded(
+            f"{url} ran {len(queries)} queries, budget is {budget}; first {SHOW_QUERIES}:\n{statements}"
+        )
+    return len(queries)
+
+
+def run_budgets(client, budgets, grow, sizes, reset=None):
+    """
+    For each fixture size, call ``grow(size)`` and check every
+    ``(label, url, budget)`` in ``budgets``, calling ``reset()`` (e.g. to
+    clear caches) before each check. Yields ``(size, label, query_count,
+    error)``; error is None when within budget.
+    """
+    for size in sizes:
+        grow(size)
+        for label, url, budget in budgets:
+            if reset:
+                reset()
+            try:
+                yield size, label, check_budget(client, url, budget), None
+            except QueryBudgetExceeded as e:
+                yield size, label, None, str(e)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin: ``self.assertMaxQueries(url, budget)``."""
+
+    def assertMaxQueries(self, url, budget, client=None):
+        try:
+            return check_budget(client or self.client, url, budget)
+        except QueryBudgetExceeded as e:
+            self.fail(str(e))
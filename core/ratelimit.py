@@ -0,0 +1,319 @@
+"""
+Request rate limiting.
+
+``@ratelimit('login', ip='20/m', failures={'username': '5/5m'})`` caps how
+often a view is called per client IP, per submitted username and/or per
+signed-in user. The check runs before the view, so a throttled login
+attempt never reaches the password hasher. Over the limit the view is not
+called and the client gets a 429 with ``Retry-After``.
+
+Limits passed as keywords count every request. Limits in ``failures`` only
+count what ``record_failure()`` reports (failed logins, via the
+``user_login_failed`` signal in ``accounts.signals``), so a guest who signs
+in successfully never uses up their own username's allowance.
+
+Each limit is a sliding-window counter: one counter per fixed window of
+the rate's period, with the rate estimated as the current window's count
+plus the previous window's count weighted by how much of it the sliding
+window still covers. That is one increment and one cache read per check,
+whatever the limit, and no list of timestamps to trim. The increment comes
+first and the check uses the count it returns, so concurrent requests
+cannot all read the same count and slip past the limit together. Rejected
+requests count too: a client has to slow down to be let back in.
+
+Counters live in the ``ratelimit`` cache alias, shared by every worker.
+Redis increments atomically; the file cache does not, so there each
+increment holds an exclusive lock on a file in the cache directory (on
+platforms without ``fcntl`` only a per-process lock, which is enough for
+``runserver``). Run production with several workers on Redis. When the
+cache is unreachable the check falls back to a per-process in-memory store
+instead of failing the request or letting everything through.
+``RATELIMIT_ENABLED=False`` turns the checks off (the load-test harness
+does, since all its guests share one IP).
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from instrumentation.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+RATE_PATTERN = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+def parse_rate(rate):
+    """``'5/m'`` -> (5, 60); ``'10/15m'`` -> (10, 900)."""
+    match = RATE_PATTERN.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '5/m' or '10/15m'.")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNITS[unit]
+
+
+def client_ip(request):
+    """
+    The client's address. Behind ``TRUSTED_PROXY_COUNT`` proxies it is taken
+    from X-Forwarded-For, counting from the right, since anything further
+    left was supplied by the client.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= proxies and forwarded[-proxies]:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def submitted_username(request):
+    return request.POST.get('username', '').strip().lower()
+
+
+def user_id(request):
+    return str(request.user.pk) if request.user.is_authenticated else ''
+
+
+KEY_FUNCTIONS = {
+    'ip': client_ip,
+    'username': submitted_username,
+    'user': user_id,
+}
+
+
+# Scope -> the ``failures`` limits of the view decorated with it.
+FAILURE_LIMITS = {}
+
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(directory):
+    """Hold an exclusive lock shared by every process using ``directory``."""
+    if fcntl is None:
+        with _process_lock:
+            yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    # The file cache only reads, culls and clears *.djcache files.
+    with open(os.path.join(directory, 'ratelimit.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class CacheStore:
+    """Counters in a Django cache, shared by every worker process."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def get_many(self, keys):
+        return caches[self.alias].get_many(keys)
+
+    def incr(self, key, timeout):
+        cache = caches[self.alias]
+        if isinstance(cache, FileBasedCache):
+            # add() and incr() are each a read then a write of the file.
+            with file_lock(cache._dir):
+                return self._incr(cache, key, timeout)
+        return self._incr(cache, key, timeout)
+
+    def _incr(self, cache, key, timeout):
+        if cache.add(key, 1, timeout):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr().
+            cache.set(key, 1, timeout)
+            return 1
+
+
+class MemoryStore:
+    """Per-process counters, used while the cache is unavailable."""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            found = {}
+            for key in keys:
+                entry = self._counters.get(key)
+                if entry and entry[1] > now:
+                    found[key] = entry[0]
+            return found
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._counters) >= self.MAX_KEYS:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            count, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                count, expires = 0, now + timeout
+            self._counters[key] = (count + 1, expires)
+            return count + 1
+
+
+memory_store = MemoryStore()
+
+
+def windows(key, period, now):
+    """The current and previous window keys, the previous one's weight and the wait until the next window."""
+    window, offset = divmod(now, period)
+    return (
+        f'{key}:{int(window)}', f'{key}:{int(window) - 1}',
+        1 - offset / period, max(1, math.ceil(period - offset)),
+    )
+
+
+def count(store, key, period, now=None):
+    """Count one request against ``key``; return the current window's count."""
+    current_key, _, _, _ = windows(key, period, time.time() if now is None else now)
+    # Kept for two periods: the next window still reads it as "previous".
+    return store.incr(current_key, period * 2)
+
+
+def hit(store, key, limit, period, now=None):
+    """
+    Count one request against ``key``. Returns 0 when the sliding-window
+    rate, this request included, is within ``limit``, otherwise the
+    seconds to wait before retrying.
+    """
+    now = time.time() if now is None else now
+    _, previous_key, weight, wait = windows(key, period, now)
+    current = count(store, key, period, now)
+    previous = store.get_many([previous_key]).get(previous_key, 0)
+    return wait if previous * weight + current > limit else 0
+
+
+def peek(store, key, limit, period, now=None):
+    """Like ``hit()``, without counting: whether one more would be within ``limit``."""
+    now = time.time() if now is None else now
+    current_key, previous_key, weight, wait = windows(key, period, now)
+    counts = store.get_many([current_key, previous_key])
+    return wait if counts.get(previous_key, 0) * weight + counts.get(current_key, 0) + 1 > limit else 0
+
+
+def limit_key(scope, name, value):
+    return f'ratelimit:{scope}:{name}:{hashlib.md5(value.encode()).hexdigest()}'
+
+
+def with_fallback(operation, store, *args):
+    """Run ``operation`` on ``store``, or on the cache with the in-memory fallback."""
+    if store is not None:
+        return operation(store, *args)
+    try:
+        return operation(CacheStore(settings.RATELIMIT_CACHE_ALIAS), *args)
+    except Exception as e:
+        logger.warning(f"Rate limit cache unavailable, using in-process counters: {e}")
+        return operation(memory_store, *args)
+
+
+def check(request, scope, limits, store=None, failures=None):
+    """
+    Apply ``limits`` and ``failures`` ({key name: rate}) to ``request``.
+    Returns 0 when the request may proceed, otherwise the Retry-After in
+    seconds. ``limits`` count this request; ``failures`` only look at what
+    ``record_failure()`` counted. Counters go to ``store`` if given, else
+    to the cache with the in-memory fallback.
+    """
+    checks = [(hit, name, rate) for name, rate in limits.items()]
+    checks += [(peek, name, rate) for name, rate in (failures or {}).items()]
+    for operation, name, rate in checks:
+        value = KEY_FUNCTIONS[name](request)
+        if not value:
+            continue
+        limit, period = parse_rate(rate)
+        wait = with_fallback(operation, store, limit_key(scope, name, value), limit, period)
+        if wait:
+            registry.inc('resort_ratelimit_rejections_total', (('scope', scope), ('key', name)))
+            logger.info(f"Rate limit {scope}/{name} ({rate}) exceeded by {client_ip(request)}")
+            return wait
+    return 0
+
+
+def record_failure(request, scope, store=None):
+    """Count a failed attempt against the ``failures`` limits of ``scope``."""
+    for name, rate in FAILURE_LIMITS.get(scope, {}).items():
+        value = KEY_FUNCTIONS[name](request)
+        if value:
+            _, period = parse_rate(rate)
+            with_fallback(count, store, limit_key(scope, name, value), period)
+
+
+def too_many_requests(wait):
+    response = HttpResponse(
+        f'Too many requests. Please try again in {wait} seconds.',
+        status=429, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def ratelimit(scope, methods=('POST',), failures=None, **limits):
+    """
+    Limit calls to the decorated view, e.g. ``@ratelimit('login', ip='20/m')``.
+    Keys are ``ip``, ``username`` (the posted username) and ``user`` (the
+    signed-in user); only requests whose method is in ``methods`` count.
+    ``failures`` takes the same keys and only counts ``record_failure()``
+    calls for ``scope``. Works on sync and async views.
+    """
+    failures = failures or {}
+    unknown = (set(limits) | set(failures)) - set(KEY_FUNCTIONS)
+    if unknown:
+        raise ValueError(f"Unknown rate limit key(s): {', '.join(sorted(unknown))}")
+    for rate in [*limits.values(), *failures.values()]:
+        parse_rate(rate)
+    if failures:
+        FAILURE_LIMITS[scope] = failures
+
+    def applies(request):
+        return settings.RATELIMIT_ENABLED and request.method in methods
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if applies(request):
+                    wait = await sync_to_async(check)(request, scope, limits, failures=failures)
+                    if wait:
+                        return too_many_requests(wait)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if applies(request):
+                wait = check(request, scope, limits, failures=failures)
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,43 @@
+"""
+Queue responsive image derivatives when an image field is saved, and drop
+the public page cache when facilities, tours or rates change.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from facilities.models import Facility, FacilityImage, VirtualTour
+from .images import get_renditions, queue_derivatives
+from .models import RatePackage
+from .page_cache import invalidate_public_pages
+
+IMAGE_FIELDS = {
+    Facility: 'image',
+    FacilityImage: 'image',
+    RatePackage: 'photo',
+    VirtualTour: 'thumbnail',
+}
+
+
+@receiver(post_save, sender=Facility)
+@receiver(post_save, sender=FacilityImage)
+@receiver(post_save, sender=RatePackage)
+@receiver(post_save, sender=VirtualTour)
+def queue_image_derivatives(sender, instance, **kwargs):
+    # Only a row insert here; the images worker does the resizing.
+    image = getattr(instance, IMAGE_FIELDS[sender])
+    if image and not get_renditions(image.name):
+        queue_derivatives(image.name)
+
+
+@receiver(post_save, sender=Facility)
+@receiver(post_save, sender=FacilityImage)
+@receiver(post_save, sender=RatePackage)
+@receiver(post_save, sender=VirtualTour)
+@receiver(post_delete, sender=Facility)
+@receiver(post_delete, sender=FacilityImage)
+@receiver(post_delete, sender=RatePackage)
+@receiver(post_delete, sender=VirtualTour)
+def invalidate_page_cache(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_public_pages)
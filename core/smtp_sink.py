@@ -0,0 +1,108 @@
+"""
+A tiny in-process SMTP server that accepts and stores every message.
+
+Stands in for smtp.gmail.com in local runs and benchmarks. ``connect_delay``
+simulates the TCP+TLS handshake cost of a real provider.
+
+    sink = SMTPSink(connect_delay=0.3).start()
+    ... settings.EMAIL_HOST, settings.EMAIL_PORT = sink.host, sink.port ...
+    sink.stop()
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        sink = self.server.sink
+        if sink.connect_delay:
+            time.sleep(sink.connect_delay)
+        self.reply('220 localhost SMTPSink ready')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data)
+                sink.record(sender, recipients, b''.join(lines))
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Threaded SMTP server on localhost that keeps received messages in memory."""
+
+    def __init__(self, host='127.0.0.1', port=0, connect_delay=0.0):
+        self.connect_delay = connect_delay
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingSMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def record(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append((sender, recipients, data))
+
+    def start(self):
+        original = self._server.process_request
+
+        def counting_process_request(request, client_address):
+            with self._lock:
+                self.connections += 1
+            original(request, client_address)
+
+        self._server.process_request = counting_process_request
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
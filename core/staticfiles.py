@@ -0,0 +1,156 @@
+"""
+Static files storage with an image build stage.
+
+Extends WhiteNoise's CompressedManifestStaticFilesStorage so that
+``collectstatic`` also:
+
+* drops byte-identical duplicates (the manifest maps them to the copy kept),
+* losslessly recompresses JPEG (jpegtran, when installed) and PNG files,
+* writes resized JPEG and WebP variants of the images referenced by the
+  templates in ``STATIC_IMAGE_VARIANT_TEMPLATES`` for ``{% static_picture %}``,
+
+running the image work across all cores and reporting bytes saved.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.template.loader import get_template
+from PIL import Image
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+VARIANT_WIDTHS = (480, 960, 1600)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 78, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_MANIFEST = 'static-variants.json'
+STATIC_REF = re.compile(r"""{%\s*static(?:_picture|_image_set)?\s+['"]([^'"]+\.(?:jpe?g|png))['"]""")
+
+
+def _recompress(path):
+    """Losslessly shrink one JPEG/PNG in place; return (before, after) bytes."""
+    before = os.path.getsize(path)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        jpegtran = shutil.which('jpegtran')
+        if not jpegtran:
+            return before, before
+        result = subprocess.run(
+            [jpegtran, '-copy', 'none', '-optimize', '-progressive', path],
+            capture_output=True, check=False,
+        )
+        data = result.stdout if result.returncode == 0 else b''
+    else:
+        with Image.open(path) as image:
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG', optimize=True)
+            data = buffer.getvalue()
+    if data and len(data) < before:
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return before, len(data)
+    return before, before
+
+
+def _make_variants(root, name):
+    """Write resized variants of ``name`` under ``root``; return {format: {width: name}}."""
+    stem = os.path.splitext(name)[0]
+    variants = {fmt: {} for fmt in VARIANT_FORMATS}
+    with Image.open(os.path.join(root, name)) as original:
+        original = original.convert('RGB')
+        widths = [w for w in VARIANT_WIDTHS if w < original.width]
+        if original.width <= VARIANT_WIDTHS[-1]:
+            widths.append(original.width)
+        for width in widths:
+            height = max(1, round(original.height * width / original.width))
+            resized = original if width == original.width else original.resize(
+                (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0,
+            )
+            for fmt, (pil_format, ext, options) in VARIANT_FORMATS.items():
+                variant = f'{stem}.w{width}.{ext}'
+                resized.save(os.path.join(root, variant), pil_format, **options)
+                variants[fmt][str(width)] = variant
+    return variants
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run=dry_run, **options)
+            return
+
+        began = time.perf_counter()
+        paths = dict(paths)
+        duplicates, duplicate_bytes = self._drop_duplicates(paths)
+        before, after, variants = self._optimise_images(paths)
+
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        for duplicate, original in duplicates.items():
+            key = self.hash_key(self.clean_name(original))
+            if key in self.hashed_files:
+                self.hashed_files[self.hash_key(self.clean_name(duplicate))] = self.hashed_files[key]
+        self.save_manifest()
+        if self.exists(VARIANTS_MANIFEST):
+            self.delete(VARIANTS_MANIFEST)
+        self._save(VARIANTS_MANIFEST, ContentFile(json.dumps(variants).encode()))
+
+        sys.stdout.write(
+            f"Static image build: {len(duplicates)} duplicates removed ({duplicate_bytes / 1024:.0f} KiB), "
+            f"recompression saved {(before - after) / 1024:.0f} KiB of {before / 1024:.0f} KiB"
+            f"{'' if shutil.which('jpegtran') else ' (jpegtran not installed, JPEGs left as-is)'}, "
+            f"{sum(len(w) for v in variants.values() for w in v.values())} variants written "
+            f"in {time.perf_counter() - began:.1f}s\n"
+        )
+
+    def _drop_duplicates(self, paths):
+        """Remove byte-identical copies, keeping the shortest name of each."""
+        kept, duplicates, saved = {}, {}, 0
+        for name in sorted(paths, key=lambda n: (len(n), n)):
+            with self.open(name) as fh:
+                digest = hashlib.sha256(fh.read()).hexdigest()
+            if digest in kept:
+                duplicates[name] = kept[digest]
+                saved += self.size(name)
+                self.delete(name)
+                del paths[name]
+            else:
+                kept[digest] = name
+        return duplicates, saved
+
+    def _variant_sources(self, paths):
+        names = set()
+        for template_name in getattr(settings, 'STATIC_IMAGE_VARIANT_TEMPLATES', ()):
+            source = get_template(template_name).template.source
+            names.update(STATIC_REF.findall(source))
+        return sorted(name for name in names if name in paths)
+
+    def _optimise_images(self, paths):
+        images = [n for n in paths if os.path.splitext(n)[1].lower() in ('.jpg', '.jpeg', '.png')]
+        variant_sources = self._variant_sources(paths)
+        before = after = 0
+        variants = {}
+        with ProcessPoolExecutor() as pool:
+            sizes = pool.map(_recompress, [self.path(name) for name in images], chunksize=8)
+            for name, (old, new) in zip(images, sizes):
+                before, after = before + old, after + new
+                # Hash and compress the optimised copy rather than the source file.
+                paths[name] = (self, name)
+            for name, made in zip(variant_sources, pool.map(_make_variants, [self.location] * len(variant_sources), variant_sources)):
+                variants[name] = made
+                for widths in made.values():
+                    for variant in widths.values():
+                        paths[variant] = (self, variant)
+        return before, after, variants
@@ -0,0 +1,122 @@
+import json
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import FORMATS, get_renditions, prime_renditions
+from core.staticfiles import VARIANTS_MANIFEST
+
+register = template.Library()
+
+
+def _srcset(widths):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag(takes_context=True)
+def responsive_image(context, image, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render ``image`` as a <picture> with AVIF/WebP/JPEG srcset candidates.
+    Falls back to a plain <img> of the original until derivatives exist.
+
+        {% load images %}
+        {% responsive_image facility.image alt=facility.name css_class="card-img" sizes="(max-width: 768px) 100vw, 33vw" %}
+    """
+    if not image:
+        return ''
+    renditions = context.get('image_renditions', {}).get(image.name)
+    if renditions is None:
+        renditions = get_renditions(image.name)
+    img_attrs = format_html(
+        'alt="{}" class="{}" loading="{}" decoding="async"', alt, css_class, loading,
+    )
+    if not renditions.get('jpeg'):
+        return format_html('<img src="{}" {}>', image.url, img_attrs)
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (FORMATS[fmt][2], _srcset(renditions[fmt]), sizes)
+            for fmt in ('avif', 'webp') if fmt in FORMATS and renditions.get(fmt)
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        sources, image.url, _srcset(renditions['jpeg']), sizes, img_attrs,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def prime_images(context, objects, field):
+    """
+    Look up the renditions of ``field`` on every object at once, ahead of a
+    loop of ``{% responsive_image %}`` tags that would otherwise each query.
+
+        {% prime_images facilities 'image' %}
+    """
+    renditions = dict(context.get('image_renditions', {}))
+    renditions.update(prime_renditions([getattr(getattr(obj, field), 'name', None) for obj in objects]))
+    context['image_renditions'] = renditions
+    return ''
+
+
+@lru_cache(maxsize=1)
+def _static_variants():
+    """The variants written by collectstatic ({} when running from source)."""
+    try:
+        with staticfiles_storage.open(VARIANTS_MANIFEST) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _static_srcset(widths):
+    return ', '.join(
+        f'{static(name)} {width}w'
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def static_picture(path, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render the static image ``path`` as a <picture> using the WebP/JPEG
+    variants built by collectstatic; a plain <img> when there are none.
+
+        {% static_picture 'images/pool.jpg' alt="Resort Swimming Pool" sizes="50vw" %}
+    """
+    variants = _static_variants().get(path, {})
+    img_attrs = format_html(
+        'alt="{}" class="{}" loading="{}" decoding="async"', alt, css_class, loading,
+    )
+    if not variants.get('jpeg'):
+        return format_html('<img src="{}" {}>', static(path), img_attrs)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        _static_srcset(variants['webp']), sizes,
+        static(path), _static_srcset(variants['jpeg']), sizes, img_attrs,
+    )
+
+
+@register.simple_tag
+def static_image_set(path):
+    """
+    CSS ``background-image`` value for a static image: an image-set() of its
+    largest WebP/JPEG variants, or a plain url() when there are none.
+    """
+    variants = _static_variants().get(path, {})
+    if not variants.get('jpeg'):
+        return format_html("url('{}')", static(path))
+    width = max(variants['jpeg'], key=int)
+    return format_html(
+        "image-set(url('{}') type('image/webp'), url('{}') type('image/jpeg'))",
+        static(variants['webp'][width]), static(variants['jpeg'][width]),
+    )
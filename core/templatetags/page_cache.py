@@ -0,0 +1,18 @@
+from django import template
+
+from core.page_cache import page_generation
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_cache_generation():
+    """
+    Current public-page cache generation, for keying fragment caches that
+    must be dropped when facilities, tours or rates change.
+
+        {% load cache page_cache %}
+        {% page_cache_generation as generation %}
+        {% cache 600 facility-cards generation %}...{% endcache %}
+    """
+    return page_generation()
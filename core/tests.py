@@ -1,3 +1,414 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import shutil
+import smtplib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from facilities.models import Facility, FacilityImage, VirtualTour
+from . import ratelimit
+from .images import pending_sources
+from .models import EmailOutbox, ImageDerivative, RatePackage
+from .outbox import CLAIM_LEASE, claim_batch, drain_outbox, queue_email
+from .pagination import InvalidCursor, decode_cursor, keyset_page
+
+
+class PublicPagesTests(TestCase):
+    """Public pages render from source, without a collectstatic manifest."""
+
+    def test_pages_render(self):
+        for name in ('core:home', 'core:rates', 'core:map', 'core:amenities', 'core:about'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+
+class PageCacheTests(TestCase):
+    """Admin saves to anything a public page shows retire its cached copy and card fragments."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.facility = Facility.objects.create(
+            name='Lagoon Cottage', slug='lagoon-cottage', description='By the lagoon.',
+            capacity=4, price_per_day=Decimal('1000.00'),
+        )
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def assertServed(self, url, cache_state, text=None, present=True):
+        response = self.client.get(url)
+        self.assertEqual(response.get('X-Page-Cache'), cache_state)
+        if text:
+            (self.assertContains if present else self.assertNotContains)(response, text)
+
+    def test_anonymous_pages_are_cached(self):
+        url = reverse('core:rates')
+        self.assertServed(url, 'miss')
+        self.assertServed(url, 'hit')
+        self.client.force_login(get_user_model().objects.create_user(username='guest', password='guest-password'))
+        self.assertServed(url, None)
+
+    def test_saves_and_deletes_retire_cached_pages(self):
+        detail = reverse('facilities:detail', args=[self.facility.slug])
+        package = RatePackage(name='Family Day Pass', price=Decimal('2500.00'), inclusions='Pool access')
+        tour = VirtualTour(
+            facility=self.facility, title='Lagoon walk', media_type=VirtualTour.MediaType.IMAGE,
+            media_file='virtual_tours/lagoon.jpg',
+        )
+
+        def rename():
+            self.facility.name = 'Coral Cottage'
+            self.facility.save()
+
+        cases = (
+            ('facility save', reverse('facilities:list'), rename, 'Coral Cottage', True),
+            ('gallery image save', detail, lambda: FacilityImage.objects.create(
+                facility=self.facility, image='facilities/gallery/deck.jpg', caption='Sunset deck',
+            ), 'Sunset deck', True),
+            ('virtual tour save', reverse('core:map'), tour.save, 'Lagoon walk', True),
+            ('rate package save', reverse('core:rates'), package.save, 'Family Day Pass', True),
+            ('rate package delete', reverse('core:rates'), lambda: RatePackage.objects.all().delete(),
+             'Family Day Pass', False),
+            ('gallery image delete', detail, lambda: FacilityImage.objects.all().delete(), 'Sunset deck', False),
+        )
+        for label, url, action, text, present in cases:
+            with self.subTest(label):
+                self.client.get(url)
+                self.assertServed(url, 'hit')
+                self.change(action)
+                self.assertServed(url, 'miss', text, present)
+
+    def test_card_fragments_follow_saves(self):
+        # Signed-in visitors skip the page cache but share the card fragments.
+        self.client.force_login(get_user_model().objects.create_user(username='guest', password='guest-password'))
+        for url in (reverse('facilities:list'), reverse('core:home')):
+            with self.subTest(url=url):
+                cached_name = self.facility.name
+                self.assertContains(self.client.get(url), cached_name)
+                # update() sends no signal, so the cached fragment is still served.
+                Facility.objects.filter(pk=self.facility.pk).update(name='Quiet Cottage')
+                self.assertContains(self.client.get(url), cached_name)
+
+                self.facility.name = f'{cached_name} II'
+                self.change(self.facility.save)
+                self.assertContains(self.client.get(url), self.facility.name)
+
+
+def png(width=400, height=300):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (30, 120, 200)).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='pool.png')
+
+
+class ImageDerivativeTests(TransactionTestCase):
+    """Admin saves only queue renditions; the images worker builds and prunes them."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Recorded renditions are cached by storage name, which each test reuses.
+        self.addCleanup(caches['default'].clear)
+
+    def test_save_queues_and_worker_generates_then_prunes(self):
+        facility = Facility(
+            name='Pool', slug='pool', description='Test facility', capacity=4, price_per_day=Decimal('1000.00'),
+        )
+        facility.image.save('pool.png', png(), save=False)
+        facility.save()
+
+        queued = ImageDerivative.objects.get(source=facility.image.name)
+        self.assertEqual((queued.status, queued.renditions), (ImageDerivative.Status.PENDING, {}))
+
+        call_command('generate_image_derivatives', workers=1, stdout=io.StringIO())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, ImageDerivative.Status.READY)
+        old_files = [name for by_width in queued.renditions.values() for name in by_width.values()]
+        self.assertTrue(old_files)
+        self.assertTrue(all(default_storage.exists(name) for name in old_files))
+
+        facility.image.save('lagoon.png', png(), save=True)
+        call_command('generate_image_derivatives', workers=1, stdout=io.StringIO())
+
+        self.assertFalse(ImageDerivative.objects.filter(source=queued.source).exists())
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+        self.assertEqual(
+            ImageDerivative.objects.get(source=facility.image.name).status, ImageDerivative.Status.READY,
+        )
+
+
+    @override_settings(IMAGE_DERIVATIVE_MAX_ATTEMPTS=2, IMAGE_DERIVATIVE_BACKOFF=60)
+    def test_failed_image_is_retried_then_requeued_when_its_file_changes(self):
+        facility = Facility(
+            name='Pool', slug='pool', description='Test facility', capacity=4, price_per_day=Decimal('1000.00'),
+        )
+        facility.image.save('pool.png', ContentFile(b'not an image'), save=True)
+        name = facility.image.name
+
+        call_command('generate_image_derivatives', workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+        row = ImageDerivative.objects.get(source=name)
+        self.assertEqual((row.status, row.attempts), (ImageDerivative.Status.PENDING, 1))
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(pending_sources(), [])
+
+        ImageDerivative.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(pending_sources(), [name])
+        call_command('generate_image_derivatives', workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (ImageDerivative.Status.FAILED, 2))
+        self.assertTrue(row.last_error)
+
+        # Saving the facility again changes nothing until the file does.
+        facility.save()
+        self.assertEqual(ImageDerivative.objects.get(pk=row.pk).status, ImageDerivative.Status.FAILED)
+
+        default_storage.delete(name)
+        self.assertEqual(default_storage.save(name, png()), name)
+        ImageDerivative.objects.filter(pk=row.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        facility.save()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.last_error), (ImageDerivative.Status.PENDING, 0, ''))
+
+        call_command('generate_image_derivatives', workers=1, stdout=io.StringIO())
+        self.assertEqual(ImageDerivative.objects.get(pk=row.pk).status, ImageDerivative.Status.READY)
+
+    def test_idle_worker_prunes_on_the_interval_only(self):
+        command = 'core.management.commands.generate_image_derivatives'
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 5:
+                raise KeyboardInterrupt
+
+        with mock.patch(f'{command}.prune_derivatives', return_value=0) as prune, \
+                mock.patch(f'{command}.time.sleep', sleep):
+            call_command('generate_image_derivatives', watch=True, interval=0, stdout=io.StringIO())
+        self.assertEqual(prune.call_count, 1)
+
+        with mock.patch(f'{command}.prune_derivatives', return_value=0) as prune, \
+                mock.patch(f'{command}.time.sleep', sleep):
+            sleeps.clear()
+            call_command('generate_image_derivatives', watch=True, interval=0, prune_interval=0, stdout=io.StringIO())
+        self.assertEqual(prune.call_count, 5)
+
+
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def test_hit_counts_before_comparing(self):
+        store = ratelimit.MemoryStore()
+        waits = [ratelimit.hit(store, 'k', 5, 60, now=1000.0) for _ in range(6)]
+        self.assertEqual(waits[:5], [0] * 5)
+        self.assertGreater(waits[5], 0)
+
+    def test_file_cache_counts_every_concurrent_increment(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+        with override_settings(CACHES={'default': file_cache, 'ratelimit': file_cache}):
+            store = ratelimit.CacheStore('ratelimit')
+
+            def increment():
+                for _ in range(25):
+                    store.incr('counter', 60)
+
+            threads = [threading.Thread(target=increment) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(caches['ratelimit'].get('counter'), 200)
+
+    def test_only_failed_logins_count_per_username(self):
+        get_user_model().objects.create_user(username='guest', password='guest-password')
+        url = reverse('accounts:login')
+        for attempt in range(6):
+            # A new IP each time, so only the username limit applies.
+            response = self.client.post(url, {'username': 'guest', 'password': 'guest-password'},
+                                        REMOTE_ADDR=f'10.0.0.{attempt}')
+            self.assertEqual(response.status_code, 302)
+            self.client.logout()
+
+        for attempt in range(6):
+            response = self.client.post(url, {'username': 'guest', 'password': 'wrong'},
+                                        REMOTE_ADDR=f'10.0.1.{attempt}')
+            self.assertEqual(response.status_code, 429 if attempt == 5 else 200)
+
+
+class FailingConnection:
+    """An SMTP connection whose every send fails."""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_BACKOFF=30, EMAIL_OUTBOX_MAX_BACKOFF=3600)
+class OutboxTests(TestCase):
+
+    def make_due(self, email):
+        EmailOutbox.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+    def test_failures_back_off_then_give_up(self):
+        email = queue_email('Receipt', 'Body', ['guest@example.com'])
+
+        with self.assertLogs('core.outbox', 'WARNING'):
+            self.assertEqual(drain_outbox(connection=FailingConnection()), (0, 1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.PENDING, 1))
+        self.assertIn('unexpectedly closed', email.last_error)
+        # First retry after about EMAIL_OUTBOX_BACKOFF seconds (with jitter).
+        delay = (email.next_attempt_at - timezone.now()).total_seconds()
+        self.assertTrue(20 < delay <= 36, delay)
+        # Not due yet, so the next pass leaves it alone.
+        self.assertEqual(drain_outbox(connection=FailingConnection()), (0, 0, 0))
+
+        self.make_due(email)
+        with self.assertLogs('core.outbox', 'WARNING'):
+            drain_outbox(connection=FailingConnection())
+        email.refresh_from_db()
+        # The backoff doubles.
+        self.assertGreater((email.next_attempt_at - timezone.now()).total_seconds(), 45)
+
+        self.make_due(email)
+        with self.assertLogs('core.outbox', 'WARNING'):
+            self.assertEqual(drain_outbox(connection=FailingConnection()), (0, 0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.FAILED, 3))
+
+        self.make_due(email)
+        self.assertEqual(drain_outbox(connection=FailingConnection()), (0, 0, 0))
+
+    def test_retry_succeeds(self):
+        email = queue_email('Receipt', 'Body', ['guest@example.com'])
+        with self.assertLogs('core.outbox', 'WARNING'):
+            drain_outbox(connection=FailingConnection())
+        self.make_due(email)
+
+        working = get_connection('django.core.mail.backends.locmem.EmailBackend')
+        self.assertEqual(drain_outbox(connection=working), (1, 0, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), (EmailOutbox.Status.SENT, 2, ''))
+
+
+class OutboxClaimTests(TransactionTestCase):
+
+    def test_concurrent_claims_never_share_a_row(self):
+        for i in range(40):
+            queue_email(f'Receipt {i}', 'Body', ['guest@example.com'])
+        barrier = threading.Barrier(4)
+
+        def claim(_):
+            try:
+                barrier.wait()
+                return [email.pk for email in claim_batch(15)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            claims = list(pool.map(claim, range(4)))
+
+        claimed = [pk for batch in claims for pk in batch]
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(set(claimed), set(EmailOutbox.objects.values_list('pk', flat=True)))
+        # Claimed rows are leased, not sent: they come due again if the worker dies.
+        lease = EmailOutbox.objects.order_by('next_attempt_at').first().next_attempt_at - timezone.now()
+        self.assertGreater(lease, CLAIM_LEASE - timedelta(minutes=1))
+
+
+def crafted_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+class KeysetPaginationTests(TestCase):
+    ORDERING = ('-created_at', '-pk')
+
+    @classmethod
+    def setUpTestData(cls):
+        from reservations.models import Reservation
+        from reservations.tests import make_facility
+
+        cls.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        facility = make_facility()
+        check_in = timezone.localdate() + timedelta(days=30)
+        Reservation.objects.bulk_create(
+            Reservation(
+                user=cls.user, facility=facility, check_in=check_in, check_out=check_in + timedelta(days=1),
+                total_price=Decimal('1000.00'), status=Reservation.Status.CANCELLED,
+            )
+            for _ in range(25)
+        )
+        # Groups of five share a created_at, so pages must break ties on pk.
+        base = timezone.now()
+        for index, pk in enumerate(Reservation.objects.order_by('pk').values_list('pk', flat=True)):
+            Reservation.objects.filter(pk=pk).update(created_at=base - timedelta(minutes=index // 5))
+        cls.queryset = Reservation.objects.all()
+
+    def walk(self, per_page):
+        pks, cursor = [], None
+        while True:
+            page = keyset_page(self.queryset, self.ORDERING, cursor, per_page)
+            pks.extend(obj.pk for obj in page.items)
+            if not page.has_next:
+                return pks
+            cursor = page.next_cursor
+
+    def test_pages_follow_the_ordering_without_gaps_or_repeats(self):
+        expected = list(self.queryset.order_by(*self.ORDERING).values_list('pk', flat=True))
+        for per_page in (1, 3, 5, 7, 25, 100):
+            with self.subTest(per_page=per_page):
+                self.assertEqual(self.walk(per_page), expected)
+
+    def test_next_cursor_only_when_rows_remain(self):
+        page = keyset_page(self.queryset, self.ORDERING, per_page=20)
+        self.assertTrue(page.has_next)
+        last = keyset_page(self.queryset, self.ORDERING, page.next_cursor, per_page=20)
+        self.assertEqual(len(last.items), 5)
+        self.assertIsNone(last.next_cursor)
+
+    def test_malformed_cursors_are_rejected(self):
+        model = self.queryset.model
+        for cursor in (
+            'not base64!', crafted_cursor({'a': 1}), crafted_cursor(['2026-01-01']),
+            crafted_cursor([[1], 1]), crafted_cursor(['yesterday', '1']),
+            crafted_cursor(['2026-01-01T00:00:00+08:00', 'one']),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor, model, self.ORDERING)
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('reservations:my_reservations_page'), {'cursor': crafted_cursor([[1], 1])})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('reservations:my_reservations'), {'cursor': crafted_cursor([[1], 1])})
+        self.assertRedirects(response, reverse('reservations:my_reservations'))
@@ -1,12 +1,16 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from facilities.models import Facility, VirtualTour
 from .models import RatePackage
+from .outbox import aqueue_email
+from .page_cache import cache_public_page
+from .ratelimit import ratelimit
 
 
+@cache_public_page
 def home(request):
     featured_facilities = Facility.objects.filter(is_available=True)[:6]
     return render(request, 'core/home.html', {
@@ -14,10 +18,12 @@ def home(request):
     })
 
 
+@cache_public_page
 def about(request):
     return render(request, 'core/about.html')
 
 
+@cache_public_page
 def resort_map(request):
     facilities = Facility.objects.filter(is_available=True)
     tours = VirtualTour.objects.all().select_related('facility')
@@ -27,17 +33,20 @@ def resort_map(request):
     })
 
 
+@cache_public_page
 def amenities(request):
     return render(request, 'core/amenities.html')
 
 
+@cache_public_page
 def rates(request):
     packages = RatePackage.objects.all()
     return render(request, 'core/rates.html', {'packages': packages})
 
 
 @login_required
-def contact(request):
+@ratelimit('contact', user='5/h', ip='20/h')
+async def contact(request):
     if request.method == 'POST':
         name = request.POST.get('name', '').strip()
         email = request.POST.get('email', '').strip()
@@ -49,23 +58,14 @@ def contact(request):
             return redirect('core:contact')
 
         if settings.EMAIL_HOST_USER:
-            try:
-                send_mail(
-                    subject=f"[Resort Contact] {subject or 'No Subject'}",
-                    message=f"From: {name} <{email}>\n\n{message_body}",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.EMAIL_HOST_USER],
-                    fail_silently=False,
-                )
-            except Exception:
-                messages.warning(
-                    request,
-                    'We received your message but could not send a confirmation email. '
-                    'We will get back to you soon!'
-                )
-                return redirect('core:contact')
+            await aqueue_email(
+                subject=f"[Resort Contact] {subject or 'No Subject'}",
+                message=f"From: {name} <{email}>\n\n{message_body}",
+                recipient_list=[settings.EMAIL_HOST_USER],
+            )
 
         messages.success(request, 'Thank you for your message! We will get back to you soon.')
         return redirect('core:contact')
 
-    return render(request, 'core/contact.html')
+    # Context processors read request.user, which may hit the database.
+    return await sync_to_async(render)(request, 'core/contact.html')
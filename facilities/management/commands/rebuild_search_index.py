@@ -0,0 +1,43 @@
+"""
+Rebuild the facility/rate-package search index from scratch.
+
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --bench "poo"   # also time a query
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from facilities.models import SearchEntry
+from facilities.search import autocomplete, ranked_entry_ids, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate every SearchEntry (the database triggers refresh the text index).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bench', metavar='QUERY',
+                            help='Time ranked search and autocomplete for QUERY afterwards.')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {SearchEntry.objects.count()} entries in {time.perf_counter() - began:.2f}s."
+        ))
+
+        query = options['bench']
+        if not query:
+            return
+        iterations = options['iterations']
+        for label, fn in (('ranked search', ranked_entry_ids), ('autocomplete', autocomplete)):
+            began = time.perf_counter()
+            for _ in range(iterations):
+                results = fn(query)
+            elapsed = (time.perf_counter() - began) / iterations * 1000
+            self.stdout.write(f"{label:14} {elapsed:.3f} ms/call, {len(results)} results")
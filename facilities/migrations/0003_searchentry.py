@@ -0,0 +1,129 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:34
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+FTS_TABLE = 'facilities_searchentry_fts'
+
+POSTGRESQL_INDEX = [
+    """
+    CREATE FUNCTION facilities_searchentry_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.extra, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER facilities_searchentry_vector_update
+    BEFORE INSERT OR UPDATE OF title, body, extra ON facilities_searchentry
+    FOR EACH ROW EXECUTE FUNCTION facilities_searchentry_vector()
+    """,
+    'CREATE INDEX facilities_searchentry_vector_gin ON facilities_searchentry USING gin (search_vector)',
+]
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, extra,
+        content='facilities_searchentry', content_rowid='id',
+        tokenize='porter unicode61', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_fts_insert AFTER INSERT ON facilities_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body, extra) VALUES (new.id, new.title, new.body, new.extra);
+    END
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_fts_delete AFTER DELETE ON facilities_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body, extra)
+        VALUES ('delete', old.id, old.title, old.body, old.extra);
+    END
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_fts_update AFTER UPDATE ON facilities_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body, extra)
+        VALUES ('delete', old.id, old.title, old.body, old.extra);
+        INSERT INTO {FTS_TABLE}(rowid, title, body, extra) VALUES (new.id, new.title, new.body, new.extra);
+    END
+    """,
+]
+
+DROP_INDEX = {
+    'postgresql': [
+        'DROP TRIGGER IF EXISTS facilities_searchentry_vector_update ON facilities_searchentry',
+        'DROP FUNCTION IF EXISTS facilities_searchentry_vector()',
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS facilities_searchentry_fts_insert',
+        'DROP TRIGGER IF EXISTS facilities_searchentry_fts_delete',
+        'DROP TRIGGER IF EXISTS facilities_searchentry_fts_update',
+        f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends fall back to icontains in facilities.search.
+    statements = {'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def backfill_search_entries(apps, schema_editor):
+    Facility = apps.get_model('facilities', 'Facility')
+    RatePackage = apps.get_model('core', 'RatePackage')
+    SearchEntry = apps.get_model('facilities', 'SearchEntry')
+
+    entries = []
+    for facility in Facility.objects.prefetch_related('virtual_tours'):
+        tours = ' '.join(tour.title for tour in facility.virtual_tours.all())
+        entries.append(SearchEntry(
+            kind='facility', object_id=facility.pk,
+            title=facility.name[:200], body=facility.description, extra=tours,
+        ))
+    for package in RatePackage.objects.all():
+        entries.append(SearchEntry(
+            kind='rate_package', object_id=package.pk,
+            title=package.name[:200], body=package.inclusions, extra=package.note,
+        ))
+    # The database triggers created above fill the text index.
+    SearchEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_imagederivative'),
+        ('facilities', '0002_facility_map_x_facility_map_y'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('facility', 'Facility'), ('rate_package', 'Rate Package')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('extra', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Search entries',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_unique')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0003_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facility',
+            index=models.Index(fields=['is_available', 'name', 'id'], name='facility_available_name_idx'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+FTS_TABLE = 'facilities_searchentry_fts'
+PREFIX_TABLE = 'facilities_searchentry_prefix'
+
+# The 0003 trigger only fills the stemmed vector; this version also fills
+# the unstemmed ('simple') one used for prefix matching.
+POSTGRESQL_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION facilities_searchentry_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.extra, '')), 'C');
+        NEW.prefix_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.body, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.extra, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+POSTGRESQL_OLD_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION facilities_searchentry_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.extra, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+POSTGRESQL_INDEX = [
+    POSTGRESQL_VECTOR_FUNCTION,
+    'CREATE INDEX facilities_searchentry_prefix_gin ON facilities_searchentry USING gin (prefix_vector)',
+    # Fire the trigger for the existing rows.
+    'UPDATE facilities_searchentry SET title = title',
+]
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {PREFIX_TABLE} USING fts5(
+        title, body, extra,
+        content='facilities_searchentry', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_prefix_insert AFTER INSERT ON facilities_searchentry BEGIN
+        INSERT INTO {PREFIX_TABLE}(rowid, title, body, extra) VALUES (new.id, new.title, new.body, new.extra);
+    END
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_prefix_delete AFTER DELETE ON facilities_searchentry BEGIN
+        INSERT INTO {PREFIX_TABLE}({PREFIX_TABLE}, rowid, title, body, extra)
+        VALUES ('delete', old.id, old.title, old.body, old.extra);
+    END
+    """,
+    f"""
+    CREATE TRIGGER facilities_searchentry_prefix_update AFTER UPDATE ON facilities_searchentry BEGIN
+        INSERT INTO {PREFIX_TABLE}({PREFIX_TABLE}, rowid, title, body, extra)
+        VALUES ('delete', old.id, old.title, old.body, old.extra);
+        INSERT INTO {PREFIX_TABLE}(rowid, title, body, extra) VALUES (new.id, new.title, new.body, new.extra);
+    END
+    """,
+    f"INSERT INTO {PREFIX_TABLE}({PREFIX_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_INDEX = {
+    'postgresql': [
+        'DROP INDEX IF EXISTS facilities_searchentry_prefix_gin',
+        POSTGRESQL_OLD_VECTOR_FUNCTION,
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS facilities_searchentry_prefix_insert',
+        'DROP TRIGGER IF EXISTS facilities_searchentry_prefix_delete',
+        'DROP TRIGGER IF EXISTS facilities_searchentry_prefix_update',
+        f'DROP TABLE IF EXISTS {PREFIX_TABLE}',
+    ],
+}
+
+
+def create_prefix_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_prefix_index(apps, schema_editor):
+    for sql in DROP_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0004_facility_available_name_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchentry',
+            name='prefix_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -24,6 +25,10 @@ class Facility(models.Model):
     class Meta:
         verbose_name_plural = 'Facilities'
         ordering = ['name']
+        indexes = [
+            # Keyset pagination of the public facility list.
+            models.Index(fields=['is_available', 'name', 'id'], name='facility_available_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -72,3 +77,34 @@ class VirtualTour(models.Model):
 
     def __str__(self):
         return f"{self.title} ({self.get_media_type_display()})"
+
+
+class SearchEntry(models.Model):
+    """
+    Denormalised search document for a facility (name, description, virtual
+    tour titles) or a rate package (name, inclusions, note). Indexed twice,
+    stemmed for whole words and unstemmed for prefixes: tsvectors + GIN
+    indexes on PostgreSQL and FTS5 tables on SQLite, all filled by database
+    triggers (facilities migrations 0003 and 0005).
+    """
+
+    class Kind(models.TextChoices):
+        FACILITY = 'facility', 'Facility'
+        RATE_PACKAGE = 'rate_package', 'Rate Package'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    extra = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    prefix_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_unique'),
+        ]
+        verbose_name_plural = 'Search entries'
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
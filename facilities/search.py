@@ -0,0 +1,217 @@
+"""
+Full-text search over facilities and rate packages.
+
+SearchEntry rows are kept in step with Facility, VirtualTour and
+RatePackage by signals; the database keeps two text indexes in step with
+SearchEntry (weighted tsvectors + GIN indexes on PostgreSQL, FTS5 tables
+on SQLite). The stemmed index matches whole words in any form ("swims"
+finds "Swimming"); stemmed prefixes miss words mid-way ("swimm" is not a
+prefix of "swim"), so the unstemmed index matches each term as a prefix
+and results update as the visitor types. A term may match either way.
+Hits are ordered by relevance: name matches rank above
+description/inclusion matches, which rank above tour titles.
+"""
+
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.urls import reverse
+
+from core.page_cache import page_generation
+from .models import Facility, SearchEntry
+
+FTS_TABLE = 'facilities_searchentry_fts'
+PREFIX_TABLE = 'facilities_searchentry_prefix'
+MAX_TERMS = 8
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_CACHE_TIMEOUT = 60 * 10
+
+# FTS5 bm25() column weights, in table column order (title, body, extra).
+BM25_WEIGHTS = (10.0, 4.0, 2.0)
+
+
+def search_terms(query):
+    """Lower-cased word tokens of ``query``; anything else is dropped."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def facility_document(facility):
+    tours = ' '.join(facility.virtual_tours.values_list('title', flat=True))
+    return facility.name, facility.description, tours
+
+
+def rate_package_document(package):
+    return package.name, package.inclusions, package.note
+
+
+def _store(model, kind, object_id, document):
+    title, body, extra = document
+    model.objects.update_or_create(
+        kind=kind, object_id=object_id,
+        defaults={'title': title[:200], 'body': body, 'extra': extra},
+    )
+
+
+def index_facility(facility_id):
+    facility = Facility.objects.filter(pk=facility_id).first()
+    if facility is None:
+        remove_entry(SearchEntry.Kind.FACILITY, facility_id)
+        return
+    _store(SearchEntry, SearchEntry.Kind.FACILITY, facility.pk, facility_document(facility))
+
+
+def index_rate_package(package_id):
+    from core.models import RatePackage
+
+    package = RatePackage.objects.filter(pk=package_id).first()
+    if package is None:
+        remove_entry(SearchEntry.Kind.RATE_PACKAGE, package_id)
+        return
+    _store(SearchEntry, SearchEntry.Kind.RATE_PACKAGE, package.pk, rate_package_document(package))
+
+
+def remove_entry(kind, object_id):
+    SearchEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index():
+    """Recreate every SearchEntry."""
+    from core.models import RatePackage
+
+    SearchEntry.objects.all().delete()
+    for facility in Facility.objects.prefetch_related('virtual_tours'):
+        tours = ' '.join(tour.title for tour in facility.virtual_tours.all())
+        _store(SearchEntry, SearchEntry.Kind.FACILITY, facility.pk, (facility.name, facility.description, tours))
+    for package in RatePackage.objects.all():
+        _store(SearchEntry, SearchEntry.Kind.RATE_PACKAGE, package.pk, rate_package_document(package))
+
+
+def _ranked_ids_postgresql(terms, kind, limit):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    def words(terms):
+        return SearchQuery(' | '.join(terms), search_type='raw', config='english')
+
+    def prefixes(terms):
+        return SearchQuery(' | '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+
+    entries = SearchEntry.objects.all()
+    for term in terms:
+        entries = entries.filter(Q(search_vector=words([term])) | Q(prefix_vector=prefixes([term])))
+    if kind:
+        entries = entries.filter(kind=kind)
+    rank = SearchRank(F('search_vector'), words(terms)) + SearchRank(F('prefix_vector'), prefixes(terms))
+    return list(
+        entries.annotate(rank=rank)
+        .order_by('-rank', 'title')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _ranked_ids_sqlite(terms, kind, limit):
+    weights = ', '.join(map(str, BM25_WEIGHTS))
+    term_matches = (
+        f'e.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'UNION SELECT rowid FROM {PREFIX_TABLE} WHERE {PREFIX_TABLE} MATCH %s)'
+    )
+    # bm25() is negative, lower is better; a row missing from one index adds 0.
+    rank = ' + '.join(
+        f'coalesce((SELECT bm25({table}, {weights}) FROM {table} '
+        f'WHERE {table} MATCH %s AND rowid = e.id), 0)'
+        for table in (FTS_TABLE, PREFIX_TABLE)
+    )
+    sql = (
+        'SELECT e.id FROM facilities_searchentry e WHERE ' +
+        ' AND '.join([term_matches] * len(terms)) + (' AND e.kind = %s' if kind else '') +
+        f' ORDER BY {rank}, e.title LIMIT %s'
+    )
+    params = [match for term in terms for match in (f'"{term}"', f'"{term}"*')]
+    if kind:
+        params.append(kind)
+    params += [
+        ' OR '.join(f'"{term}"' for term in terms),
+        ' OR '.join(f'"{term}"*' for term in terms),
+        limit,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _ranked_ids_fallback(terms, kind, limit):
+    entries = SearchEntry.objects.all()
+    if kind:
+        entries = entries.filter(kind=kind)
+    for term in terms:
+        entries = entries.filter(
+            Q(title__icontains=term) | Q(body__icontains=term) | Q(extra__icontains=term)
+        )
+    return list(entries.order_by('title').values_list('pk', flat=True)[:limit])
+
+
+def ranked_entry_ids(query, kind=None, limit=20):
+    """SearchEntry ids matching every term of ``query`` as a word or a prefix, best first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if connection.vendor == 'postgresql':
+        return _ranked_ids_postgresql(terms, kind, limit)
+    if connection.vendor == 'sqlite':
+        return _ranked_ids_sqlite(terms, kind, limit)
+    return _ranked_ids_fallback(terms, kind, limit)
+
+
+def search_facilities(query, limit=50):
+    """Available facilities matching ``query``, ordered by relevance."""
+    ids = ranked_entry_ids(query, kind=SearchEntry.Kind.FACILITY, limit=limit)
+    facility_ids = dict(
+        SearchEntry.objects.filter(pk__in=ids).values_list('pk', 'object_id')
+    )
+    facilities = Facility.objects.filter(
+        pk__in=facility_ids.values(), is_available=True,
+    ).in_bulk()
+    return [
+        facilities[facility_ids[pk]]
+        for pk in ids if facility_ids.get(pk) in facilities
+    ]
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Suggestions for the search box as ``[{'kind', 'title', 'url'}]``,
+    cached until facilities, tours or rates next change.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    key = f'search-autocomplete:{page_generation()}:{limit}:{" ".join(terms)}'
+    suggestions = cache.get(key)
+    if suggestions is not None:
+        return suggestions
+
+    ids = ranked_entry_ids(query, limit=limit * 2)
+    entries = SearchEntry.objects.in_bulk(ids)
+    slugs = dict(
+        Facility.objects.filter(
+            is_available=True,
+            pk__in=[e.object_id for e in entries.values() if e.kind == SearchEntry.Kind.FACILITY],
+        ).values_list('pk', 'slug')
+    )
+    suggestions = []
+    for pk in ids:
+        entry = entries.get(pk)
+        if entry is None:
+            continue
+        if entry.kind == SearchEntry.Kind.FACILITY:
+            if entry.object_id not in slugs:
+                continue
+            url = reverse('facilities:detail', kwargs={'slug': slugs[entry.object_id]})
+        else:
+            url = reverse('core:rates')
+        suggestions.append({'kind': entry.kind, 'title': entry.title, 'url': url})
+        if len(suggestions) == limit:
+            break
+    cache.set(key, suggestions, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,39 @@
+"""
+Keep SearchEntry rows in step with the facilities, virtual tours and rate
+packages they index.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import RatePackage
+from .models import Facility, SearchEntry, VirtualTour
+from .search import index_facility, index_rate_package, remove_entry
+
+
+@receiver(post_save, sender=Facility)
+def index_facility_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_facility(instance.pk))
+
+
+@receiver(post_delete, sender=Facility)
+def remove_facility_entry(sender, instance, **kwargs):
+    remove_entry(SearchEntry.Kind.FACILITY, instance.pk)
+
+
+@receiver(post_save, sender=VirtualTour)
+@receiver(post_delete, sender=VirtualTour)
+def index_tour_facility(sender, instance, **kwargs):
+    facility_id = instance.facility_id
+    transaction.on_commit(lambda: index_facility(facility_id))
+
+
+@receiver(post_save, sender=RatePackage)
+def index_rate_package_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_rate_package(instance.pk))
+
+
+@receiver(post_delete, sender=RatePackage)
+def remove_rate_package_entry(sender, instance, **kwargs):
+    remove_entry(SearchEntry.Kind.RATE_PACKAGE, instance.pk)
@@ -1,3 +1,95 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from core.query_budget import QueryBudgetMixin
+from .models import Facility, FacilityImage, SearchEntry, VirtualTour
+from .search import ranked_entry_ids
+
+
+def facility_hits(query):
+    # The seeded rate packages mention swimming too; only facilities matter here.
+    return ranked_entry_ids(query, kind=SearchEntry.Kind.FACILITY)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pool = Facility.objects.create(
+                name='Swimming Pool', slug='swimming-pool', capacity=20, price_per_day=Decimal('3000.00'),
+                description='Infinity pool overlooking the bay.',
+            )
+            Facility.objects.create(
+                name='Garden Cottage', slug='garden-cottage', capacity=4, price_per_day=Decimal('1500.00'),
+                description='Quiet cottage beside the orchard.',
+            )
+        self.pool_entry = SearchEntry.objects.get(kind=SearchEntry.Kind.FACILITY, object_id=self.pool.pk)
+
+    def test_mid_word_prefixes_match(self):
+        for query in ('sw', 'swi', 'swim', 'swimm', 'swimmi', 'swimmin', 'swimming', 'swimming po'):
+            with self.subTest(query=query):
+                self.assertEqual(facility_hits(query), [self.pool_entry.pk])
+
+    def test_whole_words_match_other_forms(self):
+        self.assertEqual(facility_hits('swims'), [self.pool_entry.pk])
+        self.assertEqual(facility_hits('pools overlook'), [self.pool_entry.pk])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(facility_hits('swimm cottage'), [])
+
+    def test_autocomplete_suggests_mid_word(self):
+        response = self.client.get(reverse('facilities:autocomplete'), {'q': 'swimm'})
+        self.assertEqual(response.json()['results'][0]['title'], 'Swimming Pool')
+
+
+class FacilityQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Facility pages run the same queries for 10 rows as for 10,000."""
+
+    def setUp(self):
+        # bulk_create skips the save signals (derivatives, search index).
+        self.facility, = Facility.objects.bulk_create([Facility(
+            name='Budget Facility', slug='budget-facility', description='Query budget fixture.',
+            capacity=10, price_per_day=Decimal('1000'), image='facilities/budget.jpg',
+        )])
+        self.size = 0
+
+    def grow(self, size):
+        new = range(self.size, size)
+        self.size = size
+        FacilityImage.objects.bulk_create([
+            FacilityImage(facility=self.facility, image=f'facilities/gallery/budget-{i}.jpg', order=i)
+            for i in new
+        ])
+        VirtualTour.objects.bulk_create([
+            VirtualTour(
+                facility=self.facility, title=f'Tour {i}', media_type=VirtualTour.MediaType.IMAGE,
+                media_file=f'virtual_tours/budget-{i}.jpg', thumbnail=f'virtual_tours/thumbs/budget-{i}.jpg',
+                order=i,
+            )
+            for i in new
+        ])
+        Facility.objects.bulk_create([
+            Facility(
+                name=f'Facility {i}', slug=f'facility-{i}', description='Fixture.',
+                capacity=10, price_per_day=Decimal('1000'), image=f'facilities/budget-{i}.jpg',
+            )
+            for i in new
+        ])
 
-# Create your tests here.
+    def test_facility_pages(self):
+        slug = {'slug': self.facility.slug}
+        budgets = (
+            (reverse('facilities:list'), 4),
+            (reverse('facilities:list_page'), 4),
+            (reverse('facilities:detail', kwargs=slug), 6),
+            (reverse('facilities:virtual_tour', kwargs=slug), 4),
+        )
+        for size in (10, 10000):
+            self.grow(size)
+            for url, budget in budgets:
+                with self.subTest(url=url, rows=size):
+                    cache.clear()
+                    self.assertMaxQueries(url, budget)
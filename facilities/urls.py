@@ -5,6 +5,8 @@ app_name = 'facilities'
 
 urlpatterns = [
     path('', views.facility_list, name='list'),
+    path('page/', views.facility_list_page, name='list_page'),
+    path('autocomplete/', views.search_autocomplete, name='autocomplete'),
     path('<slug:slug>/', views.facility_detail, name='detail'),
     path('<slug:slug>/virtual-tour/', views.virtual_tour_view, name='virtual_tour'),
 ]
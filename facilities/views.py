@@ -1,38 +1,109 @@
-from django.shortcuts import render, get_object_or_404
-from .models import Facility
+from django.db.models import Prefetch
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from core.images import prime_renditions
+from core.pagination import InvalidCursor, page_json, paginate
+from core.page_cache import cache_public_page
+from .models import Facility, FacilityImage
+from .search import autocomplete, search_facilities
 
 
+FACILITY_ORDERING = ('name', 'pk')
+FACILITY_CARD_FIELDS = ('name', 'slug', 'description', 'image', 'price_per_day', 'capacity')
+
+
+def _facility_page(request):
+    facilities = Facility.objects.filter(is_available=True).only(*FACILITY_CARD_FIELDS)
+    return paginate(request, facilities, FACILITY_ORDERING)
+
+
+@cache_public_page
 def facility_list(request):
     """Display all available facilities (supports search, Process 2.1)."""
-    facilities = Facility.objects.filter(is_available=True)
-
-    # Simple search
+    # Ranked full-text search over names, descriptions and tour titles
     query = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor', '')
     if query:
-        facilities = facilities.filter(name__icontains=query)
+        facilities, next_cursor = search_facilities(query), None
+    else:
+        try:
+            page = _facility_page(request)
+        except InvalidCursor:
+            return redirect('facilities:list')
+        facilities, next_cursor = page.items, page.next_cursor
 
     return render(request, 'facilities/facility_list.html', {
         'facilities': facilities,
         'query': query,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
     })
 
 
+@cache_public_page
+def facility_list_page(request):
+    """Next page of facility cards for infinite scroll (JSON)."""
+    try:
+        page = _facility_page(request)
+    except InvalidCursor as e:
+        return HttpResponseBadRequest(str(e))
+    return page_json(
+        request, page, 'facilities/_facility_cards.html', {'facilities': page.items},
+        serialize=lambda facility: {
+            'id': facility.pk,
+            'name': facility.name,
+            'slug': facility.slug,
+            'capacity': facility.capacity,
+            'price_per_day': str(facility.price_per_day),
+        },
+        json_url=reverse('facilities:list_page'),
+        html_url=reverse('facilities:list'),
+    )
+
+
+def search_autocomplete(request):
+    """Search-as-you-type suggestions for facilities and rate packages (JSON)."""
+    query = request.GET.get('q', '').strip()[:100]
+    response = JsonResponse({'query': query, 'results': autocomplete(query)})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+@cache_public_page
 def facility_detail(request, slug):
     """Show facility details, gallery, and virtual tour content (Process 4.0)."""
-    facility = get_object_or_404(Facility, slug=slug)
+    facility = get_object_or_404(
+        Facility.objects.prefetch_related(
+            Prefetch(
+                'gallery_images',
+                queryset=FacilityImage.objects.only('facility_id', 'image', 'caption', 'order'),
+            ),
+            'virtual_tours',
+        ),
+        slug=slug,
+    )
     gallery = facility.gallery_images.all()
     tours = facility.virtual_tours.all()
+    # One lookup for every image the page renders instead of one per image.
+    image_renditions = prime_renditions(
+        [facility.image.name] + [img.image.name for img in gallery] + [tour.thumbnail.name for tour in tours]
+    )
 
     return render(request, 'facilities/facility_detail.html', {
         'facility': facility,
         'gallery': gallery,
         'tours': tours,
+        'image_renditions': image_renditions,
     })
 
 
 def virtual_tour_view(request, slug):
     """Dedicated virtual tour page for a facility."""
-    facility = get_object_or_404(Facility, slug=slug)
+    facility = get_object_or_404(
+        Facility.objects.only('name', 'slug').prefetch_related('virtual_tours'), slug=slug,
+    )
     tours = facility.virtual_tours.all()
 
     return render(request, 'facilities/virtual_tour.html', {
@@ -0,0 +1,45 @@
+"""
+gunicorn settings for the WSGI app; gunicorn picks this file up from the
+working directory.
+
+Migrations are not run here: ``manage.py bootstrap`` runs once per release
+(the Procfile ``release`` process, build.sh on Render), so starting or
+adding a worker only has to import the app. Point the platform's health
+check at /readyz; /healthz is the liveness probe.
+
+Usage:
+    gunicorn backend.wsgi
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Each sync worker holds a full copy of the app, and cpu_count() reports the
+# host's cores rather than the container's share, so default to a count a
+# small instance can hold in memory. Set WEB_CONCURRENCY to size up.
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+threads = int(os.environ.get('WEB_THREADS') or 1)
+# backend.database sizes the connection pools from these.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['WEB_THREADS'] = str(threads)
+
+# Import Django and the project once in the master; workers fork from it.
+preload_app = True
+
+# Recycle workers now and then to bound memory growth; the jitter keeps
+# them from all restarting at once.
+max_requests = 1000
+max_requests_jitter = 100
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes. Nothing should be
+    # open after preloading, but make sure.
+    from django.db import connections
+
+    connections.close_all()
@@ -0,0 +1,32 @@
+"""
+gunicorn profile for serving backend.asgi on uvicorn workers; this is
+what the Procfile and render.yaml run.
+
+Each worker runs one event loop for its whole life, so the async payment
+and contact views keep serving other requests while they wait on PayMongo,
+and the worker's one httpx client keeps its PayMongo connections alive
+between requests. The sync views still run, in a thread pool.
+
+Usage:
+    gunicorn -c gunicorn_asgi.conf.py backend.asgi:application
+
+or, without gunicorn supervising the workers:
+    uvicorn backend.asgi:application --host 0.0.0.0 --port $PORT --workers 2
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn_worker.UvicornWorker'
+# A worker is no longer tied up by a slow upstream, so a couple of them go
+# a long way. cpu_count() reports the host's cores, not the container's
+# share, so it is not used; set WEB_CONCURRENCY to size up.
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+# backend.database sizes the connection pools from this.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+max_requests = 1000
+max_requests_jitter = 100
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
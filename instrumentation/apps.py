@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class InstrumentationConfig(AppConfig):
+    name = 'instrumentation'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import install_sql_wrapper
+
+        connection_created.connect(install_sql_wrapper)
@@ -0,0 +1,218 @@
+"""
+In-process request metrics.
+
+Each request gets a RequestStats (held in a context variable) that the
+SQL execute wrapper, the instrumented template backend and the PayMongo /
+SMTP clients add their timings to. When the request finishes the totals
+are folded into per-route histograms in ``registry``, which ``/metrics``
+renders in the Prometheus text format.
+
+Values are per process: with several gunicorn workers each one reports
+its own series, like any multi-process Prometheus target.
+"""
+
+import contextvars
+import threading
+import time
+
+# Upper bounds in seconds, shared by every duration histogram.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+# psycopg_pool get_stats() keys exported as gauges.
+POOL_GAUGES = (
+    'pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting',
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors', 'connections_lost',
+)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Timings collected while one request is handled."""
+
+    __slots__ = ('sql_count', 'sql_seconds', 'connect_seconds', 'template_seconds', 'external')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.connect_seconds = 0.0
+        self.template_seconds = 0.0
+        self.external = {}
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """
+    Execute wrapper on every database connection, timing queries into the
+    current request's stats. Installed per connection rather than around
+    the request because async views run their queries on other threads,
+    each with its own connection; the context variable follows them there.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - began
+        stats.sql_count += 1
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """``connection_created`` receiver."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_template(seconds):
+    stats = _current.get()
+    if stats is not None:
+        stats.template_seconds += seconds
+
+
+def record_external(service, seconds):
+    """
+    Time spent calling an outside service (``paymongo``, ``smtp``). Counted
+    in the current request's breakdown when there is one, and always in the
+    per-service histogram.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.external[service] = stats.external.get(service, 0.0) + seconds
+    registry.observe('resort_external_call_seconds', (('service', service),), seconds)
+
+
+def record_connection_wait(alias, pooled, seconds):
+    """Time spent getting a database connection, from a pool or a new one."""
+    stats = _current.get()
+    if stats is not None:
+        stats.connect_seconds += seconds
+    registry.observe(
+        'resort_db_connection_wait_seconds',
+        (('alias', alias), ('pooled', 'true' if pooled else 'false')),
+        seconds,
+    )
+
+
+def collect_pool_stats():
+    """Copy the psycopg pool counters of every pooled database into gauges."""
+    from django.db import connections
+
+    for alias in connections:
+        if not connections.settings[alias].get('OPTIONS', {}).get('pool'):
+            continue
+        stats = connections[alias].pool.get_stats()
+        for key in POOL_GAUGES:
+            registry.set('resort_db_pool', (('alias', alias), ('stat', key)), stats.get(key, 0))
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by (metric, labels)."""
+
+    METRICS = {
+        'resort_http_requests_total': ('counter', 'Requests handled, by route, method and status.', None),
+        'resort_http_request_duration_seconds': ('histogram', 'Wall time per request.', DURATION_BUCKETS),
+        'resort_db_queries_per_request': ('histogram', 'SQL queries per request.', QUERY_COUNT_BUCKETS),
+        'resort_db_query_duration_seconds': ('histogram', 'Total SQL time per request.', DURATION_BUCKETS),
+        'resort_template_render_duration_seconds': ('histogram', 'Template render time per request.', DURATION_BUCKETS),
+        'resort_external_call_seconds': ('histogram', 'Time per call to PayMongo or SMTP.', DURATION_BUCKETS),
+        'resort_db_connection_wait_seconds': (
+            'histogram', 'Time to get a database connection (pool checkout or new connection).', DURATION_BUCKETS,
+        ),
+        'resort_db_pool': ('gauge', 'psycopg connection pool statistics, per worker process.', None),
+        'resort_ratelimit_rejections_total': ('counter', 'Requests rejected by a rate limit, by scope and key.', None),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {name: {} for name in self.METRICS}
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            series = self._series[name]
+            series[labels] = series.get(labels, 0) + amount
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._series[name][labels] = value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(self.METRICS[name][2])
+            histogram.observe(value)
+
+    def record_request(self, route, method, status, seconds, stats):
+        labels = (('route', route), ('method', method))
+        self.inc('resort_http_requests_total', labels + (('status', str(status)),))
+        self.observe('resort_http_request_duration_seconds', labels, seconds)
+        self.observe('resort_db_queries_per_request', labels, stats.sql_count)
+        self.observe('resort_db_query_duration_seconds', labels, stats.sql_seconds)
+        self.observe('resort_template_render_duration_seconds', labels, stats.template_seconds)
+
+    def reset(self):
+        with self._lock:
+            self._series = {name: {} for name in self.METRICS}
+
+    def render(self):
+        """Every series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, _) in self.METRICS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(self._series[name].items()):
+                    if kind in ('counter', 'gauge'):
+                        lines.append(f'{name}{_labels(labels)} {value}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels, (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(labels, (("le", "+Inf"),))} {value.count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,86 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import end_request, registry, start_request
+
+TIMING_HEADER = 'HTTP_X_REQUEST_TIMING'
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and count its SQL, template and outbound HTTP time
+    into the per-route metrics served at /metrics.
+
+    Send ``X-Request-Timing: 1`` (as staff, or with DEBUG on) to get the
+    breakdown back in a ``Server-Timing`` response header.
+
+    Works in both modes, so async views stay async under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = start_request()
+        began = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        elapsed = time.perf_counter() - began
+
+        registry.record_request(_route(request), request.method, response.status_code, elapsed, stats)
+        if request.META.get(TIMING_HEADER):
+            user = getattr(request, 'user', None)
+            if self._may_see_timing(user):
+                response['Server-Timing'] = self._server_timing(elapsed, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats, token = start_request()
+        began = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        elapsed = time.perf_counter() - began
+
+        registry.record_request(_route(request), request.method, response.status_code, elapsed, stats)
+        if request.META.get(TIMING_HEADER):
+            user = await request.auser() if hasattr(request, 'auser') else None
+            if self._may_see_timing(user):
+                response['Server-Timing'] = self._server_timing(elapsed, stats)
+        return response
+
+    @staticmethod
+    def _may_see_timing(user):
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    @staticmethod
+    def _server_timing(elapsed, stats):
+        parts = [
+            f'total;dur={elapsed * 1000:.1f}',
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"',
+            f'dbconn;dur={stats.connect_seconds * 1000:.1f}',
+            f'tpl;dur={stats.template_seconds * 1000:.1f}',
+        ]
+        parts += [
+            f'{service};dur={seconds * 1000:.1f}'
+            for service, seconds in sorted(stats.external.items())
+        ]
+        return ', '.join(parts)
@@ -0,0 +1,23 @@
+"""
+PostgreSQL backend that times how long getting a connection takes.
+
+With the psycopg pool that is the wait for a free pooled connection;
+without it, the TCP/TLS/auth handshake of a new one. Either way it is
+time the request spent before its first query could run.
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from ..metrics import record_connection_wait
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        began = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_connection_wait(self.alias, self.pool is not None, time.perf_counter() - began)
@@ -0,0 +1,35 @@
+"""
+Django template backend that reports render time to the request metrics.
+
+Configured as the TEMPLATES backend in settings; otherwise identical to
+django.template.backends.django.DjangoTemplates.
+"""
+
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .metrics import record_template
+
+
+class Template(django_backend.Template):
+
+    def render(self, context=None, request=None):
+        began = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record_template(time.perf_counter() - began)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,143 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .metrics import RequestStats, end_request, record_external, registry, start_request
+from .middleware import InstrumentationMiddleware
+
+TIMING = {'X-Request-Timing': '1'}
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def series(self, name):
+        return registry._series[name]
+
+    def login(self, **fields):
+        user = get_user_model().objects.create_user(username='member', password='member-password', **fields)
+        self.client.force_login(user)
+        return user
+
+
+class InstrumentationMiddlewareTests(MetricsTestCase):
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get(reverse('core:rates'))
+        self.client.get(reverse('core:rates'))
+        self.client.get('/no-such-page/')
+
+        requests = self.series('resort_http_requests_total')
+        self.assertEqual(requests[(('route', 'core:rates'), ('method', 'GET'), ('status', '200'))], 2)
+        self.assertEqual(requests[(('route', 'unmatched'), ('method', 'GET'), ('status', '404'))], 1)
+
+        route = (('route', 'core:rates'), ('method', 'GET'))
+        self.assertEqual(self.series('resort_http_request_duration_seconds')[route].count, 2)
+        queries = self.series('resort_db_queries_per_request')[route]
+        # The first render reads the rate packages; the second is a page-cache hit.
+        self.assertEqual((queries.count, queries.sum), (2, 1))
+        self.assertGreater(self.series('resort_template_render_duration_seconds')[route].sum, 0)
+
+    def test_breakdown_header_is_opt_in_for_staff(self):
+        url = reverse('facilities:list')
+        self.assertNotIn('Server-Timing', self.client.get(url, headers=TIMING))
+
+        self.login(is_staff=True)
+        self.assertNotIn('Server-Timing', self.client.get(url))
+        timing = self.client.get(url, headers=TIMING)['Server-Timing']
+        names = [part.split(';')[0] for part in timing.split(', ')]
+        self.assertEqual(names, ['total', 'db', 'dbconn', 'tpl'])
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_breakdown_header_is_refused_to_other_members(self):
+        self.login()
+        self.assertNotIn('Server-Timing', self.client.get(reverse('facilities:list'), headers=TIMING))
+
+    @override_settings(DEBUG=True)
+    def test_breakdown_header_for_anyone_with_debug(self):
+        self.assertIn('Server-Timing', self.client.get(reverse('core:about'), headers=TIMING))
+
+    async def test_async_views_are_measured_too(self):
+        staff = await sync_to_async(get_user_model().objects.create_user)(
+            username='staff', password='staff-password', is_staff=True,
+        )
+        await self.async_client.aforce_login(staff)
+        response = await self.async_client.get(reverse('core:contact'), headers=TIMING)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'tpl;dur=[\d.]+')
+        requests = self.series('resort_http_requests_total')
+        self.assertEqual(requests[(('route', 'core:contact'), ('method', 'GET'), ('status', '200'))], 1)
+
+
+class MetricsEndpointTests(MetricsTestCase):
+
+    def test_hidden_without_a_token_or_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_requires_the_bearer_token(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+
+        self.client.get(reverse('core:rates'))
+        response = self.client.get(url, headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE resort_http_requests_total counter', body)
+        self.assertIn('resort_http_requests_total{route="core:rates",method="GET",status="200"} 1', body)
+        self.assertIn('resort_db_queries_per_request_bucket{route="core:rates",method="GET",le="+Inf"} 1', body)
+
+    @override_settings(DEBUG=True)
+    def test_served_with_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class RegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_histograms_render_cumulative_buckets(self):
+        labels = (('route', 'home'), ('method', 'GET'))
+        for seconds in (0.004, 0.02, 0.02, 30):
+            registry.observe('resort_http_request_duration_seconds', labels, seconds)
+        lines = registry.render().splitlines()
+
+        def value(le):
+            line = f'resort_http_request_duration_seconds_bucket{{route="home",method="GET",le="{le}"}}'
+            return next(int(entry.split()[-1]) for entry in lines if entry.startswith(line + ' '))
+
+        self.assertEqual([value(0.005), value(0.01), value(0.025), value(10.0), value('+Inf')], [1, 1, 3, 3, 4])
+        self.assertIn('resort_http_request_duration_seconds_count{route="home",method="GET"} 4', lines)
+
+    def test_label_values_are_escaped(self):
+        registry.inc('resort_ratelimit_rejections_total', (('scope', 'login'), ('key', 'a"b\\c\nd')))
+        self.assertIn('resort_ratelimit_rejections_total{scope="login",key="a\\"b\\\\c\\nd"} 1', registry.render())
+
+    def test_external_calls_join_the_current_request(self):
+        stats, token = start_request()
+        try:
+            record_external('paymongo', 0.2)
+            record_external('paymongo', 0.1)
+        finally:
+            end_request(token)
+        record_external('smtp', 0.05)
+
+        self.assertAlmostEqual(stats.external['paymongo'], 0.3)
+        self.assertNotIn('smtp', stats.external)
+        calls = registry._series['resort_external_call_seconds']
+        self.assertEqual(calls[(('service', 'paymongo'),)].count, 2)
+        self.assertEqual(calls[(('service', 'smtp'),)].count, 1)
+        self.assertIn('paymongo;dur=300.0', InstrumentationMiddleware._server_timing(0.5, stats))
+        self.assertNotIn('paymongo', InstrumentationMiddleware._server_timing(0.5, RequestStats()))
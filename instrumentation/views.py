@@ -0,0 +1,62 @@
+import hmac
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import Http404, HttpResponse, JsonResponse
+
+from .metrics import collect_pool_stats, registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint. Requires ``Authorization: Bearer
+    <METRICS_TOKEN>`` when the token is configured; without one it is only
+    served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse('Unauthorized', status=401)
+    elif not settings.DEBUG:
+        raise Http404
+    collect_pool_stats()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+def healthz(request):
+    """Liveness: the worker is up and answering. Touches nothing else."""
+    return JsonResponse({'status': 'ok'})
+
+
+_migrated = False
+
+
+def _migrations_applied():
+    # Once every migration is applied that stays true for this process.
+    global _migrated
+    if not _migrated:
+        executor = MigrationExecutor(connection)
+        _migrated = not executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return _migrated
+
+
+def readyz(request):
+    """
+    Readiness: the database answers and the schema is migrated, so this
+    instance can take traffic. 503 until then.
+    """
+    checks = {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks['database'] = 'ok'
+        checks['migrations'] = 'ok' if _migrations_applied() else 'pending'
+    except DatabaseError as e:
+        checks['database'] = f'error: {e.__class__.__name__}'
+    ready = all(value == 'ok' for value in checks.values()) and 'migrations' in checks
+    return JsonResponse({'status': 'ok' if ready else 'unavailable', 'checks': checks},
+                        status=200 if ready else 503)
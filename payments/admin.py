@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import Payment
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
 
 
 @admin.register(Payment)
@@ -8,3 +10,29 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'payment_method')
     search_fields = ('user__username', 'receipt_number', 'paymongo_checkout_id')
     readonly_fields = ('created_at', 'updated_at')
+    actions = ['mark_refunded']
+
+    def changelist_view(self, request, extra_context=None):
+        refunds_due = Payment.objects.filter(status=Payment.Status.REFUND_DUE).count()
+        if refunds_due:
+            self.message_user(
+                request,
+                f"{refunds_due} payment(s) arrived after their dates were taken and need a refund.",
+                messages.WARNING,
+            )
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description='Mark selected refund-due payments as refunded')
+    def mark_refunded(self, request, queryset):
+        refunded = queryset.filter(status=Payment.Status.REFUND_DUE).update(
+            status=Payment.Status.REFUNDED, updated_at=timezone.now(),
+        )
+        self.message_user(request, f"{refunded} payment(s) marked as refunded.")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'checkout_id', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('event_id', 'checkout_id')
+    readonly_fields = ('attempts', 'last_error', 'received_at', 'processed_at')
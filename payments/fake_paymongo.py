@@ -0,0 +1,151 @@
+"""
+A local stand-in for the PayMongo checkout API.
+
+Implements just the endpoints the app uses (create and retrieve checkout
+sessions) and can inject latency and transient 5xx errors, either at
+random (``error_rate``) or for the next few requests (``fail_next``). Point
+``PAYMONGO_API_URL`` at ``server.base_url`` to use it.
+
+    server = FakePayMongo(latency=0.05).start()
+    ...
+    server.stop()
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer writes so headers and body leave in one packet on keep-alive.
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _fault(self):
+        fake = self.server.fake
+        fault = fake.count_request()
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fault:
+            self._send(fault, {'errors': [{'detail': 'Injected failure'}]})
+            return True
+        if fake.error_rate and random.random() < fake.error_rate:
+            self._send(503, {'errors': [{'detail': 'Injected failure'}]})
+            return True
+        if not self.headers.get('Authorization', '').startswith('Basic '):
+            self._send(401, {'errors': [{'detail': 'Missing credentials'}]})
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self._fault():
+            return
+        if self.path.rstrip('/') != '/v1/checkout_sessions':
+            self._send(404, {'errors': [{'detail': 'Not found'}]})
+            return
+        session = self.server.fake.create_session(payload['data']['attributes'])
+        self._send(200, {'data': session})
+
+    def do_GET(self):
+        if self._fault():
+            return
+        prefix = '/v1/checkout_sessions/'
+        session = self.server.fake.get_session(self.path[len(prefix):]) if self.path.startswith(prefix) else None
+        if session is None:
+            self._send(404, {'errors': [{'detail': 'Not found'}]})
+            return
+        self._send(200, {'data': session})
+
+
+class FakePayMongo:
+    """Threaded HTTP server that mimics PayMongo checkout sessions in memory."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 default_status='awaiting_payment_method'):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.default_status = default_status
+        self.sessions = {}
+        self.requests = 0
+        self._faults = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def count_request(self):
+        """Count a request; return the status to fail it with, if one is queued."""
+        with self._lock:
+            self.requests += 1
+            return self._faults.pop(0) if self._faults else None
+
+    def fail_next(self, *statuses):
+        """Answer the next requests with these error statuses, e.g. ``fail_next(503, 429)``."""
+        with self._lock:
+            self._faults.extend(statuses)
+
+    def create_session(self, attributes):
+        checkout_id = f'cs_{uuid.uuid4().hex[:24]}'
+        session = {
+            'id': checkout_id,
+            'type': 'checkout_session',
+            'attributes': {
+                **attributes,
+                'checkout_url': f'{self.base_url}/checkout/{checkout_id}',
+                'payment_intent': {
+                    'id': f'pi_{uuid.uuid4().hex[:24]}',
+                    'attributes': {'status': self.default_status},
+                },
+            },
+        }
+        with self._lock:
+            self.sessions[checkout_id] = session
+        return session
+
+    def add_session(self, checkout_id, status):
+        """Register a session directly, e.g. for rows created outside the fake."""
+        with self._lock:
+            self.sessions[checkout_id] = {
+                'id': checkout_id,
+                'type': 'checkout_session',
+                'attributes': {'payment_intent': {'attributes': {'status': status}}},
+            }
+
+    def set_status(self, checkout_id, status):
+        with self._lock:
+            self.sessions[checkout_id]['attributes']['payment_intent']['attributes']['status'] = status
+
+    def get_session(self, checkout_id):
+        with self._lock:
+            return self.sessions.get(checkout_id)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,111 @@
+"""
+How many concurrent checkouts can one worker sustain?
+
+Starts the fake PayMongo API with ``--paymongo-latency`` per call and a
+single gunicorn worker, then has N guests hit ``initiate_payment`` (which
+waits on PayMongo) back to back for ``--duration`` seconds at each
+concurrency level, first on a sync WSGI worker and then on a uvicorn ASGI
+worker. A sync worker serves one checkout per PayMongo round-trip; the
+async view lets one worker overlap them. Run ``seed_benchmark_data`` first.
+
+Usage:
+    python manage.py bench_checkout_concurrency --levels 1,8,32,64 --paymongo-latency 0.2
+"""
+
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.loadtest import FunnelUser, StepTimings, start_server, stop_server
+from core.management.commands.seed_benchmark_data import BENCH_PASSWORD, BENCH_PREFIX
+from facilities.models import Facility
+from payments.fake_paymongo import FakePayMongo
+from reservations.models import Reservation
+
+STEP = 'initiate_payment'
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent checkout throughput of one sync and one async worker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--levels', default='1,8,32,64',
+                            help='Comma-separated numbers of concurrent guests.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per level.')
+        parser.add_argument('--paymongo-latency', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        levels = sorted({int(level) for level in options['levels'].split(',')})
+        users = list(
+            get_user_model().objects.filter(username__startswith=BENCH_PREFIX)
+            .order_by('pk')[:levels[-1]]
+        )
+        facility = Facility.objects.filter(slug__startswith=BENCH_PREFIX).first()
+        if len(users) < levels[-1] or facility is None:
+            raise CommandError('Not enough seeded data; run "manage.py seed_benchmark_data" first.')
+
+        # One pending stay per guest, far enough ahead to clash with nothing.
+        start = timezone.localdate() + datetime.timedelta(days=365 * 5)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                user=user, facility=facility,
+                check_in=start + datetime.timedelta(days=i * 2),
+                check_out=start + datetime.timedelta(days=i * 2 + 1),
+                total_price=facility.price_per_day,
+            )
+            for i, user in enumerate(users)
+        ])
+        fake = FakePayMongo(latency=options['paymongo_latency']).start()
+        env = {
+            'PAYMONGO_API_URL': fake.base_url,
+            'PAYMONGO_SECRET_KEY': 'sk_test_bench',
+        }
+        try:
+            self.stdout.write(
+                f"One worker, PayMongo latency {options['paymongo_latency'] * 1000:.0f} ms, "
+                f"{options['duration']:.0f}s per level"
+            )
+            self.stdout.write(f"{'server':<6} {'guests':>7} {'checkouts/s':>12} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+            for asgi in (False, True):
+                try:
+                    server, base_url = start_server(settings.BASE_DIR, env, workers=1, asgi=asgi)
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+                try:
+                    for level in levels:
+                        self._run_level(base_url, users[:level], reservations[:level], options['duration'], asgi)
+                finally:
+                    stop_server(server)
+        finally:
+            fake.stop()
+            Reservation.objects.filter(pk__in=[r.pk for r in reservations]).delete()
+
+    def _run_level(self, base_url, users, reservations, duration, asgi):
+        timings = StepTimings()
+        guests = [
+            (FunnelUser(base_url, user.username, BENCH_PASSWORD, [], timings), reservation.pk)
+            for user, reservation in zip(users, reservations)
+        ]
+        with ThreadPoolExecutor(max_workers=len(guests)) as pool:
+            if not all(pool.map(lambda guest: guest[0].login(), guests)):
+                raise CommandError('A guest could not log in.')
+
+            def checkout_loop(guest):
+                client, reservation_pk = guest
+                deadline = time.monotonic() + duration
+                while time.monotonic() < deadline:
+                    client.timed(STEP, 'GET', f'/payments/pay/{reservation_pk}/', {302})
+
+            list(pool.map(checkout_loop, guests))
+
+        row = timings.summary()[STEP]
+        rate = row['count'] / duration
+        self.stdout.write(
+            f"{'asgi' if asgi else 'wsgi':<6} {len(guests):>7} {rate:>12.1f} "
+            f"{row['p50_ms'] or 0:>9.1f} {row['p95_ms'] or 0:>9.1f} {row['errors']:>7}"
+        )
@@ -0,0 +1,40 @@
+"""
+Serve the fake PayMongo API for local development and load tests.
+
+Usage:
+    python manage.py fake_paymongo --port 8765 --latency 0.05
+    PAYMONGO_API_URL=http://127.0.0.1:8765/v1 PAYMONGO_SECRET_KEY=sk_test_fake python manage.py runserver
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.fake_paymongo import FakePayMongo
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake PayMongo checkout API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0)
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--status', default='succeeded',
+                            help='payment_intent status reported for new sessions.')
+
+    def handle(self, *args, **options):
+        server = FakePayMongo(
+            host=options['host'], port=options['port'],
+            latency=options['latency'], error_rate=options['error_rate'],
+            default_status=options['status'],
+        ).start()
+        self.stdout.write(f"Fake PayMongo listening on {server.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
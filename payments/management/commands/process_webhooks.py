@@ -0,0 +1,39 @@
+"""
+Apply stored PayMongo webhook events.
+
+Usage:
+    python manage.py process_webhooks            # run forever, polling every 1s
+    python manage.py process_webhooks --once     # drain pending events, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Process queued PayMongo webhook events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the pending events and exit.')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when no events are pending.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                handled = process_pending_events(options['batch_size'])
+                if handled:
+                    self.stdout.write(f"processed={handled}")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
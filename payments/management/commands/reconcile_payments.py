@@ -0,0 +1,114 @@
+"""
+Reconcile payments stuck in PROCESSING with PayMongo.
+
+Catches payments whose webhook was lost. Stale rows are read in keyset
+pages so memory stays flat however many there are; each page is checked
+against PayMongo concurrently under a rate limit, and the resulting
+transitions are applied in bulk.
+
+Usage: python manage.py reconcile_payments --stale-minutes 30 --workers 8 --rate 20
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import Payment
+from payments.services import retrieve_checkout_session
+from payments.status_cache import session_status
+from payments.transitions import mark_many_failed, mark_many_paid
+
+FAILED_STATUSES = {'failed', 'expired'}
+
+
+class RateLimiter:
+    """Spaces calls evenly so that at most ``rate`` start per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Command(BaseCommand):
+    help = 'Check stale PROCESSING payments against PayMongo and apply their outcome.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Only check payments untouched for this long.')
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--rate', type=float, default=20.0,
+                            help='Maximum PayMongo requests per second (0 = unlimited).')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        stale = Payment.objects.filter(
+            status=Payment.Status.PROCESSING, updated_at__lt=cutoff,
+        ).exclude(paymongo_checkout_id='').order_by('pk')
+
+        limiter = RateLimiter(options['rate'])
+
+        def check(row):
+            pk, checkout_id = row
+            limiter.wait()
+            session = retrieve_checkout_session(checkout_id)
+            return pk, session_status(session) if session else None
+
+        totals = {'checked': 0, 'paid': 0, 'failed': 0, 'unchanged': 0, 'unreachable': 0}
+        began = time.perf_counter()
+        last_pk = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                page = list(
+                    stale.filter(pk__gt=last_pk)
+                    .values_list('pk', 'paymongo_checkout_id')[:options['page_size']]
+                )
+                if not page:
+                    break
+                last_pk = page[-1][0]
+
+                paid, failed = [], []
+                for pk, status in pool.map(check, page):
+                    if status is None:
+                        totals['unreachable'] += 1
+                    elif status == 'succeeded':
+                        paid.append(pk)
+                    elif status in FAILED_STATUSES:
+                        failed.append(pk)
+                    else:
+                        totals['unchanged'] += 1
+                totals['checked'] += len(page)
+
+                if options['dry_run']:
+                    totals['paid'] += len(paid)
+                    totals['failed'] += len(failed)
+                else:
+                    totals['paid'] += len(mark_many_paid(paid))
+                    totals['failed'] += mark_many_failed(failed)
+
+                self.stdout.write(f"checked {totals['checked']} payments...")
+
+        elapsed = time.perf_counter() - began
+        rate = totals['checked'] / elapsed if elapsed else 0
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}checked={totals['checked']} paid={totals['paid']} failed={totals['failed']} "
+            f"unchanged={totals['unchanged']} unreachable={totals['unreachable']} "
+            f"in {elapsed:.2f}s ({rate:.1f} payments/s)"
+        ))
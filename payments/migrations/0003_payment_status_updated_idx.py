@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_webhookevent'),
+        ('reservations', '0004_reservation_no_overlapping_stays'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'updated_at'], name='payment_status_updated_idx'),
+        ),
+    ]
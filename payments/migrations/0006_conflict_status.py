@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_webhookevent_attempts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('paid', 'Paid'), ('failed', 'Failed'), ('refund_due', 'Refund due'), ('refunded', 'Refunded')], default='pending', max_length=20),
+        ),
+    ]
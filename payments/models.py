@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from reservations.models import Reservation
@@ -14,6 +16,8 @@ class Payment(models.Model):
         PROCESSING = 'processing', 'Processing'
         PAID = 'paid', 'Paid'
         FAILED = 'failed', 'Failed'
+        # Money received for a reservation that lost its dates.
+        REFUND_DUE = 'refund_due', 'Refund due'
         REFUNDED = 'refunded', 'Refunded'
 
     class PaymentMethod(models.TextChoices):
@@ -54,12 +58,61 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='payment_status_updated_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='payment_user_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the payment day as loaded so the revenue rollup can
+        # refresh the old day too when ``paid_at`` changes.
+        instance._loaded_paid_at = instance.__dict__.get('paid_at')
+        return instance
 
     def __str__(self):
         return f"Payment #{self.pk} — ₱{self.amount} ({self.get_status_display()})"
 
     def generate_receipt_number(self):
         """Generate a unique receipt number."""
-        import uuid
         self.receipt_number = f"JPR-{uuid.uuid4().hex[:8].upper()}"
         return self.receipt_number
+
+
+class WebhookEvent(models.Model):
+    """
+    Raw PayMongo webhook delivery, stored on receipt and applied later by
+    ``manage.py process_webhooks``. ``event_id`` deduplicates retries; an
+    event that keeps failing is marked FAILED after
+    ``WEBHOOK_MAX_ATTEMPTS`` tries.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSED = 'processed', 'Processed'
+        IGNORED = 'ignored', 'Ignored'
+        FAILED = 'failed', 'Failed'
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    checkout_id = models.CharField(max_length=255, blank=True, db_index=True)
+    payload = models.TextField()
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='webhook_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.get_status_display()})"
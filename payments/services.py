@@ -1,33 +1,269 @@
 """
 PayMongo API integration service.
 Handles creating checkout sessions and processing webhooks.
+
+``PayMongoClient`` (requests) serves the sync code paths such as the
+status cache and the management commands; ``AsyncPayMongoClient`` (httpx)
+serves the async payment views, so a worker keeps handling other requests
+while it waits on PayMongo.
 """
 
+import asyncio
 import base64
+import itertools
+import logging
+import random
+import threading
+import time
+import weakref
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from instrumentation.metrics import record_external
+
+logger = logging.getLogger(__name__)
+
 PAYMONGO_API_URL = 'https://api.paymongo.com/v1'
 
+# Responses worth retrying on an idempotent call.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-def _get_headers():
-    """Build PayMongo authorization headers using secret key."""
-    secret_key = settings.PAYMONGO_SECRET_KEY
-    encoded = base64.b64encode(f'{secret_key}:'.encode()).decode()
-    return {
-        'Authorization': f'Basic {encoded}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
 
+class BasePayMongoClient:
+    """
+    Credentials, timeouts, retry policy and per-endpoint metrics. Subclasses
+    only send the request; ``_retry_after`` decides what happens next.
+    """
+
+    # Errors raised before anything reached PayMongo, so even a POST is
+    # safe to send again.
+    UNSENT_ERRORS = ()
 
-def create_checkout_session(payment, success_url, cancel_url):
+    def __init__(self, secret_key, base_url=PAYMONGO_API_URL, connect_timeout=3.05,
+                 read_timeout=10, max_retries=2, backoff=0.25, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        encoded = base64.b64encode(f'{secret_key}:'.encode()).decode()
+        self.headers = {
+            'Authorization': f'Basic {encoded}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def _record(self, endpoint, elapsed, ok):
+        record_external('paymongo', elapsed)
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(
+                endpoint, {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+            )
+            stats['calls'] += 1
+            stats['errors'] += 0 if ok else 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def metrics(self):
+        """Return a snapshot of per-endpoint call counts and latencies."""
+        with self._metrics_lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._metrics.items()}
+
+    def _retry_delay(self, attempt):
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def _retry_after(self, endpoint, idempotent, attempt, elapsed, response=None, error=None):
+        """
+        Record one attempt and apply the retry policy: idempotent calls are
+        retried on a connection error, a timeout or a RETRY_STATUSES
+        response; other calls only when nothing was sent. Returns the
+        seconds to wait before the next attempt, or None when the caller
+        should return ``response`` (None if PayMongo could not be reached).
+        """
+        if error is None:
+            failed = response.status_code in RETRY_STATUSES
+            self._record(endpoint, elapsed, ok=not failed)
+            if not (failed and idempotent and attempt < self.max_retries):
+                return None
+            return self._retry_delay(attempt)
+
+        self._record(endpoint, elapsed, ok=False)
+        if not (idempotent or isinstance(error, self.UNSENT_ERRORS)) or attempt >= self.max_retries:
+            logger.error(f"PayMongo {endpoint} failed after {attempt + 1} attempt(s): {error}")
+            return None
+        return self._retry_delay(attempt)
+
+    @staticmethod
+    def _checkout_data(response):
+        if response is not None and response.status_code == 200:
+            return response.json()['data']
+        return None
+
+
+class PayMongoClient(BasePayMongoClient):
     """
-    Create a PayMongo Checkout Session (Process 3.2).
-    Returns the checkout URL for the customer to complete payment.
-    Supports GCash, Maya, and Cards.
+    Thin PayMongo HTTP client.
+
+    Keeps one keep-alive connection pool per process, applies connect/read
+    timeouts to every call, retries idempotent calls with jittered
+    exponential backoff, and records per-endpoint latency.
     """
-    payload = {
+
+    UNSENT_ERRORS = (requests.exceptions.ConnectTimeout,)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, endpoint, idempotent, **kwargs):
+        """
+        Send a request and return the response, or None if PayMongo could
+        not be reached, retrying as ``_retry_after`` decides.
+        """
+        url = f'{self.base_url}{path}'
+        for attempt in itertools.count():
+            began = time.perf_counter()
+            response = error = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+            delay = self._retry_after(endpoint, idempotent, attempt, time.perf_counter() - began, response, error)
+            if delay is None:
+                return response
+            time.sleep(delay)
+
+    def create_checkout_session(self, payload):
+        response = self.request(
+            'POST', '/checkout_sessions', 'create_checkout_session',
+            idempotent=False, json=payload,
+        )
+        if response is not None and response.status_code != 200:
+            logger.error(f"PayMongo checkout creation returned {response.status_code}: {response.text[:500]}")
+        return self._checkout_data(response)
+
+    def retrieve_checkout_session(self, checkout_id):
+        response = self.request(
+            'GET', f'/checkout_sessions/{checkout_id}', 'retrieve_checkout_session',
+            idempotent=True,
+        )
+        return self._checkout_data(response)
+
+
+class AsyncPayMongoClient(BasePayMongoClient):
+    """PayMongoClient for async views, on an httpx.AsyncClient."""
+
+    def __init__(self, *args, **kwargs):
+        # httpx (with its CLI dependencies) adds ~100 ms to startup and only
+        # the async views use it, so it is imported with the first client.
+        import httpx
+
+        super().__init__(*args, **kwargs)
+        self.httpx = httpx
+        self.UNSENT_ERRORS = (httpx.ConnectTimeout,)
+        self.timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    async def request(self, method, path, endpoint, idempotent, **kwargs):
+        """Async PayMongoClient.request()."""
+        url = f'{self.base_url}{path}'
+        for attempt in itertools.count():
+            began = time.perf_counter()
+            response = error = None
+            try:
+                response = await self.client.request(method, url, timeout=self.timeout, **kwargs)
+            except self.httpx.HTTPError as e:
+                error = e
+            delay = self._retry_after(endpoint, idempotent, attempt, time.perf_counter() - began, response, error)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+    async def create_checkout_session(self, payload):
+        response = await self.request(
+            'POST', '/checkout_sessions', 'create_checkout_session',
+            idempotent=False, json=payload,
+        )
+        if response is not None and response.status_code != 200:
+            logger.error(f"PayMongo checkout creation returned {response.status_code}: {response.text[:500]}")
+        return self._checkout_data(response)
+
+    async def retrieve_checkout_session(self, checkout_id):
+        response = await self.request(
+            'GET', f'/checkout_sessions/{checkout_id}', 'retrieve_checkout_session',
+            idempotent=True,
+        )
+        return self._checkout_data(response)
+
+
+_client = None
+_client_lock = threading.Lock()
+# httpx connection pools belong to the event loop that opened them. The
+# deploy serves backend.asgi on uvicorn workers (gunicorn_asgi.conf.py),
+# where each worker runs one loop for its lifetime, so this holds one
+# long-lived client per worker. Under WSGI (runserver) every async view
+# call gets a fresh loop, and its client is dropped with that loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_options():
+    return {
+        'base_url': settings.PAYMONGO_API_URL,
+        'connect_timeout': settings.PAYMONGO_CONNECT_TIMEOUT,
+        'read_timeout': settings.PAYMONGO_READ_TIMEOUT,
+        'max_retries': settings.PAYMONGO_MAX_RETRIES,
+    }
+
+
+def get_client():
+    """Return the process-wide PayMongoClient, built from settings on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PayMongoClient(settings.PAYMONGO_SECRET_KEY, **_client_options())
+    return _client
+
+
+def get_async_client():
+    """Return the AsyncPayMongoClient of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncPayMongoClient(
+            settings.PAYMONGO_SECRET_KEY, **_client_options()
+        )
+    return client
+
+
+def reset_client():
+    """Drop the shared clients so the next call rebuilds them from settings."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
+        _async_clients.clear()
+
+
+def checkout_payload(payment, success_url, cancel_url):
+    """Checkout Session request body; ``payment.reservation.facility`` must be loaded."""
+    return {
         'data': {
             'attributes': {
                 'send_email_receipt': True,
@@ -51,30 +287,34 @@ def create_checkout_session(payment, success_url, cancel_url):
         }
     }
 
-    response = requests.post(
-        f'{PAYMONGO_API_URL}/checkout_sessions',
-        json=payload,
-        headers=_get_headers(),
-    )
 
-    if response.status_code == 200:
-        data = response.json()['data']
-        checkout_id = data['id']
-        checkout_url = data['attributes']['checkout_url']
-        return checkout_id, checkout_url
+def create_checkout_session(payment, success_url, cancel_url):
+    """
+    Create a PayMongo Checkout Session (Process 3.2).
+    Returns the checkout URL for the customer to complete payment.
+    Supports GCash, Maya, and Cards.
+    """
+    data = get_client().create_checkout_session(checkout_payload(payment, success_url, cancel_url))
+    if data:
+        return data['id'], data['attributes']['checkout_url']
+    return None, None
 
-    # Log the error for debugging
+
+async def acreate_checkout_session(payment, success_url, cancel_url):
+    """Async create_checkout_session()."""
+    data = await get_async_client().create_checkout_session(
+        checkout_payload(payment, success_url, cancel_url)
+    )
+    if data:
+        return data['id'], data['attributes']['checkout_url']
     return None, None
 
 
 def retrieve_checkout_session(checkout_id):
     """Retrieve the status of a checkout session from PayMongo."""
-    response = requests.get(
-        f'{PAYMONGO_API_URL}/checkout_sessions/{checkout_id}',
-        headers=_get_headers(),
-    )
+    return get_client().retrieve_checkout_session(checkout_id)
 
-    if response.status_code == 200:
-        return response.json()['data']
 
-    return None
+async def aretrieve_checkout_session(checkout_id):
+    """Async retrieve_checkout_session()."""
+    return await get_async_client().retrieve_checkout_session(checkout_id)
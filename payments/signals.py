@@ -0,0 +1,38 @@
+"""
+Announce Payment writes through ``payment_changed`` for other apps (the
+revenue rollups in ``reports.signals``) to follow.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Payment
+
+# Sent for every saved or deleted payment, including the ones changed with
+# ``QuerySet.update()`` or ``bulk_update()`` (through
+# ``announce_payment_change``), with ``instance`` and ``previous_paid_at``,
+# the ``paid_at`` it had when loaded.
+payment_changed = Signal()
+
+
+def announce_payment_change(payment):
+    """
+    Send ``payment_changed`` for ``payment``. Called by the post_save
+    handler, and directly by code that changes payments with
+    ``QuerySet.update()`` or ``bulk_update()``.
+    """
+    previous_paid_at = getattr(payment, '_loaded_paid_at', None)
+    payment._loaded_paid_at = payment.paid_at
+    payment_changed.send(sender=Payment, instance=payment, previous_paid_at=previous_paid_at)
+
+
+@receiver(post_save, sender=Payment)
+def announce_payment_save(sender, instance, **kwargs):
+    announce_payment_change(instance)
+
+
+@receiver(post_delete, sender=Payment)
+def announce_payment_delete(sender, instance, **kwargs):
+    payment_changed.send(
+        sender=Payment, instance=instance, previous_paid_at=getattr(instance, '_loaded_paid_at', None),
+    )
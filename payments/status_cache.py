@@ -0,0 +1,85 @@
+"""
+Short-lived memoisation of PayMongo checkout-session status.
+
+``verify_payment`` is refreshed repeatedly while a guest waits on the
+redirect page. Terminal statuses never change, so they are cached for good;
+non-terminal ones are cached for ``PAYMONGO_STATUS_TTL`` seconds. Concurrent
+lookups for the same checkout on a worker's event loop share a single
+upstream call (single-flight).
+"""
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .services import aretrieve_checkout_session
+
+TERMINAL_STATUSES = {'succeeded', 'failed', 'expired'}
+
+
+def session_status(session):
+    """Extract the payment status from a checkout-session payload."""
+    attributes = session.get('attributes', {})
+    intent_status = attributes.get('payment_intent', {}).get('attributes', {}).get('status', '')
+    if intent_status:
+        return intent_status
+    return attributes.get('status', '')
+
+
+class CheckoutStatusCache:
+
+    def __init__(self):
+        self._ainflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    @staticmethod
+    def _key(checkout_id):
+        return f'paymongo:checkout-status:{checkout_id}'
+
+    async def aget(self, checkout_id):
+        """Return the checkout's status string, or None if PayMongo is unreachable."""
+        key = self._key(checkout_id)
+        status = await cache.aget(key)
+        if status is not None:
+            self._count('hits')
+            return status
+
+        # Futures belong to one loop, so flights are shared per loop.
+        flight_key = (asyncio.get_running_loop(), checkout_id)
+        flight = self._ainflight.get(flight_key)
+        if flight is not None:
+            self._count('coalesced')
+            return await asyncio.shield(flight)
+
+        self._count('misses')
+        flight = self._ainflight[flight_key] = asyncio.get_running_loop().create_future()
+        status = None
+        try:
+            session = await aretrieve_checkout_session(checkout_id)
+            if session is not None:
+                status = session_status(session)
+                timeout = None if status in TERMINAL_STATUSES else settings.PAYMONGO_STATUS_TTL
+                await cache.aset(key, status, timeout)
+            return status
+        finally:
+            del self._ainflight[flight_key]
+            flight.set_result(status)
+
+    def set(self, checkout_id, status):
+        """Record a status learned elsewhere, e.g. from a webhook."""
+        timeout = None if status in TERMINAL_STATUSES else settings.PAYMONGO_STATUS_TTL
+        cache.set(self._key(checkout_id), status, timeout)
+
+
+checkout_status_cache = CheckoutStatusCache()
@@ -1,3 +1,394 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import httpx
+import requests
+
+from core.models import EmailOutbox
+from core.query_budget import QueryBudgetMixin
+from facilities.models import Facility
+from reservations.models import Reservation
+from reservations.services import EXCLUSION_CONSTRAINT
+from . import transitions, webhooks
+from .fake_paymongo import FakePayMongo
+from .models import Payment, WebhookEvent
+from .services import AsyncPayMongoClient, PayMongoClient, reset_client
+from .status_cache import CheckoutStatusCache
+from .transitions import mark_many_paid, mark_paid
+
+
+def paid_event(checkout_id):
+    return json.dumps({'data': {
+        'id': f'evt_{checkout_id}',
+        'attributes': {'type': webhooks.PAYMENT_PAID, 'data': {'id': checkout_id}},
+    }}).encode()
+
+
+class PaymentTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = Facility.objects.create(
+            name='Cottage', slug='cottage', description='Test facility',
+            capacity=4, price_per_day=Decimal('1000.00'),
+        )
+
+    def payment(self, checkout_id, days):
+        check_in = timezone.localdate() + timedelta(days=days)
+        reservation = Reservation.objects.create(
+            user=self.user, facility=self.facility, check_in=check_in,
+            check_out=check_in + timedelta(days=1), total_price=Decimal('1000.00'),
+        )
+        return Payment.objects.create(
+            reservation=reservation, user=self.user, amount=reservation.total_price,
+            status=Payment.Status.PROCESSING, paymongo_checkout_id=checkout_id,
+        )
+
+
+class FakePayMongoMixin:
+    """Point the PayMongo clients at a local FakePayMongo for each test."""
+
+    fake_options = {}
+
+    def setUp(self):
+        super().setUp()
+        self.fake = FakePayMongo(**self.fake_options).start()
+        self.addCleanup(self.fake.stop)
+        settings_override = override_settings(
+            PAYMONGO_API_URL=self.fake.base_url, PAYMONGO_SECRET_KEY='sk_test_fake',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_client()
+        self.addCleanup(reset_client)
+
+
+class WebhookProcessingTests(PaymentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.good = self.payment('cs_good', days=10)
+        self.bad = self.payment('cs_bad', days=20)
+        webhooks.record_event(paid_event('cs_good'))
+        webhooks.record_event(paid_event('cs_bad'))
+
+    def process(self):
+        def failing_mark_many_paid(payment_ids):
+            if self.bad.pk in payment_ids:
+                raise RuntimeError('boom')
+            return mark_many_paid(payment_ids)
+
+        with mock.patch.object(webhooks, 'mark_many_paid', failing_mark_many_paid), \
+                self.assertLogs('payments.webhooks', 'WARNING'):
+            return webhooks.process_pending_events()
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_bad_event_does_not_hold_back_the_batch(self):
+        self.assertEqual(self.process(), 2)
+
+        self.good.refresh_from_db()
+        self.assertEqual(self.good.status, Payment.Status.PAID)
+        good_event = WebhookEvent.objects.get(checkout_id='cs_good')
+        self.assertEqual(good_event.status, WebhookEvent.Status.PROCESSED)
+        bad_event = WebhookEvent.objects.get(checkout_id='cs_bad')
+        self.assertEqual((bad_event.status, bad_event.attempts), (WebhookEvent.Status.PENDING, 1))
+        self.assertEqual(bad_event.last_error, 'boom')
+
+        self.assertEqual(self.process(), 1)
+        bad_event.refresh_from_db()
+        self.assertEqual((bad_event.status, bad_event.attempts), (WebhookEvent.Status.FAILED, 2))
+        self.assertEqual(webhooks.process_pending_events(), 0)
+        self.bad.refresh_from_db()
+        self.assertEqual(self.bad.status, Payment.Status.PROCESSING)
+
+
+@override_settings(EMAIL_HOST_USER='admin@example.com')
+class PaymentConflictTests(PaymentTestCase):
+
+    def subjects(self):
+        return [subject.split(']')[0] + ']' for subject in EmailOutbox.objects.values_list('subject', flat=True)]
+
+    def assertRefundDue(self, payment):
+        payment.refresh_from_db()
+        payment.reservation.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.REFUND_DUE)
+        self.assertEqual(payment.reservation.status, Reservation.Status.CONFLICT)
+
+    def test_payment_for_a_released_hold_is_refund_due(self):
+        payment = self.payment('cs_late', days=10)
+        Reservation.objects.filter(pk=payment.reservation_id).update(status=Reservation.Status.CANCELLED)
+        payment = Payment.objects.select_related('reservation').get(pk=payment.pk)
+
+        with self.assertLogs('payments.transitions', 'ERROR'):
+            self.assertTrue(mark_paid(payment))
+
+        self.assertRefundDue(payment)
+        self.assertEqual(self.subjects(), ['[Refund Due]'])
+
+    def test_exclusion_constraint_rejection_is_refund_due(self):
+        # On PostgreSQL the daterange exclusion constraint rejects the
+        # update when another stay holds the dates.
+        kept = self.payment('cs_kept', days=10)
+        rejected = self.payment('cs_rejected', days=20)
+        flip_to_paid = transitions._flip_to_paid
+
+        def constrained(pks, now):
+            if rejected.reservation_id in pks:
+                raise IntegrityError(f'conflicting key value violates exclusion constraint "{EXCLUSION_CONSTRAINT}"')
+            return flip_to_paid(pks, now)
+
+        with mock.patch.object(transitions, '_flip_to_paid', constrained), \
+                self.assertLogs('payments.transitions', 'ERROR'):
+            settled = mark_many_paid([kept.pk, rejected.pk])
+
+        self.assertEqual(len(settled), 2)
+        kept.refresh_from_db()
+        self.assertEqual(kept.status, Payment.Status.PAID)
+        self.assertEqual(kept.reservation.status, Reservation.Status.PAID)
+        self.assertRefundDue(rejected)
+        self.assertEqual(sorted(self.subjects()), ['[Payment Received]', '[Refund Due]'])
+        # A repeated webhook for the rejected checkout changes nothing.
+        self.assertEqual(mark_many_paid([rejected.pk]), [])
+
+
+class PaymentQueryBudgetTests(QueryBudgetMixin, PaymentTestCase):
+    """The payment history runs the same queries for 10 payments as for 10,000."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def add_payments(self, count):
+        # bulk_create skips the save signals (availability, rollups), which
+        # this test does not need.
+        offset = Payment.objects.count()
+        start = timezone.localdate() + timedelta(days=3 * offset + 1)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                user=self.user, facility=self.facility, check_in=start + timedelta(days=3 * i),
+                check_out=start + timedelta(days=3 * i + 1), total_price=Decimal('1000.00'),
+            )
+            for i in range(count)
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                reservation=reservation, user=self.user, amount=reservation.total_price,
+                status=Payment.Status.PROCESSING, paymongo_checkout_id=f'cs_{offset + i}',
+            )
+            for i, reservation in enumerate(reservations)
+        ])
+
+    def test_payment_history(self):
+        for size in (10, 10000):
+            self.add_payments(size - Payment.objects.count())
+            for name in ('payments:history', 'payments:history_page'):
+                with self.subTest(name=name, rows=Payment.objects.count()):
+                    cache.clear()
+                    self.assertMaxQueries(reverse(name), 3)
+
+
+class ReconcilePaymentsTests(FakePayMongoMixin, PaymentTestCase):
+
+    def stale_payment(self, checkout_id, days, status=None):
+        payment = self.payment(checkout_id, days)
+        Payment.objects.filter(pk=payment.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        if status:
+            self.fake.add_session(checkout_id, status)
+        return payment
+
+    def test_applies_paymongo_outcomes(self):
+        paid = self.stale_payment('cs_paid', days=10, status='succeeded')
+        self.stale_payment('cs_expired', days=20, status='expired')
+        self.stale_payment('cs_waiting', days=30, status='awaiting_payment_method')
+        # PayMongo has never heard of this one.
+        self.stale_payment('cs_unknown', days=40)
+        self.payment('cs_recent', days=50)
+        self.fake.add_session('cs_recent', 'succeeded')
+
+        out = io.StringIO()
+        call_command('reconcile_payments', '--stale-minutes', '30', '--page-size', '2', '--rate', '0', stdout=out)
+
+        statuses = dict(Payment.objects.values_list('paymongo_checkout_id', 'status'))
+        self.assertEqual(statuses, {
+            'cs_paid': Payment.Status.PAID,
+            'cs_expired': Payment.Status.FAILED,
+            'cs_waiting': Payment.Status.PROCESSING,
+            'cs_unknown': Payment.Status.PROCESSING,
+            'cs_recent': Payment.Status.PROCESSING,
+        })
+        paid.reservation.refresh_from_db()
+        self.assertEqual(paid.reservation.status, Reservation.Status.PAID)
+        self.assertIn('checked=4 paid=1 failed=1 unchanged=1 unreachable=1', out.getvalue())
+        # The recent payment is not stale yet, so it is not checked.
+        self.assertEqual(self.fake.requests, 4)
+
+    def test_dry_run_changes_nothing(self):
+        self.stale_payment('cs_paid', days=10, status='succeeded')
+        out = io.StringIO()
+        call_command('reconcile_payments', '--dry-run', '--rate', '0', stdout=out)
+        self.assertIn('[dry run] checked=1 paid=1', out.getvalue())
+        self.assertEqual(Payment.objects.get().status, Payment.Status.PROCESSING)
+
+    def test_unreachable_paymongo_leaves_payments_alone(self):
+        self.stale_payment('cs_paid', days=10, status='succeeded')
+        self.fake.stop()
+        out = io.StringIO()
+        with self.assertLogs('payments.services', 'ERROR'):
+            call_command('reconcile_payments', '--rate', '0', stdout=out)
+        self.assertIn('unreachable=1', out.getvalue())
+        self.assertEqual(Payment.objects.get().status, Payment.Status.PROCESSING)
+
+
+def unsent_first(send, error):
+    """Wrap ``send`` so its first call fails with ``error`` before reaching the server."""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise error
+        return send(*args, **kwargs)
+    return wrapper
+
+
+def checkout_payload():
+    return {'data': {'attributes': {'line_items': [], 'reference_number': 'RES-1'}}}
+
+
+class PayMongoClientTests(SimpleTestCase):
+    """Timeouts and retry rules of both clients, against the fake PayMongo."""
+
+    def setUp(self):
+        self.fake = FakePayMongo().start()
+        self.addCleanup(self.fake.stop)
+        self.fake.add_session('cs_1', 'succeeded')
+
+    def make_client(self, client_class=PayMongoClient):
+        return client_class('sk_test_fake', base_url=self.fake.base_url, read_timeout=0.2, backoff=0)
+
+    def test_get_retries_5xx_and_429(self):
+        client = self.make_client()
+        self.fake.fail_next(503, 429)
+        self.assertEqual(client.retrieve_checkout_session('cs_1')['id'], 'cs_1')
+        self.assertEqual(self.fake.requests, 3)
+        self.assertEqual(client.metrics()['retrieve_checkout_session']['errors'], 2)
+
+    def test_get_gives_up_after_max_retries(self):
+        self.fake.fail_next(503, 503, 503, 503)
+        self.assertIsNone(self.make_client().retrieve_checkout_session('cs_1'))
+        self.assertEqual(self.fake.requests, 3)
+
+    def test_get_read_timeout_is_retried(self):
+        self.fake.latency = 0.5
+        with self.assertLogs('payments.services', 'ERROR'):
+            self.assertIsNone(self.make_client().retrieve_checkout_session('cs_1'))
+        self.assertEqual(self.fake.requests, 3)
+
+    def test_post_is_not_retried_once_sent(self):
+        client = self.make_client()
+        self.fake.fail_next(503)
+        with self.assertLogs('payments.services', 'ERROR'):
+            self.assertIsNone(client.create_checkout_session(checkout_payload()))
+        self.assertEqual(self.fake.requests, 1)
+
+        self.fake.latency = 0.5
+        with self.assertLogs('payments.services', 'ERROR'):
+            self.assertIsNone(client.create_checkout_session(checkout_payload()))
+        self.assertEqual(self.fake.requests, 2)
+
+    def test_post_is_retried_when_nothing_was_sent(self):
+        client = self.make_client()
+        send = unsent_first(client.session.request, requests.exceptions.ConnectTimeout('connect timed out'))
+        with mock.patch.object(client.session, 'request', send):
+            self.assertIsNotNone(client.create_checkout_session(checkout_payload()))
+        self.assertEqual(self.fake.requests, 1)
+        self.assertEqual(len(self.fake.sessions), 2)
+
+    async def test_async_client_follows_the_same_rules(self):
+        client = self.make_client(AsyncPayMongoClient)
+        try:
+            self.fake.fail_next(503, 429)
+            self.assertEqual((await client.retrieve_checkout_session('cs_1'))['id'], 'cs_1')
+            self.assertEqual(self.fake.requests, 3)
+
+            self.fake.fail_next(503)
+            with self.assertLogs('payments.services', 'ERROR'):
+                self.assertIsNone(await client.create_checkout_session(checkout_payload()))
+            self.assertEqual(self.fake.requests, 4)
+
+            send = unsent_first(client.client.request, httpx.ConnectTimeout('connect timed out'))
+            with mock.patch.object(client.client, 'request', send):
+                self.assertIsNotNone(await client.create_checkout_session(checkout_payload()))
+            self.assertEqual(self.fake.requests, 5)
+
+            self.fake.latency = 0.5
+            with self.assertLogs('payments.services', 'ERROR'):
+                self.assertIsNone(await client.retrieve_checkout_session('cs_1'))
+            self.assertEqual(self.fake.requests, 8)
+        finally:
+            await client.client.aclose()
+
+
+@override_settings(PAYMONGO_STATUS_TTL=0.3)
+class CheckoutStatusCacheTests(FakePayMongoMixin, SimpleTestCase):
+    fake_options = {'latency': 0.1}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.status_cache = CheckoutStatusCache()
+        self.fake.add_session('cs_1', 'awaiting_payment_method')
+
+    async def lookup(self, *checkout_ids):
+        return await asyncio.gather(*(self.status_cache.aget(checkout_id) for checkout_id in checkout_ids))
+
+    async def test_concurrent_lookups_share_one_upstream_call(self):
+        self.fake.add_session('cs_2', 'succeeded')
+        statuses = await self.lookup('cs_1', 'cs_1', 'cs_1', 'cs_2', 'cs_2')
+        self.assertEqual(statuses, ['awaiting_payment_method'] * 3 + ['succeeded'] * 2)
+        self.assertEqual(self.fake.requests, 2)
+        self.assertEqual(self.status_cache.stats(), {'hits': 0, 'misses': 2, 'coalesced': 3})
+
+    async def test_pending_status_expires_after_the_ttl(self):
+        self.assertEqual(await self.lookup('cs_1'), ['awaiting_payment_method'])
+        self.fake.set_status('cs_1', 'succeeded')
+        self.assertEqual(await self.lookup('cs_1'), ['awaiting_payment_method'])
+        self.assertEqual(self.fake.requests, 1)
+
+        await asyncio.sleep(0.4)
+        self.assertEqual(await self.lookup('cs_1'), ['succeeded'])
+        self.assertEqual(self.fake.requests, 2)
+        self.assertEqual(self.status_cache.stats(), {'hits': 1, 'misses': 2, 'coalesced': 0})
+
+    async def test_final_status_is_kept(self):
+        self.fake.set_status('cs_1', 'succeeded')
+        await self.lookup('cs_1')
+        self.fake.set_status('cs_1', 'failed')
+        await asyncio.sleep(0.4)
+        self.assertEqual(await self.lookup('cs_1'), ['succeeded'])
+        self.assertEqual(self.fake.requests, 1)
+        self.assertEqual(self.status_cache.stats(), {'hits': 1, 'misses': 1, 'coalesced': 0})
+
+    async def test_unreachable_status_is_not_cached(self):
+        self.fake.stop()
+        with self.assertLogs('payments.services', 'ERROR'):
+            self.assertEqual(await self.lookup('cs_1'), [None])
+        self.assertIsNone(await cache.aget(self.status_cache._key('cs_1')))
+
+    def test_webhook_status_is_served_without_a_call(self):
+        self.status_cache.set('cs_1', 'succeeded')
+        self.assertEqual(asyncio.run(self.lookup('cs_1')), ['succeeded'])
+        self.assertEqual(self.fake.requests, 0)
+        self.assertEqual(self.status_cache.stats(), {'hits': 1, 'misses': 0, 'coalesced': 0})
@@ -0,0 +1,167 @@
+"""
+Payment state transitions.
+
+Every path that marks a payment as paid (the dev simulation in
+``initiate_payment``, ``verify_payment`` and the webhook worker) goes
+through here. The transition is a conditional UPDATE that only matches
+rows not yet paid, so when the redirect and the webhook race exactly one
+of them wins, and only the winner issues a receipt, flips the reservation
+and queues the admin email.
+
+A reservation can lose its dates before the money arrives (its hold was
+released, or the exclusion constraint rejects it). Its payment is still
+recorded, but as REFUND_DUE, the reservation moves to CONFLICT, and staff
+get a refund notice instead of the payment-received email.
+"""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from reservations.models import Reservation
+from reservations.signals import schedule_sync
+from reservations.utils import notify_admin_payment_conflict, notify_admin_payment_success
+from .models import Payment
+from .signals import announce_payment_change
+
+logger = logging.getLogger(__name__)
+
+# Payment states a paid-checkout signal no longer changes.
+SETTLED_STATUSES = (Payment.Status.PAID, Payment.Status.REFUND_DUE, Payment.Status.REFUNDED)
+
+
+# Reservations that still hold their dates and can become PAID.
+PAYABLE_STATUSES = (Reservation.Status.PENDING, Reservation.Status.CONFIRMED)
+
+
+def _flip_to_paid(pks, now):
+    """Mark the payable reservations among ``pks`` PAID; return how many changed."""
+    return Reservation.objects.filter(pk__in=pks, status__in=PAYABLE_STATUSES).update(
+        status=Reservation.Status.PAID, updated_at=now,
+    )
+
+
+def _mark_reservations_paid(reservations, now):
+    """
+    Flip reservations to PAID. Ones that were cancelled meanwhile or that
+    the overlap constraint rejects are moved to CONFLICT instead; their
+    pks are returned.
+    """
+    pending = list({r.pk: r for r in reservations if r.status != Reservation.Status.PAID}.values())
+    if not pending:
+        return set()
+
+    conflicts = []
+    try:
+        with transaction.atomic():
+            if _flip_to_paid([r.pk for r in pending], now) != len(pending):
+                transaction.set_rollback(True)
+                raise IntegrityError('reservation no longer payable')
+    except IntegrityError:
+        # One of them was cancelled, or overlaps a stay that holds its
+        # dates (PostgreSQL exclusion constraint); apply them one by one.
+        for reservation in pending:
+            try:
+                with transaction.atomic():
+                    if not _flip_to_paid([reservation.pk], now):
+                        conflicts.append(reservation)
+            except IntegrityError:
+                conflicts.append(reservation)
+
+    if conflicts:
+        Reservation.objects.filter(pk__in=[r.pk for r in conflicts]).update(
+            status=Reservation.Status.CONFLICT, updated_at=now,
+        )
+    for reservation in pending:
+        if reservation in conflicts:
+            logger.error(
+                f"Reservation #{reservation.pk} was paid but its dates are no longer "
+                f"free; marked as a conflict for a refund."
+            )
+            reservation.status = Reservation.Status.CONFLICT
+        else:
+            reservation.status = Reservation.Status.PAID
+        reservation.updated_at = now
+        schedule_sync(reservation)
+    return {r.pk for r in conflicts}
+
+
+def _notify(payment):
+    if payment.status == Payment.Status.REFUND_DUE:
+        notify_admin_payment_conflict(payment.reservation, payment)
+    else:
+        notify_admin_payment_success(payment.reservation, payment)
+
+
+def mark_paid(payment):
+    """
+    Transition ``payment`` to PAID, or to REFUND_DUE when its reservation
+    lost its dates. Returns True if this call made the transition, False
+    if the payment was already settled.
+    """
+    now = timezone.now()
+    receipt_number = payment.generate_receipt_number()
+
+    with transaction.atomic():
+        updated = Payment.objects.filter(pk=payment.pk).exclude(
+            status__in=SETTLED_STATUSES,
+        ).update(
+            status=Payment.Status.PAID,
+            paid_at=now,
+            receipt_number=receipt_number,
+            updated_at=now,
+        )
+        if not updated:
+            payment.refresh_from_db(fields=['status', 'paid_at', 'receipt_number', 'updated_at'])
+            return False
+
+        payment.status = Payment.Status.PAID
+        payment.paid_at = now
+        payment.updated_at = now
+        if _mark_reservations_paid([payment.reservation], now):
+            Payment.objects.filter(pk=payment.pk).update(status=Payment.Status.REFUND_DUE)
+            payment.status = Payment.Status.REFUND_DUE
+        announce_payment_change(payment)
+        _notify(payment)
+    return True
+
+
+def mark_many_paid(payment_ids):
+    """
+    Transition a batch of payments to PAID (or REFUND_DUE) in bulk.
+    Returns the payments this call transitioned; settled ones are skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update(of=('self',))
+            .filter(pk__in=payment_ids)
+            .exclude(status__in=SETTLED_STATUSES)
+            .select_related('reservation__user', 'reservation__facility')
+        )
+        for payment in payments:
+            payment.status = Payment.Status.PAID
+            payment.paid_at = now
+            payment.updated_at = now
+            payment.generate_receipt_number()
+        conflicts = _mark_reservations_paid([payment.reservation for payment in payments], now)
+        for payment in payments:
+            if payment.reservation_id in conflicts:
+                payment.status = Payment.Status.REFUND_DUE
+        Payment.objects.bulk_update(payments, ['status', 'paid_at', 'receipt_number', 'updated_at'])
+
+        for payment in payments:
+            announce_payment_change(payment)
+            _notify(payment)
+    return payments
+
+
+def mark_many_failed(payment_ids):
+    """
+    Transition processing payments whose checkout failed or expired to
+    FAILED. Returns the number of rows changed.
+    """
+    return Payment.objects.filter(
+        pk__in=payment_ids, status=Payment.Status.PROCESSING,
+    ).update(status=Payment.Status.FAILED, updated_at=timezone.now())
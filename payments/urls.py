@@ -8,5 +8,7 @@ urlpatterns = [
     path('<int:pk>/verify/', views.verify_payment, name='verify'),
     path('<int:pk>/success/', views.payment_success, name='success'),
     path('history/', views.payment_history, name='history'),
+    path('history/page/', views.payment_history_page, name='history_page'),
+    path('status-cache/', views.status_cache_stats, name='status_cache_stats'),
     path('webhook/', views.paymongo_webhook, name='webhook'),
 ]
@@ -1,22 +1,42 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
 from django.conf import settings
+from core.pagination import InvalidCursor, page_json, paginate
+from core.ratelimit import ratelimit
 from reservations.models import Reservation
 from .models import Payment
-from .services import create_checkout_session, retrieve_checkout_session
+from .services import acreate_checkout_session
+from .status_cache import checkout_status_cache
+from .transitions import mark_paid
+from .webhooks import arecord_event
+
+
+def _after_payment(request, payment):
+    """Show the receipt, or explain that the dates were lost and a refund is coming."""
+    if payment.status == Payment.Status.REFUND_DUE:
+        messages.error(
+            request,
+            'Your payment was received, but these dates were booked before it arrived. '
+            'We will refund you in full; please contact us to pick new dates.'
+        )
+        return redirect('reservations:detail', pk=payment.reservation_id)
+    return redirect('payments:success', pk=payment.pk)
 
 
 @login_required
-def initiate_payment(request, reservation_pk):
+async def initiate_payment(request, reservation_pk):
     """
     Validate payment and create a PayMongo checkout session (Process 3.1, 3.2).
     """
-    reservation = get_object_or_404(
-        Reservation, pk=reservation_pk, user=request.user
+    user = await request.auser()
+    reservation = await aget_object_or_404(
+        Reservation.objects.select_related('facility'), pk=reservation_pk, user=user
     )
 
     if reservation.status not in [Reservation.Status.PENDING, Reservation.Status.CONFIRMED]:
@@ -24,14 +44,15 @@ def initiate_payment(request, reservation_pk):
         return redirect('reservations:detail', pk=reservation.pk)
 
     # Create or get existing pending payment
-    payment, created = Payment.objects.get_or_create(
+    payment, created = await Payment.objects.aget_or_create(
         reservation=reservation,
         status=Payment.Status.PENDING,
         defaults={
-            'user': request.user,
+            'user': user,
             'amount': reservation.total_price,
         }
     )
+    payment.reservation = reservation
 
     if not settings.PAYMONGO_SECRET_KEY:
         # Sandbox / dev mode — skip PayMongo and simulate success
@@ -39,23 +60,14 @@ def initiate_payment(request, reservation_pk):
             request,
             'PayMongo is not configured. Payment simulated for development.'
         )
-        payment.status = Payment.Status.PAID
-        payment.paid_at = timezone.now()
-        payment.generate_receipt_number()
-        payment.save()
-        reservation.status = Reservation.Status.PAID
-        reservation.save()
-        
-        from reservations.utils import notify_admin_payment_success
-        notify_admin_payment_success(reservation, payment)
-
-        return redirect('payments:success', pk=payment.pk)
+        await sync_to_async(mark_paid)(payment)
+        return _after_payment(request, payment)
 
     # Build success/cancel URLs
     success_url = request.build_absolute_uri(f'/payments/{payment.pk}/verify/')
     cancel_url = request.build_absolute_uri(f'/reservations/{reservation.pk}/')
 
-    checkout_id, checkout_url = create_checkout_session(
+    checkout_id, checkout_url = await acreate_checkout_session(
         payment, success_url, cancel_url
     )
 
@@ -63,7 +75,7 @@ def initiate_payment(request, reservation_pk):
         payment.paymongo_checkout_id = checkout_id
         payment.checkout_url = checkout_url
         payment.status = Payment.Status.PROCESSING
-        payment.save()
+        await payment.asave(update_fields=['paymongo_checkout_id', 'checkout_url', 'status', 'updated_at'])
         return redirect(checkout_url)
     else:
         messages.error(request, 'Unable to create payment session. Please try again.')
@@ -71,32 +83,24 @@ def initiate_payment(request, reservation_pk):
 
 
 @login_required
-def verify_payment(request, pk):
+async def verify_payment(request, pk):
     """
     Verify payment after PayMongo redirect (Process 3.3).
     """
-    payment = get_object_or_404(Payment, pk=pk, user=request.user)
+    payment = await aget_object_or_404(Payment, pk=pk, user=await request.auser())
+
+    if payment.status in (Payment.Status.PAID, Payment.Status.REFUND_DUE):
+        return _after_payment(request, payment)
 
     if payment.paymongo_checkout_id:
-        session_data = retrieve_checkout_session(payment.paymongo_checkout_id)
-        if session_data:
-            status = session_data['attributes'].get('payment_intent', {}).get('attributes', {}).get('status', '')
-            if status == 'succeeded':
-                payment.status = Payment.Status.PAID
-                payment.paid_at = timezone.now()
-                payment.generate_receipt_number()
-                payment.save()
-                payment.reservation.status = Reservation.Status.PAID
-                payment.reservation.save()
-                
-                from reservations.utils import notify_admin_payment_success
-                notify_admin_payment_success(payment.reservation, payment)
-                
-                return redirect('payments:success', pk=payment.pk)
+        status = await checkout_status_cache.aget(payment.paymongo_checkout_id)
+        if status == 'succeeded':
+            await sync_to_async(mark_paid)(payment)
+            return _after_payment(request, payment)
 
     # If verification fails or is still processing
     messages.info(request, 'Payment is being processed. Please check back shortly.')
-    return redirect('reservations:detail', pk=payment.reservation.pk)
+    return redirect('reservations:detail', pk=payment.reservation_id)
 
 
 @login_required
@@ -109,46 +113,72 @@ def payment_success(request, pk):
     })
 
 
+PAYMENT_ORDERING = ('-created_at', '-pk')
+
+
+def _payment_history_page(request):
+    payments = Payment.objects.filter(user=request.user).only(
+        'reservation_id', 'amount', 'payment_method', 'status', 'receipt_number', 'created_at',
+    )
+    return paginate(request, payments, PAYMENT_ORDERING)
+
+
 @login_required
 def payment_history(request):
-    """Show all payments for the logged-in user."""
-    payments = Payment.objects.filter(user=request.user)
+    """Show the logged-in user's payments, newest first, a page at a time."""
+    try:
+        page = _payment_history_page(request)
+    except InvalidCursor:
+        return redirect('payments:history')
     return render(request, 'payments/history.html', {
-        'payments': payments,
+        'payments': page.items,
+        'next_cursor': page.next_cursor,
     })
 
 
+@login_required
+def payment_history_page(request):
+    """Next page of the payment history for infinite scroll (JSON)."""
+    try:
+        page = _payment_history_page(request)
+    except InvalidCursor as e:
+        return HttpResponseBadRequest(str(e))
+    return page_json(
+        request, page, 'payments/_payment_rows.html', {'payments': page.items},
+        serialize=lambda pay: {
+            'id': pay.pk,
+            'reservation_id': pay.reservation_id,
+            'amount': str(pay.amount),
+            'payment_method': pay.payment_method,
+            'status': pay.status,
+            'receipt_number': pay.receipt_number,
+            'created_at': pay.created_at.isoformat(),
+        },
+        json_url=reverse('payments:history_page'),
+        html_url=reverse('payments:history'),
+    )
+
+
+@staff_member_required
+def status_cache_stats(request):
+    """Hit/miss counters of the checkout-status cache in this process."""
+    return JsonResponse(checkout_status_cache.stats())
+
+
 @csrf_exempt
-def paymongo_webhook(request):
+@ratelimit('webhook', ip='300/m')
+async def paymongo_webhook(request):
     """
-    Handle PayMongo webhook events for automatic payment status updates.
+    Receive PayMongo webhook events for automatic payment status updates.
+    Events are stored and acknowledged at once; ``manage.py process_webhooks``
+    applies them.
     """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
-    import json
     try:
-        body = json.loads(request.body)
-        event_type = body['data']['attributes']['type']
-
-        if event_type == 'checkout_session.payment.paid':
-            checkout_data = body['data']['attributes']['data']
-            checkout_id = checkout_data['id']
-
-            try:
-                payment = Payment.objects.get(paymongo_checkout_id=checkout_id)
-                payment.status = Payment.Status.PAID
-                payment.paid_at = timezone.now()
-                payment.generate_receipt_number()
-                payment.save()
-                payment.reservation.status = Reservation.Status.PAID
-                payment.reservation.save()
-                
-                from reservations.utils import notify_admin_payment_success
-                notify_admin_payment_success(payment.reservation, payment)
-            except Payment.DoesNotExist:
-                pass
-
-        return JsonResponse({'status': 'ok'})
-    except (json.JSONDecodeError, KeyError):
+        await arecord_event(request.body)
+    except (ValueError, KeyError, TypeError, AttributeError):
         return JsonResponse({'error': 'Invalid payload'}, status=400)
+
+    return JsonResponse({'status': 'ok'})
@@ -0,0 +1,118 @@
+"""
+PayMongo webhook ingestion.
+
+The webhook view only calls ``arecord_event``, which stores the raw body
+and returns, so PayMongo gets its acknowledgement in a few milliseconds.
+``process_pending_events`` (run by ``manage.py process_webhooks``) applies
+the stored events in arrival order, batching the database writes through
+``payments.transitions``. If a batch fails, its events are applied again
+one savepoint at a time, so a bad event only holds back itself: it is
+retried on later passes and marked FAILED after ``WEBHOOK_MAX_ATTEMPTS``.
+"""
+
+import hashlib
+import json
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
+from .status_cache import checkout_status_cache
+from .transitions import mark_many_paid
+
+PAYMENT_PAID = 'checkout_session.payment.paid'
+
+logger = logging.getLogger(__name__)
+
+
+def _event_row(body):
+    event = json.loads(body)['data']
+    attributes = event['attributes']
+    event_type = attributes['type']
+    resource = attributes.get('data') or {}
+    event_id = event.get('id') or hashlib.sha256(body).hexdigest()
+    return WebhookEvent(
+        event_id=event_id,
+        event_type=event_type,
+        checkout_id=resource.get('id', '') if isinstance(resource, dict) else '',
+        payload=body.decode(errors='replace'),
+    )
+
+
+def record_event(body):
+    """
+    Store a webhook delivery; redeliveries of a known event are dropped.
+    Raises ValueError, KeyError, TypeError or AttributeError for a
+    malformed payload.
+    """
+    WebhookEvent.objects.bulk_create([_event_row(body)], ignore_conflicts=True)
+
+
+async def arecord_event(body):
+    """Async record_event()."""
+    await WebhookEvent.objects.abulk_create([_event_row(body)], ignore_conflicts=True)
+
+
+def _apply_events(events, now):
+    """Apply ``events`` and mark them processed or ignored."""
+    paid_checkouts = {
+        event.checkout_id for event in events
+        if event.event_type == PAYMENT_PAID and event.checkout_id
+    }
+
+    payment_ids = Payment.objects.filter(
+        paymongo_checkout_id__in=paid_checkouts,
+    ).values_list('pk', flat=True)
+    mark_many_paid(list(payment_ids))
+    for checkout_id in paid_checkouts:
+        transaction.on_commit(partial(checkout_status_cache.set, checkout_id, 'succeeded'))
+
+    handled = [event.pk for event in events if event.checkout_id in paid_checkouts]
+    WebhookEvent.objects.filter(pk__in=handled).update(
+        status=WebhookEvent.Status.PROCESSED, processed_at=now,
+    )
+    WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).exclude(
+        pk__in=handled,
+    ).update(status=WebhookEvent.Status.IGNORED, processed_at=now)
+
+
+def _record_failure(event, error):
+    event.attempts += 1
+    event.last_error = str(error)
+    if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        event.status = WebhookEvent.Status.FAILED
+        event.processed_at = timezone.now()
+        logger.error(f"Webhook event {event.event_id} failed {event.attempts} times, giving up: {error}")
+    else:
+        logger.warning(f"Webhook event {event.event_id} attempt {event.attempts} failed: {error}")
+    event.save(update_fields=['attempts', 'last_error', 'status', 'processed_at'])
+
+
+def process_pending_events(batch_size=200):
+    """Apply one batch of pending events; return how many were handled."""
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=WebhookEvent.Status.PENDING)
+            .order_by('pk')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                _apply_events(events, now)
+        except Exception:
+            logger.exception(f"Webhook batch of {len(events)} failed; applying events one at a time")
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        _apply_events([event], now)
+                except Exception as e:
+                    _record_failure(event, e)
+
+    return len(events)
@@ -0,0 +1,91 @@
+import calendar
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.http import HttpResponseBadRequest
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from reservations.occupancy import MonthOutOfRange, add_months, parse_month
+from .models import DailyFacilityStats
+from .rollups import STAT_FIELDS
+
+TREND_MONTHS = 12
+
+
+def _totals(rows):
+    return rows.annotate(**{field: Sum(field) for field in STAT_FIELDS})
+
+
+def _bookings(row):
+    return sum(row[field] or 0 for field in STAT_FIELDS if field.startswith('bookings_'))
+
+
+@admin.register(DailyFacilityStats)
+class DailyFacilityStatsAdmin(admin.ModelAdmin):
+    """
+    Month-end report: revenue, occupancy and bookings per facility, per day
+    and for the trailing year. Reads only the rollup rows (plus facility
+    names), never the reservation or payment tables.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        try:
+            month = parse_month(request.GET.get('month', ''), timezone.localdate())
+        except MonthOutOfRange as e:
+            return HttpResponseBadRequest(str(e))
+        next_month = add_months(month, 1)
+        days_in_month = calendar.monthrange(month.year, month.month)[1]
+        in_month = DailyFacilityStats.objects.filter(day__gte=month, day__lt=next_month)
+
+        facilities = list(
+            _totals(in_month.values('facility_id', 'facility__name')).order_by('-revenue', 'facility__name')
+        )
+        for row in facilities:
+            row['occupancy'] = row['occupied_nights'] / days_in_month * 100
+            row['bookings'] = _bookings(row)
+        totals = in_month.aggregate(**{field: Sum(field) for field in STAT_FIELDS})
+        totals['bookings'] = _bookings(totals)
+
+        days = list(_totals(in_month.values('day')).order_by('day'))
+        for row in days:
+            row['bookings'] = _bookings(row)
+
+        trend = list(
+            _totals(
+                DailyFacilityStats.objects.filter(
+                    day__gte=add_months(month, 1 - TREND_MONTHS), day__lt=next_month,
+                ).annotate(month=TruncMonth('day')).values('month')
+            ).order_by('month')
+        )
+        for row in trend:
+            row['bookings'] = _bookings(row)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Reports — {month:%B %Y}",
+            'month': month,
+            'previous_month': add_months(month, -1),
+            'next_month': next_month,
+            'facilities': facilities,
+            'totals': totals,
+            'days': days,
+            'trend': trend,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'reports/dashboard.html', context)
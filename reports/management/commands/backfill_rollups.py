@@ -0,0 +1,93 @@
+"""
+Rebuild the daily report rollups from the raw reservation and payment
+tables.
+
+Walks the date range ``--chunk-days`` at a time. Each chunk is a few
+grouped queries and one upsert in its own transaction, holding the
+facility row locks (which bookings also take) for that chunk only, so
+history of any length is processed without one long-running statement or
+lock. Safe to
+re-run: rows are recomputed, not added to. Without ``--start`` / ``--end``
+it covers everything from the oldest booking, payment or rollup row to the
+last booked night, so rows left over from deleted data are removed too.
+
+Usage:
+    python manage.py backfill_rollups
+    python manage.py backfill_rollups --start 2025-01-01 --end 2025-12-31 --chunk-days 7
+"""
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from payments.models import Payment
+from reports.models import DailyFacilityStats
+from reports.rollups import local_day, rebuild_range
+from reservations.models import Reservation
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Dates are YYYY-MM-DD, not {value!r}.")
+
+
+def history_bounds():
+    """(first, last) day with any booking, stay, payment or rollup row, or None when there are none."""
+    stays = Reservation.objects.aggregate(
+        first_created=Min('created_at'), first_night=Min('check_in'), last_night=Max('check_out'),
+    )
+    paid = Payment.objects.filter(paid_at__isnull=False).aggregate(first=Min('paid_at'), last=Max('paid_at'))
+    rollups = DailyFacilityStats.objects.aggregate(first=Min('day'), last=Max('day'))
+    firsts = [local_day(stays['first_created']), stays['first_night'], local_day(paid['first']), rollups['first']]
+    lasts = [stays['last_night'], local_day(paid['last']), rollups['last'], timezone.localdate()]
+    firsts = [day for day in firsts if day]
+    if not firsts:
+        return None
+    return min(firsts), max(day for day in lasts if day)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily revenue, occupancy and booking rollups in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, default=None, help='First day (YYYY-MM-DD).')
+        parser.add_argument('--end', type=_date, default=None, help='Last day, inclusive (YYYY-MM-DD).')
+        parser.add_argument('--chunk-days', type=int, default=31)
+        parser.add_argument('--facility', type=int, default=None, help='Only this facility id.')
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1.')
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            bounds = history_bounds()
+            if bounds is None:
+                self.stdout.write('No reservations or payments; nothing to backfill.')
+                return
+            start = start or bounds[0]
+            end = end or bounds[1]
+        if end < start:
+            raise CommandError('--end is before --start.')
+
+        chunk = datetime.timedelta(days=options['chunk_days'])
+        stop = end + datetime.timedelta(days=1)
+        rows = 0
+        began = time.perf_counter()
+        day = start
+        while day < stop:
+            chunk_end = min(day + chunk, stop)
+            written = rebuild_range(day, chunk_end, options['facility'])
+            rows += written
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {day} .. {chunk_end - datetime.timedelta(days=1)}: {written} rows")
+            day = chunk_end
+
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt rollups for {start} .. {end}: {rows} rows in {time.perf_counter() - began:.1f}s"
+            ))
@@ -0,0 +1,40 @@
+"""
+Background worker that rebuilds the report rollup days queued by
+reservation and payment changes (see ``reports.signals``).
+
+Usage:
+    python manage.py refresh_rollups            # run forever, polling every 5s
+    python manage.py refresh_rollups --once     # rebuild what is queued, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reports.rollups import refresh_queued
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily report rollups queued by reservation and payment changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Rebuild the queued days and exit.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is queued.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                rebuilt = refresh_queued(options['batch_size'])
+                if rebuilt:
+                    self.stdout.write(f"rebuilt={rebuilt}")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
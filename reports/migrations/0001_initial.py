@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('facilities', '0004_facility_available_name_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFacilityStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('occupied_nights', models.PositiveIntegerField(default=0)),
+                ('guest_nights', models.PositiveIntegerField(default=0)),
+                ('bookings_pending', models.PositiveIntegerField(default=0)),
+                ('bookings_confirmed', models.PositiveIntegerField(default=0)),
+                ('bookings_paid', models.PositiveIntegerField(default=0)),
+                ('bookings_cancelled', models.PositiveIntegerField(default=0)),
+                ('bookings_completed', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='facilities.facility')),
+            ],
+            options={
+                'verbose_name': 'Daily facility report',
+                'verbose_name_plural': 'Daily facility reports',
+                'ordering': ['day', 'facility'],
+                'indexes': [models.Index(fields=['day'], name='facility_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('facility', 'day'), name='unique_facility_stats_day')],
+            },
+        ),
+    ]
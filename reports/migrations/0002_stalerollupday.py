@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0005_searchentry_prefix_vector'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='facilities.facility')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facility', 'day'), name='unique_stale_rollup_day')],
+            },
+        ),
+    ]
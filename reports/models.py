@@ -0,0 +1,70 @@
+from django.db import models
+from facilities.models import Facility
+
+
+class DailyFacilityStats(models.Model):
+    """
+    Pre-aggregated figures for one facility on one day, read by the admin
+    reports dashboard instead of scanning reservations and payments.
+
+    * ``revenue`` / ``payments``: paid payments by the local date of ``paid_at``.
+    * ``occupied_nights`` / ``guest_nights``: confirmed, paid or completed
+      stays covering the night of ``day``.
+    * ``bookings_*``: reservations created that day, by their current status.
+
+    Kept up to date by ``manage.py refresh_rollups`` from StaleRollupDay;
+    rebuilt with ``manage.py backfill_rollups``.
+    """
+    facility = models.ForeignKey(
+        Facility,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+    )
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments = models.PositiveIntegerField(default=0)
+    occupied_nights = models.PositiveIntegerField(default=0)
+    guest_nights = models.PositiveIntegerField(default=0)
+    bookings_pending = models.PositiveIntegerField(default=0)
+    bookings_confirmed = models.PositiveIntegerField(default=0)
+    bookings_paid = models.PositiveIntegerField(default=0)
+    bookings_cancelled = models.PositiveIntegerField(default=0)
+    bookings_completed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day', 'facility']
+        verbose_name = 'Daily facility report'
+        verbose_name_plural = 'Daily facility reports'
+        constraints = [
+            models.UniqueConstraint(fields=['facility', 'day'], name='unique_facility_stats_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='facility_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.facility} — {self.day}"
+
+
+class StaleRollupDay(models.Model):
+    """
+    A facility day whose DailyFacilityStats row has to be recomputed.
+    Queued by ``reports.signals`` when a reservation or payment changes;
+    ``manage.py refresh_rollups`` rebuilds the days and deletes the rows.
+    """
+    facility = models.ForeignKey(
+        Facility,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    day = models.DateField()
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facility', 'day'], name='unique_stale_rollup_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.facility_id} — {self.day}"
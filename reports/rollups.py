@@ -0,0 +1,208 @@
+"""
+Daily per-facility rollups for the admin reports dashboard.
+
+A DailyFacilityStats row holds one facility's revenue, occupied nights and
+new bookings for one day. Rows are never adjusted by deltas; instead the
+days a change can affect are recomputed from the raw tables, so a missed
+or repeated refresh cannot leave a wrong total behind:
+
+* a payment affects the day it was paid (old and new ``paid_at``);
+* a reservation affects the day it was created (its status is counted
+  there) and every night of its old and new stay.
+
+``reports.signals`` queues those days (``queue_days``) once the
+transaction commits, and ``manage.py refresh_rollups`` rebuilds them
+(``refresh_queued``) outside the request. ``manage.py backfill_rollups``
+runs ``rebuild_range`` over history in chunks. Both read and write under
+the facility row locks, so a rebuild that read older data can never
+overwrite a newer one.
+"""
+
+import datetime
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+STAT_FIELDS = (
+    'revenue', 'payments', 'occupied_nights', 'guest_nights',
+    'bookings_pending', 'bookings_confirmed', 'bookings_paid', 'bookings_cancelled', 'bookings_completed',
+)
+ONE_DAY = datetime.timedelta(days=1)
+# Booking statuses reported under another status's column: a conflicted
+# booking (paid, then refunded) never happened, like a cancelled one.
+ROLLUP_STATUS = {'conflict': 'cancelled'}
+
+logger = logging.getLogger(__name__)
+
+
+def local_day(moment):
+    return timezone.localdate(moment) if moment else None
+
+
+def stay_nights(check_in, check_out):
+    """The dates of the nights [check_in, check_out)."""
+    return [check_in + ONE_DAY * i for i in range((check_out - check_in).days)]
+
+
+def day_runs(days):
+    """Split ``days`` into runs of consecutive dates, as (start, end) with ``end`` exclusive."""
+    runs = []
+    for day in sorted(set(days)):
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + ONE_DAY
+        else:
+            runs.append([day, day + ONE_DAY])
+    return [tuple(run) for run in runs]
+
+
+def _local_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+        datetime.datetime.combine(end, datetime.time.min, tzinfo=tz),
+    )
+
+
+def compute_range(start, end, facility_id=None):
+    """
+    Aggregate the raw tables into {(facility_id, day): {field: value}} for
+    the days [start, end), for one facility or all of them. Keys with
+    nothing to report are left out.
+    """
+    from payments.models import Payment
+    from reservations.models import Reservation
+
+    reservations = Reservation.objects.all()
+    payments = Payment.objects.filter(status=Payment.Status.PAID)
+    if facility_id is not None:
+        reservations = reservations.filter(facility_id=facility_id)
+        payments = payments.filter(reservation__facility_id=facility_id)
+    window_start, window_end = _local_bounds(start, end)
+    stats = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    paid = (
+        payments.filter(paid_at__gte=window_start, paid_at__lt=window_end)
+        .annotate(day=TruncDate('paid_at'))
+        .values('reservation__facility_id', 'day')
+        .annotate(revenue=Sum('amount'), count=Count('pk'))
+        .order_by()
+    )
+    for row in paid:
+        entry = stats[(row['reservation__facility_id'], row['day'])]
+        entry['revenue'] = row['revenue']
+        entry['payments'] = row['count']
+
+    stays = reservations.filter(
+        status__in=Reservation.OCCUPIED_STATUSES, check_in__lt=end, check_out__gt=start,
+    ).values_list('facility_id', 'check_in', 'check_out', 'guests')
+    for stay_facility, check_in, check_out, guests in stays.iterator():
+        for night in stay_nights(max(check_in, start), min(check_out, end)):
+            entry = stats[(stay_facility, night)]
+            entry['occupied_nights'] += 1
+            entry['guest_nights'] += guests
+
+    created = (
+        reservations.filter(created_at__gte=window_start, created_at__lt=window_end)
+        .annotate(day=TruncDate('created_at'))
+        .values('facility_id', 'day', 'status')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for row in created:
+        status = ROLLUP_STATUS.get(row['status'], row['status'])
+        stats[(row['facility_id'], row['day'])][f"bookings_{status}"] += row['count']
+
+    return stats
+
+
+def rebuild_range(start, end, facility_id=None):
+    """
+    Recompute and store the rollup rows for the days [start, end), for one
+    facility or all of them, reading the raw tables and writing the rows
+    under the facility row locks. Returns the number of rows written.
+    """
+    from facilities.models import Facility
+    from .models import DailyFacilityStats
+
+    facilities = Facility.objects.select_for_update().order_by('pk')
+    existing = DailyFacilityStats.objects.filter(day__gte=start, day__lt=end)
+    if facility_id is not None:
+        facilities = facilities.filter(pk=facility_id)
+        existing = existing.filter(facility_id=facility_id)
+
+    with transaction.atomic():
+        # Held until the rows are written: two rebuilds of the same days
+        # take turns, so the one that writes last also read last.
+        list(facilities.values_list('pk', flat=True))
+        stats = compute_range(start, end, facility_id)
+        DailyFacilityStats.objects.bulk_create(
+            [
+                DailyFacilityStats(facility_id=key_facility, day=day, **values)
+                for (key_facility, day), values in stats.items()
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['facility', 'day'],
+            update_fields=[*STAT_FIELDS, 'updated_at'],
+        )
+        stale = [
+            pk for pk, key_facility, day in existing.values_list('pk', 'facility_id', 'day')
+            if (key_facility, day) not in stats
+        ]
+        if stale:
+            DailyFacilityStats.objects.filter(pk__in=stale).delete()
+    return len(stats)
+
+
+def rebuild_days(facility_id, days):
+    """Recompute the rollup rows of one facility for ``days``."""
+    for start, end in day_runs(day for day in days if day):
+        rebuild_range(start, end, facility_id)
+
+
+def queue_days(days_by_facility):
+    """Queue ``{facility_id: {days}}`` for ``refresh_queued``; days already queued are kept once."""
+    from .models import StaleRollupDay
+
+    StaleRollupDay.objects.bulk_create(
+        [
+            StaleRollupDay(facility_id=facility_id, day=day)
+            for facility_id, days in days_by_facility.items()
+            for day in days
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def refresh_queued(limit=500):
+    """
+    Rebuild up to ``limit`` queued days, oldest first, and return how many
+    were taken. The rows are deleted before the rebuild reads anything, so
+    a change made meanwhile queues its day again rather than being lost;
+    if a rebuild fails, the days are queued again.
+    """
+    from .models import StaleRollupDay
+
+    with transaction.atomic():
+        queued = list(
+            StaleRollupDay.objects.select_for_update(skip_locked=True)
+            .order_by('pk').values_list('pk', 'facility_id', 'day')[:limit]
+        )
+        StaleRollupDay.objects.filter(pk__in=[pk for pk, _, _ in queued]).delete()
+
+    days_by_facility = defaultdict(set)
+    for _, facility_id, day in queued:
+        days_by_facility[facility_id].add(day)
+    try:
+        for facility_id, days in days_by_facility.items():
+            rebuild_days(facility_id, days)
+    except Exception:
+        logger.exception(f"Rollup rebuild failed; queued {len(queued)} days again")
+        queue_days(days_by_facility)
+        raise
+    return len(queued)
@@ -0,0 +1,52 @@
+"""
+Keep the rollups in step with reservation and payment writes, as announced
+by ``reservations.signals.reservation_changed`` and
+``payments.signals.payment_changed``. Neither app knows about the reports;
+the receivers are connected in ``ReportsConfig.ready()``.
+
+The days a transaction touches are merged per facility and queued in one
+insert after it commits; ``manage.py refresh_rollups`` rebuilds them, so
+no request waits on the aggregation queries and a batch of payments costs
+one rebuild per facility and run of days rather than one per row.
+"""
+
+from django.dispatch import receiver
+
+from core.batching import CommitBatch
+from payments.signals import payment_changed
+from reservations.models import Reservation
+from reservations.signals import reservation_changed
+from .rollups import local_day, queue_days, stay_nights
+
+rollup_batch = CommitBatch(queue_days)
+
+
+def _reservation_days(instance, previous):
+    """Days whose rollup may change: the booking day and the old and new stay nights."""
+    days = {local_day(instance.created_at)}
+    if instance.status in Reservation.OCCUPIED_STATUSES:
+        days.update(stay_nights(instance.check_in, instance.check_out))
+    if previous and previous[0] in Reservation.OCCUPIED_STATUSES and None not in previous:
+        days.update(stay_nights(previous[1], previous[2]))
+    return days - {None}
+
+
+def _facility_id(payment):
+    try:
+        return payment.reservation.facility_id
+    except Reservation.DoesNotExist:
+        # Deleted together with its reservation; that refresh covers it.
+        return None
+
+
+@receiver(reservation_changed)
+def refresh_rollups_for_reservation(sender, instance, previous, **kwargs):
+    rollup_batch.add(instance.facility_id, _reservation_days(instance, previous))
+
+
+@receiver(payment_changed)
+def refresh_rollups_for_payment(sender, instance, previous_paid_at, **kwargs):
+    days = {local_day(instance.paid_at), local_day(previous_paid_at)} - {None}
+    facility_id = _facility_id(instance) if days else None
+    if facility_id is not None:
+        rollup_batch.add(facility_id, days)
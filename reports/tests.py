@@ -0,0 +1,184 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from payments.models import Payment
+from payments.transitions import mark_many_paid
+from reservations.models import Reservation
+from reservations.tests import make_facility
+from . import rollups
+from .models import DailyFacilityStats, StaleRollupDay
+
+
+class RollupTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = make_facility()
+
+    def reserve(self, days, **kwargs):
+        check_in = timezone.localdate() + timedelta(days=days)
+        return Reservation.objects.create(
+            user=self.user, facility=self.facility, check_in=check_in,
+            check_out=check_in + timedelta(days=2), total_price=Decimal('2000.00'), **kwargs,
+        )
+
+    def totals(self, *fields):
+        return DailyFacilityStats.objects.aggregate(**{field: Sum(field) for field in fields})
+
+
+class RollupRefreshTests(RollupTestCase):
+
+    def test_transaction_queues_days_for_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for days in (10, 20, 30):
+                    self.reserve(days, status=Reservation.Status.CONFIRMED)
+
+        # The booking day plus two nights per stay; nothing is rebuilt yet.
+        self.assertEqual(StaleRollupDay.objects.filter(facility=self.facility).count(), 7)
+        self.assertFalse(DailyFacilityStats.objects.exists())
+
+        # The worker drops stale connections between polls; keep the test's open.
+        with mock.patch.object(rollups, 'rebuild_days', wraps=rollups.rebuild_days) as rebuild_days, \
+                mock.patch('reports.management.commands.refresh_rollups.close_old_connections'):
+            call_command('refresh_rollups', once=True, stdout=io.StringIO())
+
+        rebuild_days.assert_called_once()
+        self.assertEqual(rebuild_days.call_args.args[0], self.facility.pk)
+        self.assertFalse(StaleRollupDay.objects.exists())
+        self.assertEqual(
+            self.totals('occupied_nights', 'bookings_confirmed'),
+            {'occupied_nights': 6, 'bookings_confirmed': 3},
+        )
+
+    def test_bulk_payment_updates_reach_the_rollups(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            payments = [
+                Payment.objects.create(
+                    reservation=reservation, user=self.user, amount=reservation.total_price,
+                    status=Payment.Status.PROCESSING, paymongo_checkout_id=f'cs_{reservation.pk}',
+                )
+                for reservation in (self.reserve(10), self.reserve(20))
+            ]
+        rollups.refresh_queued()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_many_paid([payment.pk for payment in payments])
+        with mock.patch.object(rollups, 'rebuild_days', wraps=rollups.rebuild_days) as rebuild_days:
+            rollups.refresh_queued()
+
+        rebuild_days.assert_called_once()
+        self.assertEqual(self.totals('revenue', 'bookings_paid'), {'revenue': Decimal('4000.00'), 'bookings_paid': 2})
+
+    def test_failed_rebuild_queues_the_days_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserve(10, status=Reservation.Status.CONFIRMED)
+        queued = set(StaleRollupDay.objects.values_list('facility_id', 'day'))
+
+        with mock.patch.object(rollups, 'rebuild_days', side_effect=RuntimeError('database went away')), \
+                self.assertLogs('reports.rollups', 'ERROR'), self.assertRaises(RuntimeError):
+            rollups.refresh_queued()
+
+        self.assertEqual(set(StaleRollupDay.objects.values_list('facility_id', 'day')), queued)
+        self.assertFalse(DailyFacilityStats.objects.exists())
+
+    def test_batches_take_the_oldest_days_first(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserve(10, status=Reservation.Status.CONFIRMED)
+        self.assertEqual(rollups.refresh_queued(limit=2), 2)
+        self.assertEqual(StaleRollupDay.objects.count(), 1)
+        self.assertEqual(rollups.refresh_queued(), 1)
+        self.assertEqual(rollups.refresh_queued(), 0)
+
+
+class BackfillRollupsTests(RollupTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserve(10, status=Reservation.Status.CONFIRMED)
+            paid = self.reserve(20, status=Reservation.Status.PAID, guests=3)
+            Payment.objects.create(
+                reservation=paid, user=self.user, amount=paid.total_price,
+                status=Payment.Status.PAID, paymongo_checkout_id='cs_paid', paid_at=timezone.now(),
+            )
+            self.reserve(30, status=Reservation.Status.CANCELLED)
+        # As after a deploy: the history exists, the rollups do not.
+        StaleRollupDay.objects.all().delete()
+
+    def backfill(self, *args):
+        out = io.StringIO()
+        call_command('backfill_rollups', *args, stdout=out)
+        return out.getvalue()
+
+    def test_builds_rollups_from_history(self):
+        # A row left over from data that has since been deleted.
+        DailyFacilityStats.objects.create(facility=self.facility, day=timezone.localdate(), revenue=999)
+
+        self.assertIn('Rebuilt rollups', self.backfill('--chunk-days', '7'))
+        self.assertEqual(
+            self.totals('revenue', 'payments', 'occupied_nights', 'guest_nights', 'bookings_confirmed',
+                        'bookings_paid', 'bookings_cancelled'),
+            {'revenue': Decimal('2000.00'), 'payments': 1, 'occupied_nights': 4, 'guest_nights': 8,
+             'bookings_confirmed': 1, 'bookings_paid': 1, 'bookings_cancelled': 1},
+        )
+
+    def test_is_safe_to_rerun(self):
+        self.backfill()
+        first = list(DailyFacilityStats.objects.order_by('day').values('day', *rollups.STAT_FIELDS))
+        self.backfill('--chunk-days', '1')
+        self.assertEqual(list(DailyFacilityStats.objects.order_by('day').values('day', *rollups.STAT_FIELDS)), first)
+
+    def test_limits_to_the_given_range(self):
+        start = timezone.localdate() + timedelta(days=20)
+        self.backfill('--start', start.isoformat(), '--end', (start + timedelta(days=1)).isoformat())
+        self.assertEqual(
+            set(DailyFacilityStats.objects.values_list('day', flat=True)), {start, start + timedelta(days=1)},
+        )
+        self.assertEqual(self.totals('occupied_nights', 'revenue'), {'occupied_nights': 2, 'revenue': 0})
+
+    def test_rejects_bad_arguments(self):
+        for args in (['--chunk-days', '0'], ['--start', '2026-02-01', '--end', '2026-01-01'], ['--start', '2026-13-01']):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self.backfill(*args)
+
+    def test_nothing_to_backfill(self):
+        Reservation.objects.all().delete()
+        self.assertIn('nothing to backfill', self.backfill())
+
+
+class ReportsDashboardTests(TestCase):
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(username='admin', password='admin-password')
+        self.client.force_login(admin)
+        self.url = reverse('admin:reports_dailyfacilitystats_changelist')
+
+    def test_month_navigation(self):
+        facility = make_facility()
+        DailyFacilityStats.objects.create(facility=facility, day=date(2026, 3, 14), revenue=1500, payments=1)
+
+        response = self.client.get(self.url, {'month': '2026-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['totals']['revenue'], Decimal('1500'))
+        self.assertEqual(response.context['previous_month'], date(2026, 2, 1))
+        self.assertEqual(response.context['next_month'], date(2026, 4, 1))
+
+        # A malformed month shows the current one.
+        response = self.client.get(self.url, {'month': 'March'})
+        self.assertEqual(response.context['month'], timezone.localdate().replace(day=1))
+
+    def test_out_of_range_months_are_bad_requests(self):
+        for month in ('9999-12', '0001-01', '2026-13', '2026-0'):
+            with self.subTest(month=month):
+                self.assertEqual(self.client.get(self.url, {'month': month}).status_code, 400)
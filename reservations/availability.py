@@ -0,0 +1,209 @@
+"""
+In-process availability index for facility bookings.
+
+Keeps, per facility, a sorted list of the stays that block the calendar
+(pending holds, confirmed and paid reservations) so that "is this range
+free?" and "which windows are free this month?" are answered with a binary
+search instead of a table scan. Stays are half-open ranges [check_in, check_out):
+a guest checking out on the 5th does not block a check-in on the 5th.
+
+The index is loaded lazily per facility from the database and kept in sync
+by the Reservation signals in ``reservations.signals``. Each gunicorn worker
+holds its own copy, so entries also expire after
+``AVAILABILITY_INDEX_TTL`` seconds to pick up writes made by other workers.
+Until then a worker may still see a stay that another worker cancelled, so
+the index is only a fast path: a "taken" answer that turns a guest away is
+confirmed against the database first (``confirmed_taken``).
+"""
+
+import calendar
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from django.conf import settings
+
+
+class FacilityIntervals:
+    """Sorted set of blocking stays for a single facility."""
+
+    def __init__(self, stays=()):
+        # stays: iterable of (pk, check_in, check_out)
+        self._by_pk = {}
+        self._starts = []
+        self._stays = []
+        self._max_end = []
+        for pk, check_in, check_out in stays:
+            self._by_pk[pk] = (check_in, check_out)
+        self._stays = sorted(
+            (check_in, check_out, pk)
+            for pk, (check_in, check_out) in self._by_pk.items()
+        )
+        self._starts = [stay[0] for stay in self._stays]
+        self._refresh_max_end(0)
+        self.loaded_at = time.monotonic()
+
+    def _refresh_max_end(self, start):
+        # Running maximum of check-out dates, so overlap checks stay correct
+        # even if legacy data contains stays that overlap each other. Only
+        # entries from ``start`` on can change after an insert or removal.
+        del self._max_end[start:]
+        running = self._max_end[-1] if self._max_end else None
+        for _, check_out, _ in self._stays[start:]:
+            running = check_out if running is None or check_out > running else running
+            self._max_end.append(running)
+
+    def _remove(self, pk):
+        check_in, check_out = self._by_pk.pop(pk)
+        idx = bisect_left(self._stays, (check_in, check_out, pk))
+        del self._stays[idx]
+        del self._starts[idx]
+        return idx
+
+    def __len__(self):
+        return len(self._stays)
+
+    def upsert(self, pk, check_in, check_out):
+        if self._by_pk.get(pk) == (check_in, check_out):
+            return
+        first_changed = self._remove(pk) if pk in self._by_pk else len(self._stays)
+        self._by_pk[pk] = (check_in, check_out)
+        stay = (check_in, check_out, pk)
+        insort(self._stays, stay)
+        idx = bisect_left(self._stays, stay)
+        self._starts.insert(idx, check_in)
+        self._refresh_max_end(min(first_changed, idx))
+
+    def discard(self, pk):
+        if pk in self._by_pk:
+            self._refresh_max_end(self._remove(pk))
+
+    def is_free(self, check_in, check_out):
+        """Return True if no stay overlaps [check_in, check_out)."""
+        # Stays starting before our check-out are the only candidates; of
+        # those, the latest check-out tells us whether any reaches past our
+        # check-in.
+        idx = bisect_left(self._starts, check_out)
+        if idx == 0:
+            return True
+        return self._max_end[idx - 1] <= check_in
+
+    def booked_between(self, start, end):
+        """Return the (check_in, check_out) stays overlapping [start, end)."""
+        idx = bisect_left(self._starts, end)
+        booked = []
+        i = idx - 1
+        while i >= 0 and self._max_end[i] > start:
+            check_in, check_out, _ = self._stays[i]
+            if check_out > start:
+                booked.append((check_in, check_out))
+            i -= 1
+        booked.reverse()
+        return booked
+
+    def free_windows(self, start, end):
+        """Return the free [from, to) windows inside [start, end)."""
+        windows = []
+        cursor = start
+        for check_in, check_out in self.booked_between(start, end):
+            if check_in > cursor:
+                windows.append((cursor, check_in))
+            if check_out > cursor:
+                cursor = check_out
+        if cursor < end:
+            windows.append((cursor, end))
+        return windows
+
+
+class AvailabilityIndex:
+    """Process-wide registry of FacilityIntervals, keyed by facility id."""
+
+    def __init__(self):
+        self._facilities = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AVAILABILITY_INDEX_TTL', 60)
+
+    def _load(self, facility_id):
+        from .services import blocking_stays
+
+        stays = blocking_stays().filter(
+            facility_id=facility_id,
+        ).values_list('pk', 'check_in', 'check_out')
+        return FacilityIntervals(stays)
+
+    def _get(self, facility_id):
+        with self._lock:
+            intervals = self._facilities.get(facility_id)
+            if intervals is not None and time.monotonic() - intervals.loaded_at < self.ttl:
+                return intervals
+        intervals = self._load(facility_id)
+        with self._lock:
+            self._facilities[facility_id] = intervals
+        return intervals
+
+    def is_free(self, facility_id, check_in, check_out):
+        return self._get(facility_id).is_free(check_in, check_out)
+
+    def confirmed_taken(self, facility_id, check_in, check_out):
+        """
+        True when a blocking stay overlaps [check_in, check_out). A free
+        answer comes straight from the index; a taken one is re-checked in
+        the database, and the facility is reloaded if this worker's copy
+        turns out to be stale.
+        """
+        if self.is_free(facility_id, check_in, check_out):
+            return False
+        from .services import overlapping_stays
+
+        if overlapping_stays(facility_id, check_in, check_out).exists():
+            return True
+        self.invalidate(facility_id)
+        return False
+
+    def booked_between(self, facility_id, start, end):
+        return self._get(facility_id).booked_between(start, end)
+
+    def free_windows(self, facility_id, start, end):
+        return self._get(facility_id).free_windows(start, end)
+
+    def free_windows_in_month(self, facility_id, year, month):
+        start = date(year, month, 1)
+        end = date(year, month, calendar.monthrange(year, month)[1]) + timedelta(days=1)
+        return self.free_windows(facility_id, start, end)
+
+    def sync(self, reservation):
+        """Apply a saved reservation to the index (called from signals)."""
+        with self._lock:
+            # Moved to another facility: drop it from the old one.
+            for facility_id, other in self._facilities.items():
+                if facility_id != reservation.facility_id:
+                    other.discard(reservation.pk)
+            intervals = self._facilities.get(reservation.facility_id)
+            if intervals is None:
+                # Not loaded yet; the next read will load it fresh.
+                return
+            if reservation.status in reservation.BLOCKING_STATUSES:
+                intervals.upsert(reservation.pk, reservation.check_in, reservation.check_out)
+            else:
+                intervals.discard(reservation.pk)
+
+    def remove(self, reservation):
+        """Drop a deleted reservation from the index (called from signals)."""
+        with self._lock:
+            intervals = self._facilities.get(reservation.facility_id)
+            if intervals is not None:
+                intervals.discard(reservation.pk)
+
+    def invalidate(self, facility_id=None):
+        with self._lock:
+            if facility_id is None:
+                self._facilities.clear()
+            else:
+                self._facilities.pop(facility_id, None)
+
+
+availability_index = AvailabilityIndex()
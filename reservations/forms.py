@@ -43,3 +43,30 @@ class ReservationForm(forms.ModelForm):
         if guests and guests < 1:
             raise ValidationError('At least 1 guest is required.')
         return guests
+
+
+class AvailabilitySearchForm(forms.Form):
+    """Search every facility for a date range and party size."""
+    check_in = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input'}),
+    )
+    check_out = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input'}),
+    )
+    guests = forms.IntegerField(
+        min_value=1, initial=1,
+        widget=forms.NumberInput(attrs={'class': 'form-input', 'min': 1}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in = cleaned_data.get('check_in')
+        check_out = cleaned_data.get('check_out')
+
+        if check_in and check_out:
+            if check_in < date.today():
+                raise ValidationError('Check-in date cannot be in the past.')
+            if check_out <= check_in:
+                raise ValidationError('Check-out date must be after check-in date.')
+
+        return cleaned_data
@@ -0,0 +1,23 @@
+"""
+Cancel pending bookings whose hold has lapsed.
+
+Lapsed holds already stop blocking new bookings (and are cancelled by the
+booking that takes their dates); this sweep also clears them from the
+calendars and the availability search.
+
+Usage: python manage.py release_holds
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations.services import lapsed_holds, release_lapsed_holds
+
+
+class Command(BaseCommand):
+    help = 'Cancel pending bookings older than RESERVATION_HOLD_HOURS.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            released = release_lapsed_holds(lapsed_holds().select_for_update())
+        self.stdout.write(self.style.SUCCESS(f"Released {released} lapsed holds."))
@@ -0,0 +1,96 @@
+"""
+Fire many parallel bookings at one facility and verify none overlap.
+
+Usage: python manage.py stress_bookings --bookings 300 --workers 32
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from facilities.models import Facility
+from reservations.models import Reservation
+from reservations.services import BookingConflict, book_reservation
+
+STRESS_SLUG = 'stress-test-facility'
+
+
+class Command(BaseCommand):
+    help = 'Stress-test the booking service with concurrent bookings on one facility.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--days', type=int, default=120,
+                            help='Width of the date window the bookings compete for.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        user, _ = get_user_model().objects.get_or_create(username='stress-test-user')
+        facility, _ = Facility.objects.get_or_create(
+            slug=STRESS_SLUG,
+            defaults={
+                'name': 'Stress Test Facility',
+                'description': 'Temporary facility for stress_bookings.',
+                'capacity': 10,
+                'price_per_day': 1000,
+                'is_available': False,
+            },
+        )
+        facility.reservations.all().delete()
+
+        start = timezone.localdate() + timedelta(days=1)
+        requests = []
+        for _ in range(options['bookings']):
+            check_in = start + timedelta(days=rng.randrange(options['days']))
+            requests.append((check_in, check_in + timedelta(days=rng.randint(1, 4))))
+
+        def attempt(stay):
+            check_in, check_out = stay
+            try:
+                book_reservation(Reservation(
+                    user=user, facility=facility,
+                    check_in=check_in, check_out=check_out,
+                    status=Reservation.Status.CONFIRMED,
+                ))
+                return 'committed'
+            except BookingConflict:
+                return 'conflict'
+            except OperationalError:
+                return 'error'
+            finally:
+                connection.close()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            outcomes = list(pool.map(attempt, requests))
+        elapsed = time.perf_counter() - began
+
+        stays = list(
+            facility.reservations.filter(status__in=Reservation.BLOCKING_STATUSES)
+            .order_by('check_in').values_list('check_in', 'check_out')
+        )
+        overlaps = sum(
+            1 for previous, current in zip(stays, stays[1:]) if current[0] < previous[1]
+        )
+        facility.delete()
+        user.delete()
+
+        committed = outcomes.count('committed')
+        self.stdout.write(
+            f"{len(outcomes)} attempts in {elapsed:.2f}s: "
+            f"{committed} committed, {outcomes.count('conflict')} conflicts, "
+            f"{outcomes.count('error')} errors"
+        )
+        self.stdout.write(f"{committed / elapsed:.1f} commits/s, {len(outcomes) / elapsed:.1f} attempts/s")
+
+        if overlaps:
+            raise CommandError(f'{overlaps} overlapping stays were committed.')
+        self.stdout.write(self.style.SUCCESS('No overlapping stays.'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0002_facility_map_x_facility_map_y'),
+        ('reservations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['facility', 'status', 'check_in', 'check_out'], name='reservation_availability_idx'),
+        ),
+    ]
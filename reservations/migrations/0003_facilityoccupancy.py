@@ -0,0 +1,88 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:18
+
+import calendar
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+# Copies of the reservations.occupancy helpers as they were when this
+# migration was written, so later changes to that module cannot alter it.
+
+def add_months(day, count):
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_spanned(check_in, check_out):
+    if check_out <= check_in:
+        return []
+    months = []
+    current = check_in.replace(day=1)
+    last = (check_out - timedelta(days=1)).replace(day=1)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def month_bitmap(month, stays):
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    month_end = month + timedelta(days=days_in_month)
+    bits = 0
+    for check_in, check_out in stays:
+        first = max(check_in, month)
+        last = min(check_out, month_end)
+        for offset in range((first - month).days, (last - month).days):
+            bits |= 1 << offset
+    return bits
+
+
+def backfill_occupancy(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    FacilityOccupancy = apps.get_model('reservations', 'FacilityOccupancy')
+
+    stays_by_month = defaultdict(list)
+    stays = Reservation.objects.filter(
+        status__in=['confirmed', 'paid'],
+    ).values_list('facility_id', 'check_in', 'check_out').iterator()
+    for facility_id, check_in, check_out in stays:
+        for month in months_spanned(check_in, check_out):
+            stays_by_month[(facility_id, month)].append((check_in, check_out))
+
+    FacilityOccupancy.objects.bulk_create([
+        FacilityOccupancy(
+            facility_id=facility_id, month=month,
+            booked_days=month_bitmap(month, month_stays),
+        )
+        for (facility_id, month), month_stays in stays_by_month.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0002_facility_map_x_facility_map_y'),
+        ('reservations', '0002_reservation_availability_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacilityOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('booked_days', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='facilities.facility')),
+            ],
+            options={
+                'verbose_name_plural': 'Facility occupancy',
+                'ordering': ['facility', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('facility', 'month'), name='unique_facility_occupancy_month')],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,161 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('reservations.migrations')
+
+CONSTRAINED = ('confirmed', 'paid')
+
+
+# Copies of the helpers this migration needs as they were when it was
+# written, so later changes to the app code cannot alter it.
+
+def queue_email(EmailOutbox, subject, message, recipients):
+    recipients = [address for address in recipients if address]
+    if recipients:
+        EmailOutbox.objects.create(
+            subject=subject[:255], body=message, recipients=recipients,
+            from_email=settings.DEFAULT_FROM_EMAIL or '',
+        )
+
+
+def adjust_rollup(DailyFacilityStats, facility_id, day, **deltas):
+    """Apply ``deltas`` to one rollup row, if it has been built."""
+    DailyFacilityStats.objects.filter(facility_id=facility_id, day=day).update(
+        **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    )
+
+
+def move_overlapping_stays(apps, schema_editor):
+    """
+    The exclusion constraint cannot be added while two confirmed or paid
+    stays share a night, and bookings made before the booking service
+    could overlap. Keep the earliest booking on each night; move each later
+    one that collides out of the constrained statuses, as
+    ``payments.transitions`` does for a paid stay that lost its dates:
+    a paid stay becomes a conflict with its payments refund due, a
+    confirmed one is cancelled. Each one is logged, staff get a refund or
+    cancellation notice and the guest is told why.
+    """
+    Reservation = apps.get_model('reservations', 'Reservation')
+    Payment = apps.get_model('payments', 'Payment')
+    EmailOutbox = apps.get_model('core', 'EmailOutbox')
+    DailyFacilityStats = apps.get_model('reports', 'DailyFacilityStats')
+
+    kept = defaultdict(list)
+    stays = (
+        Reservation.objects.filter(status__in=CONSTRAINED)
+        .select_related('user', 'facility')
+        .order_by('created_at', 'pk')
+    )
+    for reservation in stays.iterator(chunk_size=500):
+        stay = (reservation.check_in, reservation.check_out)
+        clash = next((
+            pk for pk, (other_in, other_out) in kept[reservation.facility_id]
+            if other_in < stay[1] and other_out > stay[0]
+        ), None)
+        if clash is None:
+            kept[reservation.facility_id].append((reservation.pk, stay))
+            continue
+
+        old_status = reservation.status
+        new_status = 'conflict' if old_status == 'paid' else 'cancelled'
+        Reservation.objects.filter(pk=reservation.pk).update(status=new_status, updated_at=timezone.now())
+        logger.warning(
+            f"Reservation #{reservation.pk} ({old_status}, {stay[0]} to {stay[1]}) overlaps reservation "
+            f"#{clash} at {reservation.facility.name}; moved to {new_status}."
+        )
+
+        # ROLLUP_STATUS counts a conflict as cancelled.
+        adjust_rollup(
+            DailyFacilityStats, reservation.facility_id, timezone.localdate(reservation.created_at),
+            **{f'bookings_{old_status}': -1, 'bookings_cancelled': 1},
+        )
+        for offset in range((stay[1] - stay[0]).days):
+            adjust_rollup(
+                DailyFacilityStats, reservation.facility_id, stay[0] + timedelta(days=offset),
+                occupied_nights=-1, guest_nights=-reservation.guests,
+            )
+        refunds = list(Payment.objects.filter(reservation_id=reservation.pk, status='paid'))
+        Payment.objects.filter(pk__in=[payment.pk for payment in refunds]).update(status='refund_due')
+        for payment in refunds:
+            if payment.paid_at:
+                adjust_rollup(
+                    DailyFacilityStats, reservation.facility_id, timezone.localdate(payment.paid_at),
+                    revenue=-payment.amount, payments=-1,
+                )
+
+        guest = reservation.user.get_full_name() or reservation.user.username
+        if new_status == 'conflict':
+            tag = 'Refund Due'
+            staff_outcome = 'The reservation is marked as a conflict and its payment as refund due. Please refund the guest.'
+            guest_outcome = 'Your payment will be refunded in full; our staff will contact you.'
+        else:
+            tag = 'Booking Cancelled'
+            staff_outcome = 'The reservation has been cancelled.'
+            guest_outcome = 'Please book other dates, or contact us and we will help you rebook.'
+        queue_email(
+            EmailOutbox,
+            f"[{tag}] Reservation #{reservation.pk} overlapped an earlier booking",
+            f"Reservation #{reservation.pk} ({guest}, {reservation.user.email}) at {reservation.facility.name}, "
+            f"{stay[0]} to {stay[1]}, overlapped the earlier reservation #{clash}.\n\n{staff_outcome}",
+            [settings.EMAIL_HOST_USER],
+        )
+        queue_email(
+            EmailOutbox,
+            f"Your reservation #{reservation.pk} at {reservation.facility.name}",
+            f"Hello {guest},\n\n"
+            f"We are sorry: your reservation #{reservation.pk} at {reservation.facility.name} "
+            f"({stay[0]} to {stay[1]}) was made for dates that were already taken, so we could "
+            f"not keep it. {guest_outcome}",
+            [reservation.user.email],
+        )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # daterange exclusion constraints are PostgreSQL-only; other backends
+    # rely on the locking in reservations.services.book_reservation.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        """
+        ALTER TABLE reservations_reservation
+        ADD CONSTRAINT reservation_no_overlapping_stays
+        EXCLUDE USING gist (
+            facility_id WITH =,
+            daterange(check_in, check_out, '[)') WITH &&
+        )
+        WHERE (status IN ('confirmed', 'paid'))
+        """
+    )
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE reservations_reservation '
+        'DROP CONSTRAINT IF EXISTS reservation_no_overlapping_stays'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_facilityoccupancy'),
+        ('payments', '0001_initial'),
+        ('core', '0003_emailoutbox'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_overlapping_stays, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraint, remove_exclusion_constraint),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0004_facility_available_name_idx'),
+        ('reservations', '0004_reservation_no_overlapping_stays'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='reservation_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,177 @@
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('reservations.migrations')
+
+OLD_BLOCKING = ('confirmed', 'paid')
+NEW_BLOCKING = ('pending', 'confirmed', 'paid')
+
+
+# Copies of the helpers this migration needs as they were when it was
+# written, so later changes to the app code cannot alter it.
+
+def queue_email(EmailOutbox, subject, message, recipients):
+    recipients = [address for address in recipients if address]
+    if recipients:
+        EmailOutbox.objects.create(
+            subject=subject[:255], body=message, recipients=recipients,
+            from_email=settings.DEFAULT_FROM_EMAIL or '',
+        )
+
+
+def add_months(day, count):
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_spanned(check_in, check_out):
+    if check_out <= check_in:
+        return []
+    months = []
+    current = check_in.replace(day=1)
+    last = (check_out - timedelta(days=1)).replace(day=1)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def month_bitmap(month, stays):
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    month_end = month + timedelta(days=days_in_month)
+    bits = 0
+    for check_in, check_out in stays:
+        first = max(check_in, month)
+        last = min(check_out, month_end)
+        for offset in range((first - month).days, (last - month).days):
+            bits |= 1 << offset
+    return bits
+
+
+def release_conflicting_holds(apps, schema_editor):
+    """
+    Pending bookings now block their dates, so two of them (or one and a
+    confirmed stay) can no longer share a night. Keep confirmed and paid
+    stays, then the oldest pending ones; cancel the pending ones that
+    collide with what is kept. Each cancellation is logged and counted in
+    the report rollups, and the guest and staff are told why.
+    """
+    Reservation = apps.get_model('reservations', 'Reservation')
+    EmailOutbox = apps.get_model('core', 'EmailOutbox')
+    DailyFacilityStats = apps.get_model('reports', 'DailyFacilityStats')
+
+    kept = defaultdict(list)
+    stays = Reservation.objects.filter(status__in=OLD_BLOCKING).values_list('facility_id', 'check_in', 'check_out')
+    for facility_id, check_in, check_out in stays.iterator():
+        kept[facility_id].append((check_in, check_out))
+
+    conflicting = []
+    pending = (
+        Reservation.objects.filter(status='pending')
+        .order_by('created_at', 'pk')
+        .values_list('pk', 'facility_id', 'check_in', 'check_out')
+    )
+    for pk, facility_id, check_in, check_out in pending.iterator():
+        if any(other_in < check_out and other_out > check_in for other_in, other_out in kept[facility_id]):
+            conflicting.append(pk)
+        else:
+            kept[facility_id].append((check_in, check_out))
+    for start in range(0, len(conflicting), 500):
+        batch = Reservation.objects.filter(pk__in=conflicting[start:start + 500]).select_related('user', 'facility')
+        for reservation in batch:
+            Reservation.objects.filter(pk=reservation.pk).update(status='cancelled', updated_at=timezone.now())
+            logger.warning(
+                f"Pending reservation #{reservation.pk} ({reservation.check_in} to {reservation.check_out}) "
+                f"overlaps an earlier booking at {reservation.facility.name}; cancelled."
+            )
+            DailyFacilityStats.objects.filter(
+                facility_id=reservation.facility_id, day=timezone.localdate(reservation.created_at),
+            ).update(
+                bookings_pending=Greatest(F('bookings_pending') - 1, 0),
+                bookings_cancelled=F('bookings_cancelled') + 1,
+            )
+
+            guest = reservation.user.get_full_name() or reservation.user.username
+            queue_email(
+                EmailOutbox,
+                f"[Booking Cancelled] Reservation #{reservation.pk} overlapped an earlier booking",
+                f"Pending reservation #{reservation.pk} ({guest}, {reservation.user.email}) at "
+                f"{reservation.facility.name}, {reservation.check_in} to {reservation.check_out}, "
+                f"overlapped an earlier booking when pending bookings started holding their dates, "
+                f"and has been cancelled.",
+                [settings.EMAIL_HOST_USER],
+            )
+            queue_email(
+                EmailOutbox,
+                f"Your reservation #{reservation.pk} at {reservation.facility.name}",
+                f"Hello {guest},\n\n"
+                f"We are sorry: your pending reservation #{reservation.pk} at {reservation.facility.name} "
+                f"({reservation.check_in} to {reservation.check_out}) overlapped a booking made before "
+                f"it, so we could not keep it. Please book other dates, or contact us and we will help "
+                f"you rebook.",
+                [reservation.user.email],
+            )
+
+
+def rebuild_occupancy(statuses):
+    def rebuild(apps, schema_editor):
+        Reservation = apps.get_model('reservations', 'Reservation')
+        FacilityOccupancy = apps.get_model('reservations', 'FacilityOccupancy')
+
+        stays_by_month = defaultdict(list)
+        stays = Reservation.objects.filter(status__in=statuses).values_list('facility_id', 'check_in', 'check_out')
+        for facility_id, check_in, check_out in stays.iterator():
+            for month in months_spanned(check_in, check_out):
+                stays_by_month[(facility_id, month)].append((check_in, check_out))
+
+        FacilityOccupancy.objects.all().delete()
+        FacilityOccupancy.objects.bulk_create([
+            FacilityOccupancy(facility_id=facility_id, month=month, booked_days=month_bitmap(month, month_stays))
+            for (facility_id, month), month_stays in stays_by_month.items()
+        ], batch_size=500)
+    return rebuild
+
+
+def replace_exclusion_constraint(statuses):
+    def replace(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(
+            'ALTER TABLE reservations_reservation '
+            'DROP CONSTRAINT IF EXISTS reservation_no_overlapping_stays'
+        )
+        schema_editor.execute(
+            f"""
+            ALTER TABLE reservations_reservation
+            ADD CONSTRAINT reservation_no_overlapping_stays
+            EXCLUDE USING gist (
+                facility_id WITH =,
+                daterange(check_in, check_out, '[)') WITH &&
+            )
+            WHERE (status IN ({', '.join(f"'{status}'" for status in statuses)}))
+            """
+        )
+    return replace
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_reservation_user_created_idx'),
+        ('core', '0003_emailoutbox'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_conflicting_holds, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_occupancy(NEW_BLOCKING), rebuild_occupancy(OLD_BLOCKING)),
+        migrations.RunPython(replace_exclusion_constraint(NEW_BLOCKING), replace_exclusion_constraint(OLD_BLOCKING)),
+    ]
@@ -14,6 +14,16 @@ class Reservation(models.Model):
         PAID = 'paid', 'Paid'
         CANCELLED = 'cancelled', 'Cancelled'
         COMPLETED = 'completed', 'Completed'
+        # Paid for, but the dates were already taken: staff must refund.
+        CONFLICT = 'conflict', 'Conflict — refund due'
+
+    # Statuses that hold the facility for the booked dates. A pending
+    # booking is a hold: it blocks its dates while the guest pays or an
+    # admin confirms, and lapses RESERVATION_HOLD_HOURS after it was made
+    # (see reservations.services.blocking_stays).
+    BLOCKING_STATUSES = (Status.PENDING, Status.CONFIRMED, Status.PAID)
+    # Statuses whose nights count as occupied in the reports.
+    OCCUPIED_STATUSES = (Status.CONFIRMED, Status.PAID, Status.COMPLETED)
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -40,6 +50,29 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['facility', 'status', 'check_in', 'check_out'],
+                name='reservation_availability_idx',
+            ),
+            # Keyset pagination of a guest's bookings, newest first.
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='reservation_user_created_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stay as loaded so signal handlers can tell which
+        # occupancy months a status or date change has to refresh.
+        instance._loaded_stay = (
+            instance.__dict__.get('status'),
+            instance.__dict__.get('check_in'),
+            instance.__dict__.get('check_out'),
+        )
+        return instance
 
     def __str__(self):
         return f"Reservation #{self.pk} — {self.user} @ {self.facility} ({self.check_in} to {self.check_out})"
@@ -57,3 +90,30 @@ class Reservation(models.Model):
         if self.check_in and self.check_out:
             return (self.check_out - self.check_in).days
         return 0
+
+
+class FacilityOccupancy(models.Model):
+    """
+    Booked nights of one facility for one calendar month.
+    Bit ``d - 1`` of ``booked_days`` is set when night ``d`` is taken.
+    """
+    facility = models.ForeignKey(
+        Facility,
+        on_delete=models.CASCADE,
+        related_name='occupancy',
+    )
+    month = models.DateField(help_text="First day of the month")
+    booked_days = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['facility', 'month']
+        verbose_name_plural = 'Facility occupancy'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['facility', 'month'], name='unique_facility_occupancy_month',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.facility} — {self.month:%B %Y}"
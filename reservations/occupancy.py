@@ -0,0 +1,148 @@
+"""
+Per-facility, per-month occupancy bitmaps.
+
+Each FacilityOccupancy row stores one month as an integer bitmask: bit
+``d - 1`` is set when night ``d`` of that month is taken by a held,
+confirmed or paid stay. A calendar for a date window is therefore a single
+keyed read over a handful of rows, no matter how many reservations the
+facility has.
+
+Rows are rebuilt for just the months a reservation touches whenever that
+reservation is saved or deleted (see ``reservations.signals``). A rebuild
+locks the facility row first, the same lock ``book_reservation`` takes, so
+two rebuilds for one facility run one after the other and the later one
+always reads the stays the earlier one committed.
+"""
+
+import base64
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction
+
+# Calendars and reports step a year or so either side of the month asked
+# for; keeping months within these years keeps every step a valid date.
+MIN_YEAR, MAX_YEAR = 1900, 9000
+
+
+class MonthOutOfRange(ValueError):
+    pass
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def parse_month(value, default):
+    """
+    Parse a YYYY-MM query value into the first day of that month, or of
+    ``default``'s month when the value is missing or malformed. Raises
+    MonthOutOfRange for a month that does not exist or falls outside
+    MIN_YEAR..MAX_YEAR.
+    """
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        return month_start(default)
+    if not (MIN_YEAR <= year <= MAX_YEAR and 1 <= month <= 12):
+        raise MonthOutOfRange(f'Months run from {MIN_YEAR}-01 to {MAX_YEAR}-12.')
+    return date(year, month, 1)
+
+
+def add_months(day, count):
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_spanned(check_in, check_out):
+    """Return the first-of-month dates covered by the nights [check_in, check_out)."""
+    if check_out <= check_in:
+        return []
+    months = []
+    current = month_start(check_in)
+    last = month_start(check_out - timedelta(days=1))
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def month_bitmap(month, stays):
+    """Fold (check_in, check_out) stays into the bitmask for ``month``."""
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    month_end = month + timedelta(days=days_in_month)
+    bits = 0
+    for check_in, check_out in stays:
+        first = max(check_in, month)
+        last = min(check_out, month_end)
+        for offset in range((first - month).days, (last - month).days):
+            bits |= 1 << offset
+    return bits
+
+
+def encode_bitmap(bits, month):
+    """Encode a month bitmask as base64 over its little-endian bytes."""
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    raw = bits.to_bytes((days_in_month + 7) // 8, 'little')
+    return base64.b64encode(raw).decode()
+
+
+def rebuild_months(facility_id, months):
+    """
+    Recompute and store the occupancy rows for ``months`` of one facility,
+    reading the stays and writing the rows under the facility row lock.
+    """
+    from facilities.models import Facility
+    from .models import FacilityOccupancy
+    from .services import blocking_stays
+
+    months = sorted(set(months))
+    if not months:
+        return
+    window_start = months[0]
+    window_end = add_months(months[-1], 1)
+
+    with transaction.atomic():
+        if not Facility.objects.select_for_update().filter(pk=facility_id).exists():
+            return
+        stays = list(
+            blocking_stays().filter(
+                facility_id=facility_id,
+                check_in__lt=window_end,
+                check_out__gt=window_start,
+            ).values_list('check_in', 'check_out')
+        )
+
+        for month in months:
+            bits = month_bitmap(month, stays)
+            if bits:
+                FacilityOccupancy.objects.update_or_create(
+                    facility_id=facility_id, month=month,
+                    defaults={'booked_days': bits},
+                )
+            else:
+                FacilityOccupancy.objects.filter(facility_id=facility_id, month=month).delete()
+
+
+def calendar_window(facility_id, start, count):
+    """Return ``count`` months of encoded occupancy starting at ``start``."""
+    from .models import FacilityOccupancy
+
+    start = month_start(start)
+    end = add_months(start, count)
+    stored = dict(
+        FacilityOccupancy.objects.filter(
+            facility_id=facility_id, month__gte=start, month__lt=end,
+        ).values_list('month', 'booked_days')
+    )
+
+    months = []
+    for i in range(count):
+        month = add_months(start, i)
+        bits = stored.get(month, 0)
+        months.append({
+            'month': month.strftime('%Y-%m'),
+            'days': calendar.monthrange(month.year, month.month)[1],
+            'bitmap': encode_bitmap(bits, month),
+        })
+    return months
@@ -0,0 +1,44 @@
+"""
+Multi-facility availability search.
+Answers "which facilities are free for these dates and this many guests"
+with one aggregated query, cached per (check_in, check_out, guests).
+"""
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from facilities.models import Facility
+from .services import blocking_stays
+
+SEARCH_CACHE_TIMEOUT = 60
+GENERATION_KEY = 'availability-search:generation'
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate_search_cache():
+    """Retire every cached search result (called when bookings change)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def available_facilities(check_in, check_out, guests):
+    """Return the available facilities that fit ``guests`` and are free for the stay."""
+    key = f'availability-search:{_generation()}:{check_in}:{check_out}:{guests}'
+    facilities = cache.get(key)
+    if facilities is None:
+        booked = blocking_stays().filter(
+            facility=OuterRef('pk'),
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+        )
+        facilities = list(
+            Facility.objects.filter(is_available=True, capacity__gte=guests)
+            .exclude(Exists(booked))
+        )
+        cache.set(key, facilities, SEARCH_CACHE_TIMEOUT)
+    return facilities
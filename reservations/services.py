@@ -0,0 +1,96 @@
+"""
+Booking service.
+Performs the date-conflict check and the reservation insert as one atomic
+step so that concurrent requests cannot both claim the same dates.
+
+Pending bookings hold their dates for ``RESERVATION_HOLD_HOURS``; after
+that they stop blocking, and a booking that needs the dates cancels them.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from facilities.models import Facility
+from .models import Reservation
+
+# Name of the PostgreSQL exclusion constraint added in migration 0004.
+EXCLUSION_CONSTRAINT = 'reservation_no_overlapping_stays'
+
+
+class BookingConflict(Exception):
+    """Raised when the requested dates overlap a held, confirmed or paid stay."""
+
+
+def hold_cutoff():
+    """Pending bookings made before this moment no longer hold their dates."""
+    return timezone.now() - timedelta(hours=settings.RESERVATION_HOLD_HOURS)
+
+
+def blocking_stays():
+    """Reservations that block their dates: confirmed, paid, or pending and within the hold."""
+    return Reservation.objects.filter(status__in=Reservation.BLOCKING_STATUSES).exclude(
+        status=Reservation.Status.PENDING, created_at__lt=hold_cutoff(),
+    )
+
+
+def lapsed_holds():
+    """Pending reservations whose hold has run out."""
+    return Reservation.objects.filter(status=Reservation.Status.PENDING, created_at__lt=hold_cutoff())
+
+
+def overlapping_stays(facility_id, check_in, check_out):
+    """Blocking reservations overlapping [check_in, check_out)."""
+    return blocking_stays().filter(
+        facility_id=facility_id,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    )
+
+
+def release_lapsed_holds(queryset):
+    """Cancel the lapsed holds in ``queryset``; returns how many were released."""
+    released = 0
+    for reservation in queryset.filter(pk__in=lapsed_holds()):
+        reservation.status = Reservation.Status.CANCELLED
+        reservation.save(update_fields=['status', 'updated_at'])
+        released += 1
+    return released
+
+
+def book_reservation(reservation):
+    """
+    Check for conflicts and save ``reservation`` atomically.
+
+    The facility row is locked with SELECT ... FOR UPDATE, which serialises
+    bookings per facility on PostgreSQL; the ``daterange`` exclusion
+    constraint backs this up at the database level. On SQLite the row lock
+    is a no-op, but the IMMEDIATE transaction mode configured in settings
+    takes the database write lock when the transaction begins.
+    """
+    with transaction.atomic():
+        Facility.objects.select_for_update().only('pk').get(pk=reservation.facility_id)
+
+        if overlapping_stays(
+            reservation.facility_id, reservation.check_in, reservation.check_out
+        ).exists():
+            raise BookingConflict
+        # Lapsed holds on these dates still count for the exclusion
+        # constraint, so release them before taking the dates.
+        release_lapsed_holds(Reservation.objects.filter(
+            facility_id=reservation.facility_id,
+            check_in__lt=reservation.check_out,
+            check_out__gt=reservation.check_in,
+        ))
+
+        try:
+            with transaction.atomic():
+                reservation.save()
+        except IntegrityError as exc:
+            if EXCLUSION_CONSTRAINT in str(exc):
+                raise BookingConflict from exc
+            raise
+
+    return reservation
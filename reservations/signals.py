@@ -0,0 +1,74 @@
+"""
+Keep the availability index, occupancy bitmaps and search cache in step
+with Reservation and Facility writes, and announce every reservation
+change through ``reservation_changed`` for other apps (the report rollups
+in ``reports.signals``) to follow.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from core.batching import CommitBatch
+from facilities.models import Facility
+from .availability import availability_index
+from .models import Reservation
+from .occupancy import months_spanned, rebuild_months
+from .search import invalidate_search_cache
+
+# Sent for every saved or deleted reservation, including the ones changed
+# with ``QuerySet.update()`` (through ``schedule_sync``), with ``instance``
+# and ``previous``, the (status, check_in, check_out) it had when loaded.
+reservation_changed = Signal()
+
+
+def _rebuild_occupancy(months_by_facility):
+    for facility_id, months in months_by_facility.items():
+        rebuild_months(facility_id, months)
+    invalidate_search_cache()
+
+
+occupancy_batch = CommitBatch(_rebuild_occupancy)
+
+
+def _occupancy_months(instance, loaded):
+    """Months whose bitmap may change because of this save."""
+    months = set()
+    if instance.status in Reservation.BLOCKING_STATUSES:
+        months.update(months_spanned(instance.check_in, instance.check_out))
+    if loaded and loaded[0] in Reservation.BLOCKING_STATUSES and None not in loaded:
+        months.update(months_spanned(loaded[1], loaded[2]))
+    return months
+
+
+def schedule_sync(instance):
+    """
+    Refresh the index, bitmaps and search cache for ``instance`` once the
+    current transaction commits, and send ``reservation_changed``. Called
+    by the post_save handler, and directly by code that changes
+    reservations with ``QuerySet.update()``.
+    """
+    loaded = getattr(instance, '_loaded_stay', None)
+    instance._loaded_stay = (instance.status, instance.check_in, instance.check_out)
+    transaction.on_commit(lambda: availability_index.sync(instance))
+    occupancy_batch.add(instance.facility_id, _occupancy_months(instance, loaded))
+    reservation_changed.send(sender=Reservation, instance=instance, previous=loaded)
+
+
+@receiver(post_save, sender=Reservation)
+def sync_availability_on_save(sender, instance, **kwargs):
+    schedule_sync(instance)
+
+
+@receiver(post_delete, sender=Reservation)
+def sync_availability_on_delete(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_stay', None)
+    transaction.on_commit(lambda: availability_index.remove(instance))
+    occupancy_batch.add(instance.facility_id, _occupancy_months(instance, loaded))
+    reservation_changed.send(sender=Reservation, instance=instance, previous=loaded)
+
+
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Facility)
+def invalidate_search_on_facility_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_search_cache)
@@ -1,3 +1,472 @@
-from django.test import TestCase
+import base64
+import importlib
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import EmailOutbox
+from core.query_budget import QueryBudgetMixin
+from facilities.models import Facility
+from payments.models import Payment
+from .availability import FacilityIntervals, availability_index
+from .models import FacilityOccupancy, Reservation
+from .occupancy import rebuild_months
+from .services import BookingConflict, book_reservation
+
+
+def make_facility(slug='cottage', **kwargs):
+    return Facility.objects.create(
+        name=slug.title(), slug=slug, description='Test facility',
+        capacity=kwargs.pop('capacity', 4), price_per_day=Decimal('1000.00'), **kwargs,
+    )
+
+
+class FacilityIntervalsTests(SimpleTestCase):
+
+    def test_incremental_updates_match_a_fresh_build(self):
+        rng = random.Random(7)
+        start = date(2030, 1, 1)
+        stays = {}
+        intervals = FacilityIntervals()
+        for _ in range(300):
+            pk = rng.randint(1, 40)
+            if rng.random() < 0.3:
+                stays.pop(pk, None)
+                intervals.discard(pk)
+            else:
+                check_in = start + timedelta(days=rng.randint(0, 200))
+                check_out = check_in + timedelta(days=rng.randint(1, 6))
+                stays[pk] = (check_in, check_out)
+                intervals.upsert(pk, check_in, check_out)
+
+            fresh = FacilityIntervals((pk, *stay) for pk, stay in stays.items())
+            probe_in = start + timedelta(days=rng.randint(0, 200))
+            probe_out = probe_in + timedelta(days=rng.randint(1, 10))
+            self.assertEqual(intervals.is_free(probe_in, probe_out), fresh.is_free(probe_in, probe_out))
+            self.assertEqual(
+                intervals.booked_between(probe_in, probe_out), fresh.booked_between(probe_in, probe_out),
+            )
+        self.assertEqual(len(intervals), len(stays))
+
+
+class AvailabilityIndexTests(TestCase):
+
+    def setUp(self):
+        availability_index.invalidate()
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.check_in = timezone.localdate() + timedelta(days=30)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def tearDown(self):
+        availability_index.invalidate()
+
+    def book(self, facility, status=Reservation.Status.CONFIRMED):
+        return Reservation.objects.create(
+            user=self.user, facility=facility, check_in=self.check_in, check_out=self.check_out,
+            status=status,
+        )
+
+    def test_moving_a_reservation_frees_the_old_facility(self):
+        first, second = make_facility('first'), make_facility('second')
+        reservation = self.book(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(availability_index.is_free(first.pk, self.check_in, self.check_out))
+            self.assertTrue(availability_index.is_free(second.pk, self.check_in, self.check_out))
+            reservation.facility = second
+            reservation.save()
+
+        self.assertTrue(availability_index.is_free(first.pk, self.check_in, self.check_out))
+        self.assertFalse(availability_index.is_free(second.pk, self.check_in, self.check_out))
+
+    def test_stale_index_does_not_turn_guests_away(self):
+        facility = make_facility()
+        reservation = self.book(facility)
+        self.assertFalse(availability_index.is_free(facility.pk, self.check_in, self.check_out))
+        # Cancelled by another worker: this worker's index never hears of it.
+        Reservation.objects.filter(pk=reservation.pk).update(status=Reservation.Status.CANCELLED)
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('reservations:create', args=[facility.slug]), {
+            'check_in': self.check_in.isoformat(),
+            'check_out': self.check_out.isoformat(),
+            'guests': 2,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Reservation.objects.filter(facility=facility).exclude(pk=reservation.pk).count(), 1,
+        )
+
+
+class OccupancyTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = make_facility()
+
+    def test_rebuild_follows_status_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = Reservation.objects.create(
+                user=self.user, facility=self.facility, check_in=date(2030, 1, 30),
+                check_out=date(2030, 2, 2), status=Reservation.Status.CONFIRMED,
+            )
+        self.assertEqual(
+            dict(FacilityOccupancy.objects.values_list('month', 'booked_days')),
+            {date(2030, 1, 1): 0b11 << 29, date(2030, 2, 1): 0b1},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.status = Reservation.Status.CANCELLED
+            reservation.save()
+        self.assertFalse(FacilityOccupancy.objects.exists())
+
+    def test_rebuild_for_a_deleted_facility_is_a_no_op(self):
+        facility_id = self.facility.pk
+        self.facility.delete()
+        rebuild_months(facility_id, [date(2030, 1, 1)])
+        self.assertFalse(FacilityOccupancy.objects.exists())
+
+
+class HoldTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = make_facility()
+        self.check_in = timezone.localdate() + timedelta(days=30)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def request(self):
+        return Reservation(
+            user=self.user, facility=self.facility, check_in=self.check_in, check_out=self.check_out,
+        )
+
+    def test_pending_booking_holds_the_dates(self):
+        book_reservation(self.request())
+        with self.assertRaises(BookingConflict):
+            book_reservation(self.request())
+
+    @override_settings(RESERVATION_HOLD_HOURS=1)
+    def test_lapsed_hold_is_released_by_the_next_booking(self):
+        held = book_reservation(self.request())
+        Reservation.objects.filter(pk=held.pk).update(created_at=timezone.now() - timedelta(hours=2))
+
+        booked = book_reservation(self.request())
+
+        held.refresh_from_db()
+        self.assertEqual(held.status, Reservation.Status.CANCELLED)
+        self.assertEqual(booked.status, Reservation.Status.PENDING)
+
+
+def booked_nights(month):
+    """Decode one month of the calendar JSON into the set of taken nights."""
+    bits = int.from_bytes(base64.b64decode(month['bitmap']), 'little')
+    return {night for night in range(1, month['days'] + 1) if bits >> (night - 1) & 1}
+
+
+class AvailabilityCalendarTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = make_facility()
+        self.client.force_login(self.user)
+        availability_index.invalidate()
+        self.addCleanup(availability_index.invalidate)
+
+    def stay(self, check_in, nights, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                user=self.user, facility=self.facility, check_in=check_in,
+                check_out=check_in + timedelta(days=nights), status=status,
+            )
+
+    def calendar(self, **params):
+        response = self.client.get(reverse('reservations:calendar', args=[self.facility.slug]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['months']
+
+    def test_bitmaps_mark_the_blocked_nights(self):
+        self.stay(date(2030, 12, 30), 3, Reservation.Status.PAID)
+        self.stay(date(2031, 1, 10), 2, Reservation.Status.PENDING)
+        self.stay(date(2031, 1, 20), 2, Reservation.Status.CANCELLED)
+
+        december, january, february = self.calendar(start='2030-12', months=3)
+        self.assertEqual((december['month'], december['days']), ('2030-12', 31))
+        self.assertEqual(booked_nights(december), {30, 31})
+        self.assertEqual((january['month'], january['days']), ('2031-01', 31))
+        self.assertEqual(booked_nights(january), {1, 10, 11})
+        self.assertEqual((february['month'], february['days']), ('2031-02', 28))
+        self.assertEqual(booked_nights(february), set())
+
+    def test_bitmaps_follow_cancellations(self):
+        reservation = self.stay(date(2030, 3, 5), 2, Reservation.Status.CONFIRMED)
+        self.assertEqual(booked_nights(self.calendar(start='2030-03', months=1)[0]), {5, 6})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.status = Reservation.Status.CANCELLED
+            reservation.save()
+        self.assertEqual(booked_nights(self.calendar(start='2030-03', months=1)[0]), set())
+
+    def test_month_navigation(self):
+        months = [month['month'] for month in self.calendar(start='2030-11', months=4)]
+        self.assertEqual(months, ['2030-11', '2030-12', '2031-01', '2031-02'])
+        self.assertEqual([month['days'] for month in self.calendar(start='2032-02', months=1)], [29])
+
+        this_month = timezone.localdate().strftime('%Y-%m')
+        self.assertEqual(self.calendar()[0]['month'], this_month)
+        self.assertEqual(self.calendar(start='soon')[0]['month'], this_month)
+
+    def test_month_count_is_clamped(self):
+        for months, expected in (('0', 1), ('-4', 1), ('99', 12), ('many', 3)):
+            with self.subTest(months=months):
+                self.assertEqual(len(self.calendar(start='2030-01', months=months)), expected)
+
+    def test_check_availability_lists_the_open_windows(self):
+        self.stay(date(2030, 6, 10), 5, Reservation.Status.CONFIRMED)
+        response = self.client.get(
+            reverse('reservations:check_availability', args=[self.facility.slug]), {'month': '2030-06'},
+        )
+        self.assertEqual(response.context['month'], date(2030, 6, 1))
+        self.assertEqual(
+            list(response.context['free_windows']),
+            [(date(2030, 6, 1), date(2030, 6, 10)), (date(2030, 6, 15), date(2030, 7, 1))],
+        )
+        self.assertContains(response, '?start=2030-06&months=3')
+
+    def test_requires_login_and_an_available_facility(self):
+        url = reverse('reservations:calendar', args=[self.facility.slug])
+        Facility.objects.filter(pk=self.facility.pk).update(is_available=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_last_supported_month(self):
+        response = self.client.get(
+            reverse('reservations:calendar', args=[self.facility.slug]), {'start': '9000-12', 'months': 12},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['months'][-1]['month'], '9001-11')
+
+    def test_out_of_range_months_are_bad_requests(self):
+        for name, param in (('reservations:calendar', 'start'), ('reservations:check_availability', 'month')):
+            url = reverse(name, args=[self.facility.slug])
+            for month in ('9999-12', '2026-13', '0000-01'):
+                with self.subTest(name=name, month=month):
+                    self.assertEqual(self.client.get(url, {param: month}).status_code, 400)
+
+
+class SearchAvailabilityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.cottage = make_facility('cottage', capacity=4)
+        self.villa = make_facility('villa', capacity=10)
+        make_facility('closed-hall', capacity=10, is_available=False)
+        self.check_in = timezone.localdate() + timedelta(days=30)
+
+    def book(self, facility, check_in, nights=2, status=Reservation.Status.CONFIRMED):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                user=self.user, facility=facility, check_in=check_in,
+                check_out=check_in + timedelta(days=nights), status=status,
+            )
+
+    def search(self, check_in, nights=2, guests=2):
+        response = self.client.get(reverse('reservations:search_json'), {
+            'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=nights)).isoformat(),
+            'guests': guests,
+        })
+        self.assertEqual(response.status_code, 200)
+        return [facility['slug'] for facility in response.json()['facilities']]
+
+    def test_lists_the_free_facilities_that_fit(self):
+        self.book(self.cottage, self.check_in)
+        self.assertEqual(self.search(self.check_in + timedelta(days=1)), ['villa'])
+        # Checking in on the day the other stay checks out is fine.
+        self.assertEqual(sorted(self.search(self.check_in + timedelta(days=2))), ['cottage', 'villa'])
+        self.assertEqual(self.search(self.check_in + timedelta(days=10), guests=6), ['villa'])
+
+    def test_cancelled_stays_do_not_block(self):
+        self.book(self.cottage, self.check_in, status=Reservation.Status.CANCELLED)
+        self.assertEqual(sorted(self.search(self.check_in)), ['cottage', 'villa'])
+
+    def test_invalid_searches_are_bad_requests(self):
+        url = reverse('reservations:search_json')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for params in (
+            {'check_in': yesterday, 'check_out': self.check_in, 'guests': 2},
+            {'check_in': self.check_in, 'check_out': self.check_in, 'guests': 2},
+            {'check_in': self.check_in, 'check_out': self.check_in + timedelta(days=1), 'guests': 0},
+            {'check_in': 'soon'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('errors', response.json())
+
+    def test_results_are_cached_per_range_and_guests(self):
+        self.search(self.check_in)
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(self.search(self.check_in)), ['cottage', 'villa'])
+        with self.assertNumQueries(1):
+            self.search(self.check_in, guests=3)
+        with self.assertNumQueries(1):
+            self.search(self.check_in, nights=3)
+
+    def test_bookings_and_facility_changes_retire_cached_results(self):
+        self.assertEqual(sorted(self.search(self.check_in)), ['cottage', 'villa'])
+        self.book(self.villa, self.check_in)
+        self.assertEqual(self.search(self.check_in), ['cottage'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cottage.is_available = False
+            self.cottage.save()
+        self.assertEqual(self.search(self.check_in), [])
+
+    def test_search_page(self):
+        self.book(self.cottage, self.check_in)
+        response = self.client.get(reverse('reservations:search'), {
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=2)).isoformat(), 'guests': 2,
+        })
+        self.assertEqual([facility.slug for facility in response.context['facilities']], ['villa'])
+        self.assertIsNone(self.client.get(reverse('reservations:search')).context['facilities'])
+
+
+@override_settings(EMAIL_HOST_USER='admin@example.com')
+class OverlapCleanupMigrationTests(TestCase):
+    """The migrations that tighten the overlap rules move colliding bookings aside and say so."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='guest', password='guest-password', email='guest@example.com',
+        )
+        self.facility = make_facility()
+
+    def stay(self, status, days=0):
+        check_in = date(2030, 1, 10) + timedelta(days=days)
+        return Reservation.objects.create(
+            user=self.user, facility=self.facility, check_in=check_in,
+            check_out=check_in + timedelta(days=2), status=status,
+        )
+
+    def run_migration(self, name, function):
+        migration = importlib.import_module(f'reservations.migrations.{name}')
+        with self.assertLogs('reservations.migrations', 'WARNING') as logs:
+            getattr(migration, function)(apps, None)
+        return logs.output
+
+    def test_later_overlapping_stays_move_out_before_the_constraint(self):
+        kept = self.stay(Reservation.Status.PAID)
+        paid = self.stay(Reservation.Status.PAID, days=1)
+        payment = Payment.objects.create(
+            reservation=paid, user=self.user, amount=Decimal('1000.00'),
+            status=Payment.Status.PAID, paid_at=timezone.now(),
+        )
+        confirmed = self.stay(Reservation.Status.CONFIRMED, days=-1)
+        clear = self.stay(Reservation.Status.CONFIRMED, days=5)
+
+        logs = self.run_migration('0004_reservation_no_overlapping_stays', 'move_overlapping_stays')
+
+        statuses = dict(Reservation.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {
+            kept.pk: Reservation.Status.PAID, paid.pk: Reservation.Status.CONFLICT,
+            confirmed.pk: Reservation.Status.CANCELLED, clear.pk: Reservation.Status.CONFIRMED,
+        })
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.REFUND_DUE)
+        self.assertEqual(len(logs), 2)
+        recipients = sorted(address for row in EmailOutbox.objects.all() for address in row.recipients)
+        self.assertEqual(recipients, ['admin@example.com'] * 2 + ['guest@example.com'] * 2)
+
+    def test_colliding_pending_holds_are_cancelled_with_notice(self):
+        self.stay(Reservation.Status.CONFIRMED)
+        first = self.stay(Reservation.Status.PENDING, days=3)
+        late = self.stay(Reservation.Status.PENDING, days=4)
+
+        logs = self.run_migration('0006_pending_holds_block_dates', 'release_conflicting_holds')
+
+        self.assertEqual(Reservation.objects.get(pk=first.pk).status, Reservation.Status.PENDING)
+        self.assertEqual(Reservation.objects.get(pk=late.pk).status, Reservation.Status.CANCELLED)
+        self.assertEqual(len(logs), 1)
+        self.assertIn(f'#{late.pk}', logs[0])
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel bookings for one facility never commit overlapping stays."""
+
+    def test_parallel_bookings_do_not_overlap(self):
+        availability_index.invalidate()
+        user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        facility = make_facility()
+        rng = random.Random(3)
+        start = timezone.localdate() + timedelta(days=1)
+        stays = []
+        for _ in range(60):
+            check_in = start + timedelta(days=rng.randrange(20))
+            stays.append((check_in, check_in + timedelta(days=rng.randint(1, 4))))
+
+        def attempt(stay):
+            try:
+                book_reservation(Reservation(
+                    user=user, facility=facility, check_in=stay[0], check_out=stay[1],
+                ))
+                return 'committed'
+            except BookingConflict:
+                return 'conflict'
+            except OperationalError:
+                return 'error'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            outcomes = list(pool.map(attempt, stays))
+
+        committed = list(
+            Reservation.objects.filter(facility=facility, status__in=Reservation.BLOCKING_STATUSES)
+            .order_by('check_in').values_list('check_in', 'check_out')
+        )
+        self.assertEqual(len(committed), outcomes.count('committed'))
+        self.assertGreater(len(committed), 0)
+        for previous, current in zip(committed, committed[1:]):
+            self.assertLessEqual(previous[1], current[0])
+        availability_index.invalidate()
+
+
+class ReservationQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """The booking lists run the same queries for 10 bookings as for 10,000."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='guest', password='guest-password')
+        self.facility = make_facility()
+        self.client.force_login(self.user)
+
+    def add_reservations(self, count):
+        start = date(2020, 1, 1) + timedelta(days=3 * Reservation.objects.count())
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=self.user, facility=self.facility, check_in=start + timedelta(days=3 * i),
+                check_out=start + timedelta(days=3 * i + 2), total_price=Decimal('2000.00'),
+            )
+            for i in range(count)
+        ])
+
+    def test_my_reservations(self):
+        for size in (10, 10000):
+            self.add_reservations(size - Reservation.objects.count())
+            for name in ('reservations:my_reservations', 'reservations:my_reservations_page'):
+                with self.subTest(name=name, rows=Reservation.objects.count()):
+                    cache.clear()
+                    # Session, user, then one page of bookings with their facility.
+                    self.assertMaxQueries(reverse(name), 3)
@@ -5,7 +5,11 @@ app_name = 'reservations'
 
 urlpatterns = [
     path('my/', views.my_reservations, name='my_reservations'),
+    path('my/page/', views.my_reservations_page, name='my_reservations_page'),
     path('check/<slug:facility_slug>/', views.check_availability, name='check_availability'),
+    path('calendar/<slug:facility_slug>/', views.availability_calendar, name='calendar'),
+    path('search/', views.search_availability, name='search'),
+    path('search/results/', views.search_availability_json, name='search_json'),
     path('book/<slug:facility_slug>/', views.create_reservation, name='create'),
     path('<int:pk>/', views.reservation_detail, name='detail'),
     path('<int:pk>/cancel/', views.cancel_reservation, name='cancel'),
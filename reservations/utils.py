@@ -1,8 +1,6 @@
-import logging
-from django.core.mail import send_mail
 from django.conf import settings
 
-logger = logging.getLogger(__name__)
+from core.outbox import queue_email
 
 def notify_admin_booking_created(reservation):
     """Notify the admin when a new reservation is created."""
@@ -22,17 +20,8 @@ def notify_admin_booking_created(reservation):
         f"Status: {reservation.get_status_display()}\n\n"
         f"Please check your Django Admin dashboard for more details."
     )
-    
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[settings.EMAIL_HOST_USER], # Admin receives it
-            fail_silently=True,
-        )
-    except Exception as e:
-        logger.error(f"Failed to send booking creation email to admin: {e}")
+
+    queue_email(subject, message, [settings.EMAIL_HOST_USER])  # Admin receives it
 
 
 def notify_admin_payment_success(reservation, payment):
@@ -51,14 +40,27 @@ def notify_admin_payment_success(reservation, payment):
         f"Date Paid: {payment.paid_at}\n\n"
         f"This reservation is now confirmed."
     )
-    
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[settings.EMAIL_HOST_USER],
-            fail_silently=True,
-        )
-    except Exception as e:
-        logger.error(f"Failed to send payment success email to admin: {e}")
+
+    queue_email(subject, message, [settings.EMAIL_HOST_USER])
+
+
+def notify_admin_payment_conflict(reservation, payment):
+    """Notify the admin when a payment arrives for dates that are no longer free."""
+    if not settings.EMAIL_HOST_USER:
+        return
+
+    subject = f"[Refund Due] Reservation #{reservation.pk} was paid but its dates are taken"
+    message = (
+        f"A payment was received for a reservation whose dates are no longer available.\n\n"
+        f"Reservation ID: #{reservation.pk}\n"
+        f"User: {reservation.user.get_full_name() or reservation.user.username} ({reservation.user.email})\n"
+        f"Facility: {reservation.facility.name}\n"
+        f"Check-in: {reservation.check_in}\n"
+        f"Check-out: {reservation.check_out}\n"
+        f"Amount Paid: PHP {payment.amount}\n"
+        f"Receipt / Payment ID: {payment.receipt_number or payment.paymongo_checkout_id or 'N/A'}\n\n"
+        f"The reservation is marked as a conflict and the payment as refund due. "
+        f"Please refund the guest or rebook them from the Django Admin dashboard."
+    )
+
+    queue_email(subject, message, [settings.EMAIL_HOST_USER])
@@ -1,10 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from core.pagination import InvalidCursor, page_json, paginate
 from facilities.models import Facility
+from .availability import availability_index
+from .occupancy import MonthOutOfRange, calendar_window, parse_month
+from .search import available_facilities
+from .services import BookingConflict, book_reservation
 from .models import Reservation
-from .forms import ReservationForm
+from .forms import AvailabilitySearchForm, ReservationForm
+from .utils import notify_admin_booking_created
+
+MAX_CALENDAR_MONTHS = 12
+
+RESERVATION_ORDERING = ('-created_at', '-pk')
+
+# Columns the "My Reservations" table renders.
+MY_RESERVATIONS_FIELDS = (
+    'check_in', 'check_out', 'guests', 'total_price', 'status', 'created_at',
+    'facility__name', 'facility__slug',
+)
 
 
 @login_required
@@ -12,15 +30,83 @@ def check_availability(request, facility_slug):
     """Check available dates for a facility (Process 2.1)."""
     facility = get_object_or_404(Facility, slug=facility_slug, is_available=True)
 
-    # Get existing confirmed/paid reservations for this facility
-    existing_reservations = Reservation.objects.filter(
-        facility=facility,
-        status__in=[Reservation.Status.CONFIRMED, Reservation.Status.PAID],
-    ).values('check_in', 'check_out')
+    try:
+        month = parse_month(request.GET.get('month', ''), timezone.localdate())
+    except MonthOutOfRange as e:
+        return HttpResponseBadRequest(str(e))
+    free_windows = availability_index.free_windows_in_month(
+        facility.pk, month.year, month.month
+    )
 
     return render(request, 'reservations/check_availability.html', {
         'facility': facility,
-        'existing_reservations': list(existing_reservations),
+        'free_windows': free_windows,
+        'month': month,
+    })
+
+
+@login_required
+def availability_calendar(request, facility_slug):
+    """
+    JSON month grid of booked nights for a facility.
+    Each month carries a base64 bitset: bit d-1 set means night d is taken.
+    """
+    facility = get_object_or_404(Facility, slug=facility_slug, is_available=True)
+
+    try:
+        start = parse_month(request.GET.get('start', ''), timezone.localdate())
+    except MonthOutOfRange as e:
+        return HttpResponseBadRequest(str(e))
+    try:
+        count = int(request.GET.get('months', 3))
+    except ValueError:
+        count = 3
+    count = min(max(count, 1), MAX_CALENDAR_MONTHS)
+
+    return JsonResponse({
+        'facility': facility.slug,
+        'months': calendar_window(facility.pk, start, count),
+    })
+
+
+def search_availability(request):
+    """Find every facility free for a date range and party size."""
+    form = AvailabilitySearchForm(request.GET or None)
+    facilities = None
+    if form.is_valid():
+        facilities = available_facilities(
+            form.cleaned_data['check_in'],
+            form.cleaned_data['check_out'],
+            form.cleaned_data['guests'],
+        )
+
+    return render(request, 'reservations/search.html', {
+        'form': form,
+        'facilities': facilities,
+    })
+
+
+def search_availability_json(request):
+    """JSON variant of search_availability."""
+    form = AvailabilitySearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    facilities = available_facilities(
+        form.cleaned_data['check_in'],
+        form.cleaned_data['check_out'],
+        form.cleaned_data['guests'],
+    )
+    return JsonResponse({
+        'facilities': [
+            {
+                'slug': facility.slug,
+                'name': facility.name,
+                'capacity': facility.capacity,
+                'price_per_day': str(facility.price_per_day),
+            }
+            for facility in facilities
+        ],
     })
 
 
@@ -36,41 +122,36 @@ def create_reservation(request, facility_slug):
             reservation.user = request.user
             reservation.facility = facility
 
-            # Check for date conflicts
-            conflicts = Reservation.objects.filter(
-                facility=facility,
-                status__in=[
-                    Reservation.Status.CONFIRMED,
-                    Reservation.Status.PAID,
-                ],
-            ).filter(
-                Q(check_in__lt=reservation.check_out) &
-                Q(check_out__gt=reservation.check_in)
-            )
-
-            if conflicts.exists():
+            # Check guest capacity
+            if reservation.guests > facility.capacity:
                 messages.error(
                     request,
-                    'The selected dates are not available. Please choose different dates.'
+                    f'This facility can accommodate a maximum of {facility.capacity} guests.'
                 )
                 return render(request, 'reservations/create_reservation.html', {
                     'form': form, 'facility': facility,
                 })
 
-            # Check guest capacity
-            if reservation.guests > facility.capacity:
+            # Check for date conflicts: taken dates are turned away before
+            # the booking lock is taken (the index answers, confirmed in the
+            # database), the booking service re-checks and saves under a
+            # per-facility lock.
+            reservation.calculate_total()
+            try:
+                if availability_index.confirmed_taken(
+                    facility.pk, reservation.check_in, reservation.check_out
+                ):
+                    raise BookingConflict
+                book_reservation(reservation)
+            except BookingConflict:
                 messages.error(
                     request,
-                    f'This facility can accommodate a maximum of {facility.capacity} guests.'
+                    'The selected dates are not available. Please choose different dates.'
                 )
                 return render(request, 'reservations/create_reservation.html', {
                     'form': form, 'facility': facility,
                 })
 
-            reservation.calculate_total()
-            reservation.save()
-            
-            from .utils import notify_admin_booking_created
             notify_admin_booking_created(reservation)
 
             messages.success(request, 'Reservation created! Please proceed to payment.')
@@ -113,10 +194,46 @@ def cancel_reservation(request, pk):
     })
 
 
+def _my_reservations_page(request):
+    reservations = (
+        Reservation.objects.filter(user=request.user)
+        .select_related('facility')
+        .only(*MY_RESERVATIONS_FIELDS)
+    )
+    return paginate(request, reservations, RESERVATION_ORDERING)
+
+
 @login_required
 def my_reservations(request):
-    """List all reservations for the logged-in user."""
-    reservations = Reservation.objects.filter(user=request.user)
+    """List the logged-in user's reservations, newest first, a page at a time."""
+    try:
+        page = _my_reservations_page(request)
+    except InvalidCursor:
+        return redirect('reservations:my_reservations')
     return render(request, 'reservations/my_reservations.html', {
-        'reservations': reservations,
+        'reservations': page.items,
+        'next_cursor': page.next_cursor,
     })
+
+
+@login_required
+def my_reservations_page(request):
+    """Next page of "My Reservations" for infinite scroll (JSON)."""
+    try:
+        page = _my_reservations_page(request)
+    except InvalidCursor as e:
+        return HttpResponseBadRequest(str(e))
+    return page_json(
+        request, page, 'reservations/_reservation_rows.html', {'reservations': page.items},
+        serialize=lambda res: {
+            'id': res.pk,
+            'facility': res.facility.name,
+            'check_in': res.check_in.isoformat(),
+            'check_out': res.check_out.isoformat(),
+            'guests': res.guests,
+            'total_price': str(res.total_price),
+            'status': res.status,
+        },
+        json_url=reverse('reservations:my_reservations_page'),
+        html_url=reverse('reservations:my_reservations'),
+    )